@@ -6,7 +6,22 @@ __all__ = [
 'matrix44',
 'color',
 'gametime',
-'grid'
+'grid',
+'batch',
+'vector3array',
+'flatvector',
+'pool',
+'matrix44array',
+'transformnode',
+'quaternion',
+'transform',
+'frustum',
+'viewport',
+'vector2array',
+'matrix33',
+'spatialhash',
+'quadtree',
+'flocking'
 ]
 
 
@@ -0,0 +1,350 @@
+"""Storage backends for the batched (array) types.
+
+A backend creates and operates on flat sequences of floats. The default
+backend uses the standard library array module, the NumPy backend is used
+if it is requested and NumPy is installed.
+
+"""
+
+from array import array
+from itertools import repeat
+from operator import add, sub, mul, truediv, neg
+from math import sqrt, sin, cos
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_scalar(value):
+    """Returns True if value is a single number rather than a sequence."""
+    return not hasattr(value, "__getitem__")
+
+
+_identity_values = (1.,0.,0.,0., 0.,1.,0.,0., 0.,0.,1.,0., 0.,0.,0.,1.)
+
+
+def _mul_matrix_values(lhs, rhs, count, lhs_step=16, rhs_step=16):
+    """Multiplies matrices stored in flat sequences of floats and returns the
+    results as a list of 16*count values. A step of 0 re-uses a single
+    matrix."""
+
+    ret = []
+    extend = ret.extend
+    for index in xrange(count):
+
+        i = index * lhs_step
+        m1_0,  m1_1,  m1_2,  m1_3, \
+        m1_4,  m1_5,  m1_6,  m1_7, \
+        m1_8,  m1_9,  m1_10, m1_11, \
+        m1_12, m1_13, m1_14, m1_15 = lhs[i:i+16]
+
+        i = index * rhs_step
+        m2_0,  m2_1,  m2_2,  m2_3, \
+        m2_4,  m2_5,  m2_6,  m2_7, \
+        m2_8,  m2_9,  m2_10, m2_11, \
+        m2_12, m2_13, m2_14, m2_15 = rhs[i:i+16]
+
+        extend(( m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8 + m2_3 * m1_12,
+                 m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9 + m2_3 * m1_13,
+                 m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10 + m2_3 * m1_14,
+                 m2_0 * m1_3 + m2_1 * m1_7 + m2_2 * m1_11 + m2_3 * m1_15,
+
+                 m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8 + m2_7 * m1_12,
+                 m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9 + m2_7 * m1_13,
+                 m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10 + m2_7 * m1_14,
+                 m2_4 * m1_3 + m2_5 * m1_7 + m2_6 * m1_11 + m2_7 * m1_15,
+
+                 m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8 + m2_11 * m1_12,
+                 m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9 + m2_11 * m1_13,
+                 m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10 + m2_11 * m1_14,
+                 m2_8 * m1_3 + m2_9 * m1_7 + m2_10 * m1_11 + m2_11 * m1_15,
+
+                 m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m2_15 * m1_12,
+                 m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m2_15 * m1_13,
+                 m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m2_15 * m1_14,
+                 m2_12 * m1_3 + m2_13 * m1_7 + m2_14 * m1_11 + m2_15 * m1_15 ))
+    return ret
+
+
+def _orthonormalise(m, i=0):
+    """Orthonormalises the upper 3x3 of a matrix stored at offset i of a
+    flat sequence of values, in place. See Matrix44.orthonormalise."""
+
+    x0 = m[i];   x1 = m[i+1]; x2 = m[i+2]
+    y0 = m[i+4]; y1 = m[i+5]; y2 = m[i+6]
+
+    l = 1. / sqrt(x0*x0 + x1*x1 + x2*x2)
+    x0 *= l; x1 *= l; x2 *= l
+
+    d = y0*x0 + y1*x1 + y2*x2
+    y0 -= d*x0; y1 -= d*x1; y2 -= d*x2
+    l = 1. / sqrt(y0*y0 + y1*y1 + y2*y2)
+    y0 *= l; y1 *= l; y2 *= l
+
+    m[i]   = x0; m[i+1] = x1; m[i+2]  = x2
+    m[i+4] = y0; m[i+5] = y1; m[i+6]  = y2
+    m[i+8] = x1*y2 - x2*y1
+    m[i+9] = x2*y0 - x0*y2
+    m[i+10] = x0*y1 - x1*y0
+
+
+class ArrayBackend(object):
+
+    """Stores components in array('d') objects."""
+
+    name = "array"
+
+    def zeros(self, size):
+        return array('d', repeat(0.0, size))
+
+    def from_iter(self, values):
+        return array('d', values)
+
+    def copy(self, a):
+        return array('d', a)
+
+    def full(self, size, value):
+        return array('d', repeat(float(value), size))
+
+    def _binary(self, op, a, b):
+        if is_scalar(b):
+            return array('d', map(op, a, repeat(b, len(a))))
+        if is_scalar(a):
+            return array('d', map(op, repeat(a, len(b)), b))
+        return array('d', map(op, a, b))
+
+    def add(self, a, b):
+        return self._binary(add, a, b)
+
+    def sub(self, a, b):
+        return self._binary(sub, a, b)
+
+    def mul(self, a, b):
+        return self._binary(mul, a, b)
+
+    def div(self, a, b):
+        return self._binary(truediv, a, b)
+
+    def _inplace(self, op, a, b):
+        a[:] = self._binary(op, a, b)
+        return a
+
+    def iadd(self, a, b):
+        return self._inplace(add, a, b)
+
+    def isub(self, a, b):
+        return self._inplace(sub, a, b)
+
+    def imul(self, a, b):
+        return self._inplace(mul, a, b)
+
+    def idiv(self, a, b):
+        return self._inplace(truediv, a, b)
+
+    def neg(self, a):
+        return array('d', map(neg, a))
+
+    def sqrt(self, a):
+        return array('d', map(sqrt, a))
+
+    def sin(self, a):
+        return array('d', map(sin, a))
+
+    def cos(self, a):
+        return array('d', map(cos, a))
+
+    def safe_reciprocal(self, a):
+        """Returns 1/x for each value, or 0 where x is 0."""
+        return array('d', [1.0 / x if x else 0.0 for x in a])
+
+    def sum(self, a):
+        return sum(a)
+
+    def assign(self, a, values):
+        a[:] = array('d', values)
+        return a
+
+    def assign_range(self, a, start, values):
+        a[start:start+len(values)] = array('d', values)
+        return a
+
+    # Operations on blocks of 4x4 matrices, 16 values per matrix
+
+    def identity_matrices(self, count):
+        return array('d', _identity_values * count)
+
+    def mul_matrices(self, lhs, rhs, count, lhs_step=16, rhs_step=16):
+        """Multiplies matrices, a step of 0 re-uses a single matrix."""
+        return array('d', _mul_matrix_values(lhs, rhs, count,
+                                             lhs_step, rhs_step))
+
+    def transpose_matrices(self, m):
+        for i in xrange(0, len(m), 16):
+            m00, m01, m02, m03, \
+            m10, m11, m12, m13, \
+            m20, m21, m22, m23, \
+            m30, m31, m32, m33 = m[i:i+16]
+            m[i:i+16] = array('d', ( m00, m10, m20, m30,
+                                     m01, m11, m21, m31,
+                                     m02, m12, m22, m32,
+                                     m03, m13, m23, m33 ))
+        return m
+
+    def inverse_rot_trans_matrices(self, m):
+        ret = []
+        extend = ret.extend
+        for i in xrange(0, len(m), 16):
+            i0,  i1,  i2,  i3, \
+            i4,  i5,  i6,  i7, \
+            i8,  i9,  i10, i11, \
+            i12, i13, i14, i15 = m[i:i+16]
+            extend(( i0, i4, i8, i3,
+                     i1, i5, i9, i7,
+                     i2, i6, i10, i11,
+                     -(i0 * i12 + i1 * i13 + i2 * i14),
+                     -(i4 * i12 + i5 * i13 + i6 * i14),
+                     -(i8 * i12 + i9 * i13 + i10 * i14),
+                     i15 ))
+        return array('d', ret)
+
+    def orthonormalise_matrices(self, m):
+        for i in xrange(0, len(m), 16):
+            _orthonormalise(m, i)
+        return m
+
+    def to_float32(self, a):
+        return array('f', a)
+
+
+class NumpyBackend(object):
+
+    """Stores components in float64 NumPy arrays."""
+
+    name = "numpy"
+
+    def zeros(self, size):
+        return numpy.zeros(size)
+
+    def from_iter(self, values):
+        return numpy.fromiter(values, dtype=numpy.float64)
+
+    def copy(self, a):
+        return numpy.array(a, dtype=numpy.float64)
+
+    def full(self, size, value):
+        return numpy.full(size, float(value))
+
+    def add(self, a, b):
+        return numpy.add(a, b)
+
+    def sub(self, a, b):
+        return numpy.subtract(a, b)
+
+    def mul(self, a, b):
+        return numpy.multiply(a, b)
+
+    def div(self, a, b):
+        return numpy.true_divide(a, b)
+
+    def iadd(self, a, b):
+        return numpy.add(a, b, out=a)
+
+    def isub(self, a, b):
+        return numpy.subtract(a, b, out=a)
+
+    def imul(self, a, b):
+        return numpy.multiply(a, b, out=a)
+
+    def idiv(self, a, b):
+        return numpy.true_divide(a, b, out=a)
+
+    def neg(self, a):
+        return numpy.negative(a)
+
+    def sqrt(self, a):
+        return numpy.sqrt(a)
+
+    def sin(self, a):
+        return numpy.sin(a)
+
+    def cos(self, a):
+        return numpy.cos(a)
+
+    def safe_reciprocal(self, a):
+        """Returns 1/x for each value, or 0 where x is 0."""
+        ret = numpy.zeros(len(a))
+        numpy.true_divide(1.0, a, out=ret, where=(a != 0.0))
+        return ret
+
+    def sum(self, a):
+        return float(numpy.sum(a))
+
+    def assign(self, a, values):
+        a[:] = values
+        return a
+
+    def assign_range(self, a, start, values):
+        a[start:start+len(values)] = values
+        return a
+
+    # Operations on blocks of 4x4 matrices, 16 values per matrix
+
+    def identity_matrices(self, count):
+        return numpy.tile(_identity_values, count)
+
+    def mul_matrices(self, lhs, rhs, count, lhs_step=16, rhs_step=16):
+        """Multiplies matrices, a step of 0 re-uses a single matrix."""
+        lhs = numpy.asarray(lhs, dtype=numpy.float64)
+        rhs = numpy.asarray(rhs, dtype=numpy.float64)
+        lhs_blocks = lhs.reshape(-1, 4, 4) if lhs_step else lhs.reshape(4, 4)
+        rhs_blocks = rhs.reshape(-1, 4, 4) if rhs_step else rhs.reshape(4, 4)
+        # Matrix44 products are in the reverse order to the usual notation
+        return numpy.matmul(rhs_blocks, lhs_blocks).reshape(-1)
+
+    def transpose_matrices(self, m):
+        blocks = m.reshape(-1, 4, 4)
+        blocks[:] = blocks.transpose(0, 2, 1).copy()
+        return m
+
+    def inverse_rot_trans_matrices(self, m):
+        ret = m.copy()
+        blocks = ret.reshape(-1, 4, 4)
+        rotation = blocks[:, :3, :3].transpose(0, 2, 1).copy()
+        translation = blocks[:, 3, :3]
+        blocks[:, :3, :3] = rotation
+        blocks[:, 3, :3] = -numpy.einsum('nkj,nk->nj', rotation, translation)
+        return ret
+
+    def orthonormalise_matrices(self, m):
+        blocks = m.reshape(-1, 4, 4)
+        x = blocks[:, 0, :3]
+        y = blocks[:, 1, :3]
+        x /= numpy.sqrt((x * x).sum(axis=1))[:, None]
+        y -= (y * x).sum(axis=1)[:, None] * x
+        y /= numpy.sqrt((y * y).sum(axis=1))[:, None]
+        blocks[:, 2, :3] = numpy.cross(x, y)
+        return m
+
+    def to_float32(self, a):
+        return a.astype(numpy.float32)
+
+
+array_backend = ArrayBackend()
+numpy_backend = numpy is not None and NumpyBackend() or None
+
+
+def get_backend(use_numpy=False):
+    """Returns a storage backend.
+
+    use_numpy -- If True the NumPy backend is returned, a ValueError is raised
+    if NumPy is not installed.
+
+    """
+
+    if not use_numpy:
+        return array_backend
+    if numpy_backend is None:
+        raise ValueError("NumPy is not installed")
+    return numpy_backend
@@ -0,0 +1,758 @@
+"""Benchmarks for gameobjects.
+
+Run all the benchmarks with 'python bench.py', or give the names of the
+benchmarks to run on the command line (eg. 'python bench.py into').
+
+"""
+
+import sys
+import random
+from array import array
+from timeit import default_timer
+
+from vector3 import Vector3
+from vector2 import Vector2
+from flatvector import FlatVector3, FlatVector2
+from matrix44 import Matrix44, Matrix44f, MatrixStack, MatrixChain
+import matrix44
+from matrix44array import Matrix44Array
+from matrix33 import Matrix33
+import util
+from transformnode import TransformNode
+from transform import Transform
+from quaternion import Quaternion
+from frustum import Frustum, make_plane_cache
+from sphere import Sphere
+from vector3array import Vector3Array
+from vector2array import Vector2Array
+from viewport import Viewport
+from spatialhash import SpatialHash
+from quadtree import LooseQuadTree
+from flocking import Flock
+import batch
+
+
+def best_time(function, repeat=3):
+    """Calls a function a number of times and returns the quickest time."""
+
+    times = []
+    for _ in xrange(repeat):
+        start = default_timer()
+        function()
+        times.append(default_timer() - start)
+    return min(times)
+
+
+class _BaselineMatrix44(Matrix44):
+
+    """A Matrix44 with the * operator from before the kernels were picked by
+    the kinds of matrix (always a full product)."""
+
+    __slots__ = ()
+
+    def __mul__(self, rhs):
+
+        m1_0,  m1_1,  m1_2,  m1_3, \
+        m1_4,  m1_5,  m1_6,  m1_7, \
+        m1_8,  m1_9,  m1_10, m1_11, \
+        m1_12, m1_13, m1_14, m1_15 = self._m
+
+        m2_0,  m2_1,  m2_2,  m2_3, \
+        m2_4,  m2_5,  m2_6,  m2_7, \
+        m2_8,  m2_9,  m2_10, m2_11, \
+        m2_12, m2_13, m2_14, m2_15 = rhs._m
+
+        retm =  [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8 + m2_3 * m1_12,
+                  m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9 + m2_3 * m1_13,
+                  m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10 + m2_3 * m1_14,
+                  m2_0 * m1_3 + m2_1 * m1_7 + m2_2 * m1_11 + m2_3 * m1_15,
+
+                  m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8 + m2_7 * m1_12,
+                  m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9 + m2_7 * m1_13,
+                  m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10 + m2_7 * m1_14,
+                  m2_4 * m1_3 + m2_5 * m1_7 + m2_6 * m1_11 + m2_7 * m1_15,
+
+                  m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8 + m2_11 * m1_12,
+                  m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9 + m2_11 * m1_13,
+                  m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10 + m2_11 * m1_14,
+                  m2_8 * m1_3 + m2_9 * m1_7 + m2_10 * m1_11 + m2_11 * m1_15,
+
+                  m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m2_15 * m1_12,
+                  m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m2_15 * m1_13,
+                  m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m2_15 * m1_14,
+                  m2_12 * m1_3 + m2_13 * m1_7 + m2_14 * m1_11 + m2_15 * m1_15 ]
+
+        ret = self.__new__(self.__class__, object)
+        ret._m = retm
+
+        return ret
+
+
+class _CountingVector3(Vector3):
+
+    """A Vector3 that counts the vectors it creates."""
+
+    __slots__ = ()
+
+    created = 0
+
+    @classmethod
+    def from_floats(cls, x, y, z):
+        _CountingVector3.created += 1
+        return super(_CountingVector3, cls).from_floats(x, y, z)
+
+
+def bench_into(count=200000):
+    """Compares the operators with the *_into methods, on an entity update
+    (position += velocity * dt, then direction = normalised velocity)."""
+
+    dt = 1. / 60.
+
+    def operators():
+        position = _CountingVector3(0, 0, 0)
+        velocity = _CountingVector3(1, 2, 3)
+        for _ in xrange(count):
+            position = position + velocity * dt
+            direction = velocity.get_normalised()
+
+    def into():
+        add_into = Vector3.add_into
+        mul_into = Vector3.mul_into
+        normalise_into = Vector3.normalise_into
+        position = _CountingVector3(0, 0, 0)
+        velocity = _CountingVector3(1, 2, 3)
+        step = _CountingVector3.from_floats(0., 0., 0.)
+        direction = _CountingVector3.from_floats(0., 0., 0.)
+        for _ in xrange(count):
+            add_into(position, mul_into(velocity, dt, step), position)
+            normalise_into(velocity, direction)
+
+    print "%i entity updates" % count
+    for name, function in (("operators", operators), ("*_into", into)):
+        _CountingVector3.created = 0
+        t = best_time(function, 1)
+        # Each Vector3 is two objects, the vector and its list of components
+        print "  %-10s %.3fs, %i objects allocated" % \
+            (name, t, _CountingVector3.created * 2)
+
+
+def bench_flat(count=1000000):
+    """Compares the memory use and speed of Vector3 / Vector2 with
+    FlatVector3 / FlatVector2."""
+
+    getsizeof = sys.getsizeof
+
+    def compare(name, cls, values):
+
+        vectors = []
+        def create():
+            from_floats = cls.from_floats
+            vectors[:] = [from_floats(*values) for _ in xrange(count)]
+        t_create = best_time(create, 1)
+
+        sample = vectors[0]
+        size = getsizeof(sample)
+        if hasattr(sample, '_v'):
+            size += getsizeof(sample._v)
+
+        def access():
+            for v in vectors:
+                v.x + v.y
+        t_access = best_time(access, 1)
+
+        def add():
+            for v in vectors:
+                v + v
+        t_add = best_time(add, 1)
+
+        def as_tuple():
+            for v in vectors:
+                v.as_tuple()
+        t_tuple = best_time(as_tuple, 1)
+
+        print "  %-12s %5.1fMB  create %.3fs  x+y %.3fs  add %.3fs  as_tuple %.3fs" % \
+            (name, size * count / 1048576., t_create, t_access, t_add, t_tuple)
+
+    print "%i vectors (memory excludes the list holding the vectors)" % count
+    compare("Vector3", Vector3, (1., 2., 3.))
+    compare("FlatVector3", FlatVector3, (1., 2., 3.))
+    compare("Vector2", Vector2, (1., 2.))
+    compare("FlatVector2", FlatVector2, (1., 2.))
+
+
+def bench_transform(count=500000):
+    """Compares transforming a list of point tuples with transforming a
+    packed buffer."""
+
+    m = Matrix44.xyz_rotation(.1, .2, .3)
+    m.translate = (1., 2., 3.)
+    points = [ (float(i), 1., 2.) for i in xrange(count) ]
+    packed = array('d', [ c for p in points for c in p ])
+    out = array('d', packed)
+
+    print "%i points" % count
+    t = best_time(lambda: m.transform_sequence(points), 1)
+    print "  tuples  %.3fs" % t
+    t = best_time(lambda: m.transform_sequence(packed, out), 1)
+    print "  buffer  %.3fs" % t
+
+
+def bench_mul(count=200000):
+    """Compares the * operator, which picks a kernel for the kinds of
+    matrix, with the original operator (always a full product), and shows
+    how many times each kernel ran."""
+
+    pairs = [ ("translation", Matrix44.translation(1., 2., 3.),
+                              Matrix44.translation(4., 5., 6.)),
+              ("rotation", Matrix44.x_rotation(.1), Matrix44.z_rotation(.2)),
+              ("rigid", Matrix44.translation(1., 2., 3.),
+                        Matrix44.xyz_rotation(.1, .2, .3)),
+              ("affine", Matrix44.scale(2.), Matrix44.y_rotation(.3)) ]
+
+    print "%i products" % count
+    for name, lhs, rhs in pairs:
+        baseline_lhs = _BaselineMatrix44.clone(lhs)
+        baseline_rhs = _BaselineMatrix44.clone(rhs)
+        def baseline():
+            for _ in xrange(count):
+                baseline_lhs * baseline_rhs
+        def dispatched():
+            for _ in xrange(count):
+                lhs * rhs
+        print "  %-12s baseline %.3fs  dispatched %.3fs" % \
+            (name, best_time(baseline), best_time(dispatched))
+
+    matrix44.enable_kernel_counts()
+    matrix44.reset_kernel_counts()
+    for name, lhs, rhs in pairs:
+        (lhs * rhs).get_inverse()
+    matrix44.enable_kernel_counts(False)
+    print "  kernels", sorted( (k, v) for k, v in
+                               matrix44.kernel_counts.iteritems() if v )
+
+
+def bench_scene(count=10000, frames=10):
+    """Updates the world matrices of a tree of nodes where 1% of the nodes
+    move each frame, compared with recalculating every world matrix."""
+
+    random.seed(0)
+    root = TransformNode()
+    nodes = [root]
+    for i in xrange(count - 1):
+        node = TransformNode(nodes[i // 8])
+        node.set_translation(1., 0., 0.)
+        node.set_rotation(0., .1, 0.)
+        nodes.append(node)
+    root.get_world_buffer()
+    moving = count // 100
+
+    def dirty():
+        for frame in xrange(frames):
+            for node in random.sample(nodes, moving):
+                node.set_rotation(0., frame * .1, 0.)
+            root.update()
+
+    locals_ = [ node.get_local_matrix() for node in nodes ]
+    parent_index = dict( (node, i) for i, node in enumerate(nodes) )
+    parents = [ parent_index.get(node.parent) for node in nodes ]
+
+    def everything():
+        for frame in xrange(frames):
+            world = []
+            append = world.append
+            for local, parent in zip(locals_, parents):
+                if parent is None:
+                    append(local)
+                else:
+                    append(world[parent] * local)
+
+    print "%i nodes, %i moving, %i frames" % (count, moving, frames)
+    print "  dirty flags  %.3fs" % best_time(dirty, 1)
+    print "  recalculate  %.3fs" % best_time(everything, 1)
+
+
+def bench_trs(count=100000):
+    """Compares moving an object by composing three matrices with moving a
+    Transform, and transforming a point with each."""
+
+    def matrices():
+        for i in xrange(count):
+            m = Matrix44.translation(i, 0., 0.) * \
+                Matrix44.xyz_rotation(.1, .2, .3) * \
+                Matrix44.scale(2.)
+            m.transform((1., 2., 3.))
+
+    rotation = Quaternion.from_xyz_rotation(.1, .2, .3)
+    t = Transform((0., 0., 0.), rotation, 2.)
+    def transform():
+        for i in xrange(count):
+            t.set_translation(i, 0., 0.)
+            t.transform((1., 2., 3.))
+    def transform_matrix():
+        for i in xrange(count):
+            t.set_translation(i, 0., 0.)
+            t.get_matrix().transform((1., 2., 3.))
+
+    print "%i moves" % count
+    print "  Matrix44 product   %.3fs" % best_time(matrices, 1)
+    print "  Transform          %.3fs" % best_time(transform, 1)
+    print "  Transform matrix   %.3fs" % best_time(transform_matrix, 1)
+
+
+def bench_cull(count=20000):
+    """Compares culling spheres one at a time with Sphere.intersects, with
+    batch culling, and with coherent batch culling."""
+
+    random.seed(0)
+    view = Matrix44.y_rotation(.3)
+    frustum = Frustum(Matrix44.perspective_projection_fov(1., 1.5, 1., 100.) *
+                      view)
+    centres = [ ( random.uniform(-100., 100.),
+                  random.uniform(-20., 20.),
+                  random.uniform(-100., 100.) ) for _ in xrange(count) ]
+    radii = [ random.uniform(.5, 2.) for _ in xrange(count) ]
+    spheres = [ Sphere(c, r) for c, r in zip(centres, radii) ]
+    centre_array = Vector3Array.from_vectors(centres)
+    radius_array = array('d', radii)
+    cache = make_plane_cache(count)
+    frustum.cull_spheres(centre_array, radius_array, cache)
+
+    def one_at_a_time():
+        return [ s for s in spheres if s.intersects(frustum) ]
+    def batch():
+        frustum.cull_spheres(centre_array, radius_array)
+    def coherent():
+        frustum.cull_spheres(centre_array, radius_array, cache)
+
+    print "%i spheres" % count
+    print "  Sphere.intersects  %.3fs" % best_time(one_at_a_time)
+    print "  cull_spheres       %.3fs" % best_time(batch)
+    print "  coherent           %.3fs" % best_time(coherent)
+
+
+def bench_upload(count=10000):
+    """Compares packing matrices for the GPU with to_opengl (a list that must
+    be converted to 32 bit floats), with write_into, and with Matrix44f."""
+
+    matrices = [ Matrix44.translation(i, 0., 0.) for i in xrange(count) ]
+    matrices_f = [ Matrix44f.clone(m) for m in matrices ]
+    buffer = array('f', [0.]) * (count * 16)
+
+    def to_opengl():
+        for i, m in enumerate(matrices):
+            buffer[i*16:i*16+16] = array('f', m.to_opengl())
+    def write_into():
+        offset = 0
+        for m in matrices:
+            offset = m.write_into(buffer, offset)
+    def write_into_f():
+        offset = 0
+        for m in matrices_f:
+            offset = m.write_into(buffer, offset)
+
+    print "%i matrices" % count
+    print "  to_opengl            %.3fs" % best_time(to_opengl)
+    print "  write_into           %.3fs" % best_time(write_into)
+    print "  Matrix44f.write_into %.3fs" % best_time(write_into_f)
+
+
+def bench_stack(depth=6, branches=4):
+    """Compares a traversal that pushes copies of matrices on to a list with
+    one that uses a MatrixStack."""
+
+    local = Matrix44.xyz_rotation(.1, .2, .3)
+    local.translate = (1., 2., 3.)
+
+    def copies(matrices=[Matrix44()], level=0):
+        for _ in xrange(branches):
+            matrices.append(matrices[-1].copy())
+            matrices[-1].fast_mul(local)
+            if level < depth:
+                copies(matrices, level + 1)
+            matrices.pop()
+
+    stack = MatrixStack(depth + 2)
+    def matrix_stack(level=0):
+        for _ in xrange(branches):
+            stack.push()
+            stack.fast_mul(local)
+            if level < depth:
+                matrix_stack(level + 1)
+            stack.pop()
+
+    print "%i nodes" % sum(branches ** (i + 1) for i in xrange(depth + 1))
+    print "  list of copies     %.3fs" % best_time(copies)
+    print "  MatrixStack        %.3fs" % best_time(matrix_stack)
+
+
+def bench_rotation(count=100000, angles=64):
+    """Compares building rotation matrices for a small set of angles with
+    and without the sin/cos cache."""
+
+    random.seed(0)
+    step = 2. * util.pi / angles
+    values = [ random.randrange(angles) * step for _ in xrange(count) ]
+    m = Matrix44()
+    v = Vector2(1., 0.)
+
+    def rotations():
+        for angle in values:
+            m.make_z_rotation(angle)
+            v.rotate(angle)
+
+    print "%i rotations, %i different angles" % (count, angles)
+    print "  sin and cos        %.3fs" % best_time(rotations)
+    util.enable_sin_cos_cache()
+    print "  cache              %.3fs (hit rate %.2f)" % \
+        (best_time(rotations), util.get_sin_cos_hit_rate())
+    util.enable_sin_cos_cache(steps=angles)
+    print "  table              %.3fs" % best_time(rotations)
+    util.enable_sin_cos_cache(False)
+
+
+def bench_move(count=100000):
+    """Compares the old Matrix44.move (which built Vector3 objects for each
+    direction) with the in place version, and reading the translation with
+    the translate property and with a row view."""
+
+    m = Matrix44.xyz_rotation(.1, .2, .3)
+
+    def old_move():
+        for _ in xrange(count):
+            m.translate = Vector3(m.translate) + Vector3(m.forward) * .1
+            m.translate = Vector3(m.translate) + Vector3(m.right) * .1
+    def move():
+        for _ in xrange(count):
+            m.move(.1, .1)
+
+    view = m.row_view(3)
+    def read_property():
+        for _ in xrange(count):
+            x, y, z, _ = m.translate
+    def read_view():
+        for _ in xrange(count):
+            x, y, z, _ = view
+
+    print "%i moves" % count
+    print "  Vector3 move       %.3fs" % best_time(old_move)
+    print "  in place move      %.3fs" % best_time(move)
+    print "  translate property %.3fs" % best_time(read_property)
+    print "  row view           %.3fs" % best_time(read_view)
+
+
+def bench_project(count=50000):
+    """Compares projecting points to the screen one at a time with
+    transform4 (with a w divide and viewport mapping for each point), with
+    Viewport.project."""
+
+    random.seed(0)
+    view_projection = Matrix44.perspective_projection_fov(1., 1.5, 1., 100.) *\
+                      Matrix44.translation(0., 0., -50.)
+    viewport = Viewport(0, 0, 640, 480, view_projection)
+    points = [ ( random.uniform(-50., 50.),
+                 random.uniform(-50., 50.),
+                 random.uniform(-50., 50.) ) for _ in xrange(count) ]
+    packed = array('d', [ value for point in points for value in point ])
+    screen = array('d', [0.]) * (count * 2)
+    clip = array('B', [0]) * count
+    depth = array('d', [0.]) * count
+
+    def one_at_a_time():
+        ret = []
+        for x, y, z in points:
+            tx, ty, tz, tw = view_projection.transform4((x, y, z, 1.))
+            if tw <= 0. or tz < -tw:
+                ret.append(None)
+                continue
+            ret.append( ((tx / tw + 1.) * 320., (ty / tw + 1.) * 240.,
+                         tz / tw * .5 + .5) )
+        return ret
+    def project():
+        viewport.project(packed, screen, clip, depth)
+
+    print "%i points" % count
+    print "  transform4         %.3fs" % best_time(one_at_a_time)
+    print "  Viewport.project   %.3fs" % best_time(project)
+
+
+def bench_chain(count=50000):
+    """Compares projection * view * model with the * operator, with a
+    MatrixChain when the model moves every time, and with a MatrixChain when
+    nothing moves."""
+
+    projection = Matrix44.perspective_projection_fov(1., 1.5, 1., 100.)
+    view = Matrix44.xyz_rotation(.1, .2, .3)
+    view.translate = (1., 2., 3.)
+    model = Matrix44.translation(0., 0., -10.)
+    chain = MatrixChain(projection, view, model)
+    out = Matrix44()
+
+    def operator():
+        for i in xrange(count):
+            model.make_translation(i, 0., -10.)
+            out = projection * view * model
+    def moving():
+        for i in xrange(count):
+            model.make_translation(i, 0., -10.)
+            chain.evaluate(out)
+    def still():
+        for i in xrange(count):
+            chain.evaluate(out)
+
+    print "%i products" % count
+    print "  * operator         %.3fs" % best_time(operator)
+    print "  MatrixChain        %.3fs" % best_time(moving)
+    print "  unchanged chain    %.3fs" % best_time(still)
+
+
+def bench_orthonormalise(count=10000):
+    """Compares correcting drift in rotation matrices by rebuilding them
+    from angles, with Matrix44.orthonormalise, and with
+    Matrix44Array.orthonormalise."""
+
+    random.seed(0)
+    angles = [ ( random.uniform(0., 6.), random.uniform(0., 6.),
+                 random.uniform(0., 6.) ) for _ in xrange(count) ]
+    matrices = [ Matrix44.xyz_rotation(*a) for a in angles ]
+    matrix_array = Matrix44Array.from_matrices(matrices)
+
+    def rebuild():
+        for m, (x, y, z) in zip(matrices, angles):
+            m.make_xyz_rotation(x, y, z)
+    def orthonormalise():
+        for m in matrices:
+            m.orthonormalise()
+    def array_orthonormalise():
+        matrix_array.orthonormalise()
+
+    print "%i matrices" % count
+    print "  rebuild            %.3fs" % best_time(rebuild)
+    print "  orthonormalise     %.3fs" % best_time(orthonormalise)
+    print "  Matrix44Array      %.3fs" % best_time(array_orthonormalise)
+
+
+def bench_vector2array(count=20000):
+    """Compares moving, rotating and measuring a list of Vector2 objects
+    with the same operations on a Vector2Array."""
+
+    random.seed(0)
+    points = [ (random.uniform(-100., 100.), random.uniform(-100., 100.))
+               for _ in xrange(count) ]
+    angles = [ random.uniform(0., 6.) for _ in xrange(count) ]
+    vectors = [ Vector2(p) for p in points ]
+    vector_array = Vector2Array.from_vectors(points)
+    offset = Vector2(1., 2.)
+
+    def vector2():
+        moved = [ v + offset for v in vectors ]
+        for v, angle in zip(moved, angles):
+            v.rotate(angle)
+        return [ v.get_distance_to((0., 0.)) for v in moved ]
+    def array():
+        moved = vector_array + offset
+        moved.rotate(angles)
+        return moved.get_distance_to((0., 0.))
+
+    print "%i vectors" % count
+    print "  Vector2            %.3fs" % best_time(vector2)
+    print "  Vector2Array       %.3fs" % best_time(array)
+
+
+def bench_matrix33(count=20000):
+    """Compares transforming 2D points with a Matrix44 with a Matrix33, one
+    at a time and as a packed buffer."""
+
+    random.seed(0)
+    points = [ (random.uniform(-100., 100.), random.uniform(-100., 100.))
+               for _ in xrange(count) ]
+    packed = array('d', [ value for point in points for value in point ])
+    out = array('d', [0.]) * len(packed)
+    m44 = Matrix44.translation(1., 2., 0.) * Matrix44.z_rotation(.5)
+    m33 = Matrix33.translation(1., 2.) * Matrix33.rotation(.5)
+
+    def matrix44():
+        transform = m44.transform
+        return [ transform((x, y, 0.))[:2] for x, y in points ]
+    def matrix33():
+        transform = m33.transform
+        return [ transform(p) for p in points ]
+    def matrix33_packed():
+        m33.transform_sequence(packed, out)
+
+    print "%i points" % count
+    print "  Matrix44.transform %.3fs" % best_time(matrix44)
+    print "  Matrix33.transform %.3fs" % best_time(matrix33)
+    print "  packed buffer      %.3fs" % best_time(matrix33_packed)
+
+
+def bench_spatialhash(sizes=(1000, 10000, 100000), queries=100):
+    """Moves points around a SpatialHash and compares radius queries with a
+    loop over Vector2.get_distance_to. The world grows with the number of
+    points, so that the number found by each query stays about the same."""
+
+    random.seed(0)
+    for count in sizes:
+        size = (count * 100.) ** .5
+        positions = [ Vector2(random.uniform(0., size),
+                              random.uniform(0., size))
+                      for _ in xrange(count) ]
+        spatial_hash = SpatialHash(50.)
+        for i, position in enumerate(positions):
+            spatial_hash.insert(i, position)
+        centres = [ (random.uniform(0., size), random.uniform(0., size))
+                    for _ in xrange(queries) ]
+
+        def move():
+            for i, position in enumerate(positions):
+                position += (random.uniform(-1., 1.), random.uniform(-1., 1.))
+                spatial_hash.move(i, position)
+        def query():
+            for centre in centres:
+                spatial_hash.query_radius(centre, 50.)
+        def loop():
+            for centre in centres[:10]:
+                [ i for i, position in enumerate(positions)
+                  if position.get_distance_to(centre) <= 50. ]
+        def pairs():
+            spatial_hash.query_pairs(5.)
+
+        print "%i points" % count
+        print "  move all           %.3fs" % best_time(move, 1)
+        print "  radius query       %.3fms (get_distance_to loop %.3fms)" % \
+            ( best_time(query, 1) * 1000. / queries,
+              best_time(loop, 1) * 100. )
+        print "  pairs within 5     %.3fs" % best_time(pairs, 1)
+
+
+def bench_quadtree(sizes=(1000, 10000), queries=100):
+    """Moves circles of mixed sizes, clustered in a few parts of a large
+    world, around a LooseQuadTree. Times the candidate pairs for a frame and
+    compares a rectangle query with a loop over every circle."""
+
+    random.seed(0)
+    for count in sizes:
+        clusters = [ (random.uniform(0., 10000.), random.uniform(0., 10000.))
+                     for _ in xrange(8) ]
+        circles = []
+        for i in xrange(count):
+            cx, cy = random.choice(clusters)
+            circles.append( [ Vector2(random.gauss(cx, 200.),
+                                      random.gauss(cy, 200.)),
+                              random.choice((1., 2., 5., 20.)) ] )
+        tree = LooseQuadTree((0., 0.), (10000., 10000.), 10)
+        for i, (position, radius) in enumerate(circles):
+            tree.insert_circle(i, position, radius)
+        rects = []
+        for _ in xrange(queries):
+            x, y = circles[random.randrange(count)][0]
+            rects.append( ((x - 50., y - 50.), (x + 50., y + 50.)) )
+
+        def move():
+            for i, (position, radius) in enumerate(circles):
+                position += (random.uniform(-1., 1.), random.uniform(-1., 1.))
+                tree.move_circle(i, position)
+        def pairs():
+            tree.query_pairs()
+        def query():
+            for rect_min, rect_max in rects:
+                tree.query_rect(rect_min, rect_max)
+        def loop():
+            for (x0, y0), (x1, y1) in rects[:10]:
+                [ i for i, ((x, y), r) in enumerate(circles)
+                  if x + r >= x0 and x - r <= x1 and
+                     y + r >= y0 and y - r <= y1 ]
+        def raycast():
+            for rect_min, rect_max in rects:
+                tree.raycast(rect_min, (1., 1.), 500.)
+
+        print "%i circles" % count
+        print "  move all           %.3fs" % best_time(move, 1)
+        print "  candidate pairs    %.3fs" % best_time(pairs, 1)
+        print "  rect query         %.3fms (loop %.3fms)" % \
+            ( best_time(query, 1) * 1000. / queries,
+              best_time(loop, 1) * 100. )
+        print "  raycast            %.3fms" % \
+            (best_time(raycast, 1) * 1000. / queries)
+
+
+def bench_flocking(sizes=(1000, 10000), naive_count=500):
+    """Steps a Flock, with about 10 neighbours per agent, and compares the
+    steering with nested loops over Vector2 objects (timed on a smaller
+    flock and scaled up, as the loops are O(n*n))."""
+
+    random.seed(0)
+
+    def make(count):
+        size = (count * 283.) ** .5
+        positions = [ Vector2(random.uniform(0., size),
+                              random.uniform(0., size))
+                      for _ in xrange(count) ]
+        velocities = [ Vector2(random.uniform(-10., 10.),
+                               random.uniform(-10., 10.))
+                       for _ in xrange(count) ]
+        return positions, velocities
+
+    positions, velocities = make(naive_count)
+    def naive():
+        for position, velocity in zip(positions, velocities):
+            centre = Vector2()
+            average = Vector2()
+            push = Vector2()
+            n = 0
+            for other, other_velocity in zip(positions, velocities):
+                if other is position:
+                    continue
+                d = position.get_distance_to(other)
+                if d <= 30.:
+                    n += 1
+                    centre += other
+                    average += other_velocity
+                    if d < 15.:
+                        push += (position - other) * ((15. - d) / d)
+            if n:
+                force = push * 1.5 + (average / n - velocity) + \
+                        (centre / n - position)
+    naive_time = best_time(naive, 1)
+
+    for count in sizes:
+        positions, velocities = make(count)
+        flock = Flock(positions, velocities, 30.)
+        print "%i agents" % count
+        print "  step               %.3fs (nested loops %.1fs)" % \
+            ( best_time(lambda: flock.step(1. / 60.)),
+              naive_time * (float(count) / naive_count) ** 2 )
+        if batch.numpy is not None:
+            flock = Flock(Vector2Array.from_vectors(positions, True),
+                          Vector2Array.from_vectors(velocities, True), 30.)
+            print "  step (NumPy)       %.3fs" % \
+                best_time(lambda: flock.step(1. / 60.))
+
+
+BENCHMARKS = [ ("into", bench_into),
+               ("flat", bench_flat),
+               ("transform", bench_transform),
+               ("mul", bench_mul),
+               ("scene", bench_scene),
+               ("trs", bench_trs),
+               ("cull", bench_cull),
+               ("upload", bench_upload),
+               ("stack", bench_stack),
+               ("rotation", bench_rotation),
+               ("move", bench_move),
+               ("project", bench_project),
+               ("chain", bench_chain),
+               ("orthonormalise", bench_orthonormalise),
+               ("vector2array", bench_vector2array),
+               ("matrix33", bench_matrix33),
+               ("spatialhash", bench_spatialhash),
+               ("quadtree", bench_quadtree),
+               ("flocking", bench_flocking) ]
+
+
+if __name__ == "__main__":
+
+    names = sys.argv[1:]
+    for name, function in BENCHMARKS:
+        if not names or name in names:
+            print "--", name
+            function()
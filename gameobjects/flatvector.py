@@ -0,0 +1,815 @@
+"""Vector classes that store their components directly in slots.
+
+FlatVector3 and FlatVector2 have the same interface as Vector3 and Vector2,
+but keep x, y (and z) in the object itself rather than in a separate list.
+That makes each vector a single (smaller) object, and makes component access
+a plain attribute lookup. The one difference is that x, y and z are not
+converted to floats when they are assigned (division is always true
+division, so integer components divide the same way as in Vector3).
+
+"""
+
+from __future__ import division
+
+from math import sqrt
+from util import format_number
+
+
+class FlatVector3(object):
+
+    __slots__ = ('x', 'y', 'z')
+
+    _gameobjects_vector = 3
+
+
+    def __init__(self, *args):
+        """Creates a FlatVector3 from 3 numeric values or a list-like object
+        containing at least 3 values. No arguments result in a null vector.
+
+        """
+        if len(args) == 3:
+            x, y, z = args
+        elif not args:
+            self.x = self.y = self.z = 0.
+            return
+        elif len(args) == 1:
+            x, y, z = args[0][:3]
+        else:
+            raise ValueError("FlatVector3.__init__ takes 0, 1 or 3 parameters")
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+
+
+    @classmethod
+    def from_points(cls, p1, p2):
+
+        v = cls.__new__(cls, object)
+        ax, ay, az = p1
+        bx, by, bz = p2
+        v.x = bx-ax
+        v.y = by-ay
+        v.z = bz-az
+        return v
+
+    @classmethod
+    def from_floats(cls, x, y, z):
+        """Creates a FlatVector3 from individual float values.
+        Warning: There is no checking (for efficiency) here: x, y, z _must_ be
+        floats.
+
+        """
+        v = cls.__new__(cls, object)
+        v.x = x
+        v.y = y
+        v.z = z
+        return v
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a FlatVector3 from an iterable containing at least 3
+        values."""
+        next = iter(iterable).next
+        v = cls.__new__(cls, object)
+        v.x = float(next())
+        v.y = float(next())
+        v.z = float(next())
+        return v
+
+    @classmethod
+    def _from_float_sequence(cls, sequence):
+        v = cls.__new__(cls, object)
+        v.x, v.y, v.z = sequence[:3]
+        return v
+
+    def copy(self):
+        """Returns a copy of this vector."""
+
+        v = self.__new__(self.__class__, object)
+        v.x = self.x
+        v.y = self.y
+        v.z = self.z
+        return v
+
+    __copy__ = copy
+
+    def _get_length(self):
+        x = self.x; y = self.y; z = self.z
+        return sqrt(x*x + y*y + z*z)
+    def _set_length(self, length):
+        self.set_length(length)
+    length = property(_get_length, _set_length, None, "Length of the vector")
+
+    def unit(self):
+        """Returns a unit vector."""
+        x = self.x; y = self.y; z = self.z
+        l = sqrt(x*x + y*y + z*z)
+        return self.from_floats(x/l, y/l, z/l)
+
+    def set(self, x, y, z):
+        """Sets the components of this vector.
+        x -- x component
+        y -- y component
+        z -- z component
+
+        """
+        try:
+            self.x = x * 1.0
+            self.y = y * 1.0
+            self.z = z * 1.0
+        except TypeError:
+            raise TypeError("Must be a number")
+        return self
+
+
+    def __str__(self):
+
+        return "(%s, %s, %s)" % (format_number(self.x),
+                                 format_number(self.y),
+                                 format_number(self.z))
+
+    def __repr__(self):
+
+        return "FlatVector3(%s, %s, %s)" % (self.x, self.y, self.z)
+
+    def __len__(self):
+
+        return 3
+
+    def __iter__(self):
+        """Iterates the components in x, y, z order."""
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, index):
+        """Retrieves a component, given its index.
+
+        index -- 0, 1 or 2 for x, y or z
+
+        """
+        try:
+            return (self.x, self.y, self.z)[index]
+        except IndexError:
+            raise IndexError, "There are 3 values in this object, index should be 0, 1 or 2!"
+
+    def __setitem__(self, index, value):
+        """Sets a component, given its index.
+
+        index -- 0, 1 or 2 for x, y or z
+        value -- New (float) value of component
+
+        """
+        try:
+            value = 1.0 * value
+        except TypeError:
+            raise TypeError, "Must be a number"
+        if index == 0 or index == -3:
+            self.x = value
+        elif index == 1 or index == -2:
+            self.y = value
+        elif index == 2 or index == -1:
+            self.z = value
+        else:
+            raise IndexError, "There are 3 values in this object, index should be 0, 1 or 2!"
+
+
+    def __eq__(self, rhs):
+        """Test for equality
+
+        rhs -- Vector or sequence of 3 values
+
+        """
+        xx, yy, zz = rhs
+        return self.x==xx and self.y==yy and self.z==zz
+
+    def __ne__(self, rhs):
+        """Test of inequality
+
+        rhs -- Vector or sequenece of 3 values
+
+        """
+        xx, yy, zz = rhs
+        return self.x!=xx or self.y!=yy or self.z!=zz
+
+    def __hash__(self):
+
+        return hash((self.x, self.y, self.z))
+
+
+    def __add__(self, rhs):
+        """Returns the result of adding a vector (or collection of 3 numbers)
+        to this vector.
+
+        rhs -- Vector or sequence of 3 values
+
+        """
+        ox, oy, oz = rhs
+        return self.from_floats(self.x+ox, self.y+oy, self.z+oz)
+
+    def __iadd__(self, rhs):
+        """Adds another vector (or a collection of 3 numbers) to this vector.
+
+        rhs -- Vector or sequence of 3 values
+
+        """
+        ox, oy, oz = rhs
+        self.x += ox
+        self.y += oy
+        self.z += oz
+        return self
+
+    def __radd__(self, lhs):
+        """Adds vector to this vector (right version)
+
+        lhs -- Left hand side vector or sequence
+
+        """
+        ox, oy, oz = lhs
+        return self.from_floats(self.x+ox, self.y+oy, self.z+oz)
+
+    def __sub__(self, rhs):
+        """Returns the result of subtracting a vector (or collection of
+        3 numbers) from this vector.
+
+        rhs -- 3 values
+
+        """
+        ox, oy, oz = rhs
+        return self.from_floats(self.x-ox, self.y-oy, self.z-oz)
+
+    def __isub__(self, rhs):
+        """Subtracts another vector (or a collection of 3 numbers) from this
+        vector.
+
+        rhs -- Vector or sequence of 3 values
+
+        """
+        ox, oy, oz = rhs
+        self.x -= ox
+        self.y -= oy
+        self.z -= oz
+        return self
+
+    def __rsub__(self, lhs):
+        """Subtracts a vector (right version)
+
+        lhs -- Left hand side vector or sequence
+
+        """
+        ox, oy, oz = lhs
+        return self.from_floats(ox-self.x, oy-self.y, oz-self.z)
+
+    def scalar_mul(self, scalar):
+
+        self.x *= scalar
+        self.y *= scalar
+        self.z *= scalar
+
+    def vector_mul(self, vector):
+
+        x, y, z = vector
+        self.x *= x
+        self.y *= y
+        self.z *= z
+
+    def get_scalar_mul(self, scalar):
+
+        return self.from_floats(self.x*scalar, self.y*scalar, self.z*scalar)
+
+    def get_vector_mul(self, vector):
+
+        xx, yy, zz = vector
+        return self.from_floats(self.x*xx, self.y*yy, self.z*zz)
+
+    def __mul__(self, rhs):
+        """Return the result of multiplying this vector by another vector, or
+        a scalar (single number).
+
+        rhs -- Vector, sequence or single value.
+
+        """
+        if hasattr(rhs, "__getitem__"):
+            ox, oy, oz = rhs
+            return self.from_floats(self.x*ox, self.y*oy, self.z*oz)
+        else:
+            return self.from_floats(self.x*rhs, self.y*rhs, self.z*rhs)
+
+    def __imul__(self, rhs):
+        """Multiply this vector by another vector, or a scalar
+        (single number).
+
+        rhs -- Vector, sequence or single value.
+
+        """
+        if hasattr(rhs, "__getitem__"):
+            ox, oy, oz = rhs
+            self.x *= ox
+            self.y *= oy
+            self.z *= oz
+        else:
+            self.x *= rhs
+            self.y *= rhs
+            self.z *= rhs
+        return self
+
+    __rmul__ = __mul__
+
+    def __div__(self, rhs):
+        """Return the result of dividing this vector by another vector, or a
+        scalar (single number)."""
+        if hasattr(rhs, "__getitem__"):
+            ox, oy, oz = rhs
+            return self.from_floats(self.x/ox, self.y/oy, self.z/oz)
+        else:
+            return self.from_floats(self.x/rhs, self.y/rhs, self.z/rhs)
+
+    def __idiv__(self, rhs):
+        """Divide this vector by another vector, or a scalar (single number)."""
+        if hasattr(rhs, "__getitem__"):
+            ox, oy, oz = rhs
+            self.x /= ox
+            self.y /= oy
+            self.z /= oz
+        else:
+            self.x /= rhs
+            self.y /= rhs
+            self.z /= rhs
+        return self
+
+    def __rdiv__(self, lhs):
+
+        if hasattr(lhs, "__getitem__"):
+            ox, oy, oz = lhs
+            return self.from_floats(ox/self.x, oy/self.y, oz/self.z)
+        else:
+            return self.from_floats(lhs/self.x, lhs/self.y, lhs/self.z)
+
+    def scalar_div(self, scalar):
+
+        self.x /= scalar
+        self.y /= scalar
+        self.z /= scalar
+
+    def vector_div(self, vector):
+
+        x, y, z = vector
+        self.x /= x
+        self.y /= y
+        self.z /= z
+
+    def get_scalar_div(self, scalar):
+
+        return self.from_floats(self.x/scalar, self.y/scalar, self.z/scalar)
+
+    def get_vector_div(self, vector):
+
+        xx, yy, zz = vector
+        return self.from_floats(self.x/xx, self.y/yy, self.z/zz)
+
+    def __neg__(self):
+        """Returns the negation of this vector (a vector pointing in the
+        opposite direction)."""
+        return self.from_floats(-self.x, -self.y, -self.z)
+
+    def __pos__(self):
+
+        return self.copy()
+
+    def __nonzero__(self):
+
+        return bool(self.x or self.y or self.z)
+
+
+    def __call__(self, keys):
+        """Returns a tuple of the values in a vector
+
+        keys -- An iterable containing the keys (x, y or z)
+        eg v = FlatVector3(1.0, 2.0, 3.0)
+        v('zyx') -> (3.0, 2.0, 1.0)
+
+        """
+        v = (self.x, self.y, self.z)
+        ord_x = ord('x')
+        return tuple( v[ord(c)-ord_x] for c in keys )
+
+
+    def as_tuple(self):
+        """Returns a tuple of the x, y, z components."""
+
+        return (self.x, self.y, self.z)
+
+
+    def scale(self, scale):
+        """Scales the vector by onther vector or a scalar. Same as the
+        *= operator.
+
+        scale -- Value to scale the vector by
+
+        """
+        return self.__imul__(scale)
+
+
+    def get_length(self):
+        """Calculates the length of the vector."""
+
+        x = self.x; y = self.y; z = self.z
+        return sqrt(x*x + y*y + z*z)
+    get_magnitude = get_length
+
+    def set_length(self, new_length):
+        """Sets the length of the vector. (Normalises it then scales it)
+
+        new_length -- The new length of the vector.
+
+        """
+        x = self.x; y = self.y; z = self.z
+        try:
+            l = new_length / sqrt(x*x + y*y + z*z)
+        except ZeroDivisionError:
+            self.x = self.y = self.z = 0.0
+            return self
+        self.x = x*l
+        self.y = y*l
+        self.z = z*l
+        return self
+
+
+    def get_distance_to(self, p):
+        """Returns the distance of this vector to a point.
+
+        p -- A position as a vector, or collection of 3 values.
+
+        """
+        bx, by, bz = p
+        dx = self.x-bx
+        dy = self.y-by
+        dz = self.z-bz
+        return sqrt( dx*dx + dy*dy + dz*dz )
+
+    def get_distance_to_squared(self, p):
+        """Returns the squared distance of this vector to a point.
+
+        p -- A position as a vector, or collection of 3 values.
+
+        """
+        bx, by, bz = p
+        dx = self.x-bx
+        dy = self.y-by
+        dz = self.z-bz
+        return dx*dx + dy*dy + dz*dz
+
+
+    def normalise(self):
+        """Scales the vector to be length 1."""
+        x = self.x; y = self.y; z = self.z
+        l = sqrt(x*x + y*y + z*z)
+        try:
+            self.x = x / l
+            self.y = y / l
+            self.z = z / l
+        except ZeroDivisionError:
+            self.x = self.y = self.z = 0.0
+        return self
+    normalize = normalise
+
+    def get_normalised(self):
+
+        x = self.x; y = self.y; z = self.z
+        l = sqrt(x*x + y*y + z*z)
+        return self.from_floats(x/l, y/l, z/l)
+    get_normalized = get_normalised
+
+
+    def in_sphere(self, sphere):
+        """Returns true if this vector (treated as a position) is contained in
+        the given sphere.
+
+        """
+
+        sx, sy, sz = sphere.position
+        dx = self.x - sx
+        dy = self.y - sy
+        dz = self.z - sz
+        r = sphere.radius
+        return dx*dx + dy*dy + dz*dz <= r*r
+
+
+    def dot(self, other):
+        """Returns the dot product of this vector with another.
+
+        other -- A vector or tuple
+
+        """
+        ox, oy, oz = other
+        return self.x*ox + self.y*oy + self.z*oz
+
+    def cross(self, other):
+        """Returns the cross product of this vector with another.
+
+        other -- A vector or tuple
+
+        """
+        x = self.x; y = self.y; z = self.z
+        bx, by, bz = other
+        return self.from_floats( y*bz - by*z,
+                                 z*bx - bz*x,
+                                 x*by - bx*y )
+
+    def cross_tuple(self, other):
+        """Returns the cross product of this vector with another, as a tuple.
+
+        other -- A vector or tuple
+
+        """
+        x = self.x; y = self.y; z = self.z
+        bx, by, bz = other
+        return ( y*bz - by*z,
+                 z*bx - bz*x,
+                 x*by - bx*y )
+
+
+class FlatVector2(object):
+
+    __slots__ = ('x', 'y')
+
+    _gameobjects_vector = 2
+
+
+    def __init__(self, x=0., y=0.):
+        """Initialise a vector
+
+        @type x: number
+        @param x: The x value (defaults to 0.), or a container of 2 values
+        @type x: number
+        @param y: The y value (defaults to 0.)
+
+        """
+        if hasattr(x, "__getitem__"):
+            x, y = x
+        self.x = float(x)
+        self.y = float(y)
+
+    def _get_length(self):
+        x = self.x; y = self.y
+        return sqrt(x*x + y*y)
+    def _set_length(self, length):
+        x = self.x; y = self.y
+        try:
+            l = length / sqrt(x*x + y*y)
+        except ZeroDivisionError:
+            self.x = self.y = 0.0
+            return
+        self.x = x*l
+        self.y = y*l
+    length = property(_get_length, _set_length, None, "Length of the vector")
+
+
+    @classmethod
+    def from_floats(cls, x, y):
+        vec = cls.__new__(cls, object)
+        vec.x = x
+        vec.y = y
+        return vec
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a FlatVector2 object from an iterable.
+
+        @param iterable: An iterable of at least 2 numeric values
+
+        """
+        next = iter(iterable).next
+        vec = cls.__new__(cls, object)
+        vec.x = float(next())
+        vec.y = float(next())
+        return vec
+
+    @classmethod
+    def from_points(cls, p1, p2):
+        """Creates a FlatVector2 object between two points.
+        @param p1: First point
+        @param p2: Second point
+
+        """
+        v = cls.__new__(cls, object)
+        x, y = p1
+        xx, yy = p2
+        v.x = float(xx-x)
+        v.y = float(yy-y)
+        return v
+
+    @classmethod
+    def _from_float_sequence(cls, sequence):
+        v = cls.__new__(cls, object)
+        v.x, v.y = sequence[:2]
+        return v
+
+    def copy(self):
+        """Returns a copy of this object."""
+        vec = self.__new__(self.__class__, object)
+        vec.x = self.x
+        vec.y = self.y
+        return vec
+
+    def __str__(self):
+
+        return "(%s, %s)" % (format_number(self.x), format_number(self.y))
+
+    def __repr__(self):
+
+        return "FlatVector2(%s, %s)" % (self.x, self.y)
+
+    def __iter__(self):
+
+        return iter((self.x, self.y))
+
+    def __len__(self):
+
+        return 2
+
+    def __getitem__(self, index):
+        """Gets a component as though the vector were a list."""
+        try:
+            return (self.x, self.y)[index]
+        except IndexError:
+            raise IndexError, "There are 2 values in this object, index should be 0 or 1"
+
+    def __setitem__(self, index, value):
+        """Sets a component as though the vector were a list."""
+        try:
+            value = 1.0 * value
+        except TypeError:
+            raise TypeError, "Must be a number"
+        if index == 0 or index == -2:
+            self.x = value
+        elif index == 1 or index == -1:
+            self.y = value
+        else:
+            raise IndexError, "There are 2 values in this object, index should be 0 or 1!"
+
+    def __eq__(self, rhs):
+        xx, yy = rhs
+        return self.x == xx and self.y == yy
+
+    def __ne__(self, rhs):
+        xx, yy = rhs
+        return self.x != xx or self.y != yy
+
+    def __hash__(self):
+
+        return hash((self.x, self.y))
+
+    def __add__(self, rhs):
+        xx, yy = rhs
+        return self.from_floats(self.x+xx, self.y+yy)
+
+    def __iadd__(self, rhs):
+        xx, yy = rhs
+        self.x += xx
+        self.y += yy
+        return self
+
+    __radd__ = __add__
+
+    def __sub__(self, rhs):
+        xx, yy = rhs
+        return self.from_floats(self.x-xx, self.y-yy)
+
+    def __rsub__(self, lhs):
+        xx, yy = lhs
+        return self.from_floats(xx-self.x, yy-self.y)
+
+    def __isub__(self, rhs):
+        xx, yy = rhs
+        self.x -= xx
+        self.y -= yy
+        return self
+
+    def __mul__(self, rhs):
+        """Return the result of multiplying this vector with a scalar or a
+        vector-list object."""
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            return self.from_floats(self.x*xx, self.y*yy)
+        else:
+            return self.from_floats(self.x*rhs, self.y*rhs)
+
+    def __imul__(self, rhs):
+        """Multiplys this vector with a scalar or a vector-list object."""
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            self.x *= xx
+            self.y *= yy
+        else:
+            self.x *= rhs
+            self.y *= rhs
+        return self
+
+    __rmul__ = __mul__
+
+    def __div__(self, rhs):
+        """Return the result of dividing this vector by a scalar or a
+        vector-list object."""
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            return self.from_floats(self.x/xx, self.y/yy)
+        else:
+            return self.from_floats(self.x/rhs, self.y/rhs)
+
+    def __idiv__(self, rhs):
+        """Divides this vector with a scalar or a vector-list object."""
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            self.x /= xx
+            self.y /= yy
+        else:
+            self.x /= rhs
+            self.y /= rhs
+        return self
+
+    def __rdiv__(self, lhs):
+
+        if hasattr(lhs, "__getitem__"):
+            xx, yy = lhs
+        else:
+            xx = lhs
+            yy = lhs
+        return self.from_floats(xx/self.x, yy/self.y)
+
+    def __neg__(self):
+        """Return the negation of this vector."""
+        return self.from_floats(-self.x, -self.y)
+
+    def __pos__(self):
+
+        return self.copy()
+
+    def __nonzero__(self):
+
+        return bool(self.x or self.y)
+
+    def __call__(self, keys):
+        """Used to swizzle a vector.
+
+        @type keys: string
+        @param keys: A string containing a list of component names
+        >>> vec = FlatVector2(1, 2)
+        >>> vec('yx')
+        (2, 1)
+
+        """
+        v = (self.x, self.y)
+        ord_x = ord('x')
+        return tuple( v[ord(c) - ord_x] for c in keys )
+
+    def as_tuple(self):
+        """Converts this vector to a tuple.
+
+        @rtype: Tuple
+        @return: Tuple containing the vector components
+        """
+        return (self.x, self.y)
+
+    def get_length(self):
+        """Returns the length of this vector."""
+        x = self.x; y = self.y
+        return sqrt(x*x + y*y)
+    get_magnitude = get_length
+
+    def normalise(self):
+        """Normalises this vector."""
+        x = self.x; y = self.y
+        l = sqrt(x*x + y*y)
+        try:
+            self.x = x / l
+            self.y = y / l
+        except ZeroDivisionError:
+            self.x = self.y = 0.
+        return self
+    normalize = normalise
+
+    def get_normalised(self):
+        x = self.x; y = self.y
+        l = sqrt(x*x + y*y)
+        return self.from_floats(x/l, y/l)
+    get_normalized = get_normalised
+
+    def get_distance_to(self, p):
+        """Returns the distance to a point.
+
+        @param: A Vector2 or list-like object with at least 2 values.
+        @return: distance
+        """
+        xx, yy = p
+        dx = xx-self.x
+        dy = yy-self.y
+        return sqrt( dx*dx + dy*dy )
+
+
+if __name__ == "__main__":
+
+    v1 = FlatVector3(1, 2, 3)
+    print v1, repr(v1)
+    print v1('zyx'), v1[2], v1 + (1, 1, 1), 2 * v1
+    print v1.cross((0, 0, 1)), v1.get_normalised()
+    v2 = FlatVector2(3, 4)
+    print v2, v2('yx'), v2.length, v2.get_normalised()
@@ -0,0 +1,416 @@
+"""Flocking (separation, alignment and cohesion steering) for many agents.
+
+The positions and velocities of the agents are kept in two Vector2Arrays,
+which are updated in place by each step. Neighbours are found with a grid
+of cells the size of the neighbour radius, so the cost of a step depends on
+the number of agents and the number of neighbours each one has, not on the
+square of the number of agents. e.g.
+
+    flock = Flock(positions, velocities, radius=30.)
+    ...
+    flock.step(time_passed)
+    for x, y in flock.positions.as_tuples():
+        ...
+
+With the default arrays the grid is a SpatialHash that is updated as the
+agents move. If the arrays are NumPy arrays, the whole step (including the
+neighbour search) is vectorised, which is much quicker for large flocks.
+
+"""
+
+from math import sqrt
+from itertools import izip
+
+from batch import numpy
+from spatialhash import SpatialHash
+from vector2array import Vector2Array
+
+
+def _pairs_numpy(xs, ys, distance):
+    """Returns two NumPy index arrays, of the first and second points in
+    every pair of points within a distance of each other."""
+
+    if not len(xs):
+        # min and max raise on an empty array
+        return numpy.zeros(0, numpy.int64), numpy.zeros(0, numpy.int64)
+
+    scale = 1. / distance
+    cxs = numpy.floor(xs * scale).astype(numpy.int64)
+    cys = numpy.floor(ys * scale).astype(numpy.int64)
+    # Leave an empty column either side, so neighbouring keys don't wrap
+    cxs -= cxs.min() - 1
+    cys -= cys.min() - 1
+    width = int(cxs.max()) + 2
+    keys = cys * width + cxs
+
+    order = numpy.argsort(keys, kind='mergesort')
+    sorted_keys = keys[order]
+    ranks = numpy.arange(len(keys))
+    firsts = []
+    seconds = []
+
+    # Each pair of cells is visited once, by only looking 'forward'
+    for ox, oy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        targets = sorted_keys + (oy * width + ox)
+        if ox or oy:
+            lows = numpy.searchsorted(sorted_keys, targets, 'left')
+        else:
+            lows = ranks + 1
+        counts = numpy.searchsorted(sorted_keys, targets, 'right') - lows
+        counts = numpy.maximum(counts, 0)
+        total = int(counts.sum())
+        starts = numpy.cumsum(counts) - counts
+        firsts.append(order[numpy.repeat(ranks, counts)])
+        seconds.append(order[numpy.repeat(lows - starts, counts) +
+                             numpy.arange(total)])
+
+    i = numpy.concatenate(firsts)
+    j = numpy.concatenate(seconds)
+    dx = xs[j] - xs[i]
+    dy = ys[j] - ys[i]
+    near = dx*dx + dy*dy <= distance * distance
+    return i[near], j[near]
+
+
+class Flock(object):
+
+    __slots__ = ( '_positions',
+                  '_velocities',
+                  '_radius',
+                  '_separation_distance',
+                  '_weights',
+                  '_max_speed',
+                  '_max_force',
+                  '_spatial_hash' )
+
+    def __init__(self, positions, velocities, radius=30.,
+                 separation_distance=None, max_speed=100., max_force=100.):
+        """Creates a flock.
+
+        positions -- A Vector2Array of agent positions (or a sequence of
+        vectors)
+        velocities -- A Vector2Array of agent velocities (or a sequence of
+        vectors)
+        radius -- Agents closer than this are neighbours
+        separation_distance -- Neighbours closer than this are pushed apart,
+        if None half the radius is used
+        max_speed -- Maximum speed of an agent
+        max_force -- Maximum steering acceleration of an agent
+
+        """
+
+        if not isinstance(positions, Vector2Array):
+            positions = Vector2Array.from_vectors(positions)
+        if not isinstance(velocities, Vector2Array):
+            velocities = Vector2Array.from_vectors(velocities)
+        if len(positions) != len(velocities):
+            raise ValueError("There must be a velocity for each position")
+        if radius <= 0.:
+            raise ValueError("Radius must be greater than zero")
+
+        self._positions = positions
+        self._velocities = velocities
+        self._radius = float(radius)
+        if separation_distance is None:
+            separation_distance = radius * .5
+        self._separation_distance = float(separation_distance)
+        self._weights = (1.5, 1., 1.)
+        self.set_limits(max_speed, max_force)
+
+        if self._use_numpy():
+            self._spatial_hash = None
+        else:
+            self._spatial_hash = SpatialHash(radius)
+            insert = self._spatial_hash.insert
+            for index, position in enumerate(positions.as_tuples()):
+                insert(index, position)
+
+
+    def _get_positions(self):
+        return self._positions
+    positions = property(_get_positions, None, None,
+                         "Vector2Array of positions (updated in place).")
+
+    def _get_velocities(self):
+        return self._velocities
+    velocities = property(_get_velocities, None, None,
+                          "Vector2Array of velocities (updated in place).")
+
+    def _get_radius(self):
+        return self._radius
+    radius = property(_get_radius, None, None, "Neighbour radius.")
+
+
+    def __len__(self):
+
+        return len(self._positions)
+
+
+    def _use_numpy(self):
+        xs = self._positions.get_components()[0]
+        return numpy is not None and isinstance(xs, numpy.ndarray)
+
+
+    def set_weights(self, separation=1.5, alignment=1., cohesion=1.):
+        """Sets the weight of each steering behaviour.
+
+        separation -- Weight of the push away from close neighbours
+        alignment -- Weight of the pull towards the average velocity of the
+        neighbours
+        cohesion -- Weight of the pull towards the centre of the neighbours
+
+        """
+
+        self._weights = (float(separation), float(alignment), float(cohesion))
+        return self
+
+
+    def set_limits(self, max_speed, max_force):
+        """Sets the maximum speed and steering acceleration of the agents.
+
+        max_speed -- Maximum speed
+        max_force -- Maximum steering acceleration
+
+        """
+
+        self._max_speed = float(max_speed)
+        self._max_force = float(max_force)
+        return self
+
+
+    def refresh(self):
+        """Updates the neighbour grid from the positions. Only needed if the
+        positions are changed other than by step."""
+
+        if self._spatial_hash is None:
+            return
+        move = self._spatial_hash.move
+        xs, ys = self._positions.get_components()
+        for index, x, y in izip(xrange(len(xs)), xs, ys):
+            move(index, (x, y))
+
+
+    def get_neighbours(self, index):
+        """Returns a list of the indices of the neighbours of an agent.
+
+        index -- Index of the agent
+
+        """
+
+        xs, ys = self._positions.get_components()
+        x = xs[index]
+        y = ys[index]
+        if self._spatial_hash is None:
+            dx = xs - x
+            dy = ys - y
+            near = numpy.flatnonzero(dx*dx + dy*dy <= self._radius ** 2)
+            return [ other for other in near.tolist() if other != index ]
+        near = self._spatial_hash.query_radius((x, y), self._radius)
+        return [ other for other in near if other != index ]
+
+
+    def get_steering(self):
+        """Returns the steering accelerations of every agent, as a
+        Vector2Array. The acceleration of each agent is clamped to the
+        maximum force."""
+
+        if self._spatial_hash is None:
+            fxs, fys = self._steering_numpy()
+            return Vector2Array.from_components(fxs, fys, True)
+        fxs, fys = self._steering()
+        return Vector2Array.from_components(fxs, fys)
+
+
+    def _steering(self):
+        """Returns two lists of the x and y steering accelerations."""
+
+        xs, ys = self._positions.get_components()
+        vxs, vys = self._velocities.get_components()
+        xs = xs.tolist()
+        ys = ys.tolist()
+        vxs = vxs.tolist()
+        vys = vys.tolist()
+        count = len(xs)
+        separation_distance = self._separation_distance
+        separation2 = separation_distance * separation_distance
+
+        # Sums over the neighbours of each agent, of the offset to the
+        # neighbour, its velocity, and the push away from it
+        neighbours = [0] * count
+        offset_xs = [0.] * count
+        offset_ys = [0.] * count
+        velocity_xs = [0.] * count
+        velocity_ys = [0.] * count
+        push_xs = [0.] * count
+        push_ys = [0.] * count
+
+        for i, j in self._spatial_hash.query_pairs(self._radius):
+            dx = xs[j] - xs[i]
+            dy = ys[j] - ys[i]
+            neighbours[i] += 1
+            neighbours[j] += 1
+            offset_xs[i] += dx
+            offset_ys[i] += dy
+            offset_xs[j] -= dx
+            offset_ys[j] -= dy
+            velocity_xs[i] += vxs[j]
+            velocity_ys[i] += vys[j]
+            velocity_xs[j] += vxs[i]
+            velocity_ys[j] += vys[i]
+            d2 = dx*dx + dy*dy
+            if d2 < separation2 and d2:
+                # Proportional to how far inside the separation distance
+                d = sqrt(d2)
+                push = (separation_distance - d) / d
+                dx *= push
+                dy *= push
+                push_xs[i] -= dx
+                push_ys[i] -= dy
+                push_xs[j] += dx
+                push_ys[j] += dy
+
+        separation, alignment, cohesion = self._weights
+        max_force = self._max_force
+        max_force2 = max_force * max_force
+        fxs = []
+        fys = []
+        append_x = fxs.append
+        append_y = fys.append
+
+        for n, ox, oy, ax, ay, px, py, vx, vy in izip( neighbours,
+                                                       offset_xs, offset_ys,
+                                                       velocity_xs,
+                                                       velocity_ys,
+                                                       push_xs, push_ys,
+                                                       vxs, vys ):
+            if not n:
+                append_x(0.)
+                append_y(0.)
+                continue
+            scale = 1. / n
+            fx = separation * px + \
+                 alignment * (ax * scale - vx) + \
+                 cohesion * ox * scale
+            fy = separation * py + \
+                 alignment * (ay * scale - vy) + \
+                 cohesion * oy * scale
+            f2 = fx*fx + fy*fy
+            if f2 > max_force2:
+                scale = max_force / sqrt(f2)
+                fx *= scale
+                fy *= scale
+            append_x(fx)
+            append_y(fy)
+
+        return fxs, fys
+
+
+    def _steering_numpy(self):
+
+        xs, ys = self._positions.get_components()
+        vxs, vys = self._velocities.get_components()
+        count = len(xs)
+        separation_distance = self._separation_distance
+        bincount = numpy.bincount
+
+        i, j = _pairs_numpy(xs, ys, self._radius)
+        dx = xs[j] - xs[i]
+        dy = ys[j] - ys[i]
+        d = numpy.sqrt(dx*dx + dy*dy)
+        inside = (d < separation_distance) & (d > 0.)
+        push = numpy.where(inside,
+                           (separation_distance - d) /
+                           numpy.where(inside, d, 1.),
+                           0.)
+
+        def gather(weights_i, weights_j):
+            return bincount(i, weights_i, count) + \
+                   bincount(j, weights_j, count)
+
+        neighbours = gather(None, None)
+        scale = 1. / numpy.maximum(neighbours, 1)
+        separation, alignment, cohesion = self._weights
+        has_neighbours = neighbours > 0
+
+        fxs = numpy.where( has_neighbours,
+                           separation * gather(-dx * push, dx * push) +
+                           alignment * (gather(vxs[j], vxs[i]) * scale - vxs) +
+                           cohesion * gather(dx, -dx) * scale,
+                           0. )
+        fys = numpy.where( has_neighbours,
+                           separation * gather(-dy * push, dy * push) +
+                           alignment * (gather(vys[j], vys[i]) * scale - vys) +
+                           cohesion * gather(dy, -dy) * scale,
+                           0. )
+
+        f = numpy.sqrt(fxs*fxs + fys*fys)
+        over = f > self._max_force
+        scale = numpy.where(over, self._max_force / numpy.where(over, f, 1.),
+                            1.)
+        return fxs * scale, fys * scale
+
+
+    def step(self, time_passed):
+        """Applies the steering accelerations, clamps the speeds and moves
+        the agents (all in place).
+
+        time_passed -- Time since the last step, in seconds
+
+        """
+
+        xs, ys = self._positions.get_components()
+        vxs, vys = self._velocities.get_components()
+        max_speed = self._max_speed
+
+        if self._spatial_hash is None:
+            fxs, fys = self._steering_numpy()
+            vxs += fxs * time_passed
+            vys += fys * time_passed
+            speed = numpy.sqrt(vxs*vxs + vys*vys)
+            over = speed > max_speed
+            scale = numpy.where(over, max_speed / numpy.where(over, speed, 1.),
+                                1.)
+            vxs *= scale
+            vys *= scale
+            xs += vxs * time_passed
+            ys += vys * time_passed
+            return
+
+        fxs, fys = self._steering()
+        max_speed2 = max_speed * max_speed
+        move = self._spatial_hash.move
+
+        for index, x, y, vx, vy, fx, fy in izip( xrange(len(xs)),
+                                                 xs, ys, vxs, vys, fxs, fys ):
+            vx += fx * time_passed
+            vy += fy * time_passed
+            speed2 = vx*vx + vy*vy
+            if speed2 > max_speed2:
+                scale = max_speed / sqrt(speed2)
+                vx *= scale
+                vy *= scale
+            x += vx * time_passed
+            y += vy * time_passed
+            vxs[index] = vx
+            vys[index] = vy
+            xs[index] = x
+            ys[index] = y
+            move(index, (x, y))
+
+
+if __name__ == "__main__":
+
+    import random
+
+    random.seed(0)
+    positions = [ (random.uniform(0., 100.), random.uniform(0., 100.))
+                  for _ in xrange(50) ]
+    velocities = [ (random.uniform(-10., 10.), random.uniform(-10., 10.))
+                   for _ in xrange(50) ]
+    flock = Flock(positions, velocities, radius=30., max_speed=20.)
+    print flock.get_neighbours(0)
+    for _ in xrange(100):
+        flock.step(.1)
+    # Aligned agents have similar velocities
+    print flock.velocities.get_centre()
+    print max(flock.velocities.get_lengths())
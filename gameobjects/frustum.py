@@ -0,0 +1,330 @@
+"""View frustum culling.
+
+A Frustum is extracted from a view-projection Matrix44, and tests
+spheres and axis aligned boxes against its six planes. Whole batches of
+shapes can be culled in one call, with the centres (or corners) in a
+Vector3Array and the radii in an array.
+
+For coherent culling, pass a plane cache (see make_plane_cache) to the batch
+methods. The plane that rejected each shape is remembered and tested first
+next time, which usually rejects a shape that was invisible last frame with
+a single plane test.
+
+"""
+
+from array import array
+from itertools import izip
+from math import sqrt
+
+import batch
+
+
+( PLANE_LEFT,
+  PLANE_RIGHT,
+  PLANE_BOTTOM,
+  PLANE_TOP,
+  PLANE_NEAR,
+  PLANE_FAR ) = range(6)
+
+
+def make_plane_cache(count):
+    """Returns a plane cache for coherent culling of a batch of shapes.
+
+    count -- Number of shapes in the batch
+
+    """
+
+    return array('B', [0]) * count
+
+
+def _is_numpy(values):
+    numpy = batch.numpy
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+class Frustum(object):
+
+    __slots__ = ('_planes',)
+
+    def __init__(self, matrix=None):
+        """Creates a Frustum.
+
+        matrix -- A view-projection Matrix44 (projection * view, i.e. points
+        are transformed by the view then projected), or None to create a
+        frustum that contains everything
+
+        """
+
+        if matrix is None:
+            self._planes = [(0., 0., 0., 1.)] * 6
+        else:
+            self.set_matrix(matrix)
+
+
+    def set_matrix(self, matrix):
+        """Extracts the planes from a view-projection Matrix44. Call once a
+        frame to re-use the same Frustum as the camera moves.
+
+        matrix -- A view-projection Matrix44
+
+        """
+
+        m0,  m1,  m2,  m3, \
+        m4,  m5,  m6,  m7, \
+        m8,  m9,  m10, m11, \
+        m12, m13, m14, m15 = matrix.components()
+
+        # Points are row vectors, so the clip coordinates come from the
+        # columns of the matrix
+        planes = ( (m3 + m0,  m7 + m4,  m11 + m8,  m15 + m12),
+                   (m3 - m0,  m7 - m4,  m11 - m8,  m15 - m12),
+                   (m3 + m1,  m7 + m5,  m11 + m9,  m15 + m13),
+                   (m3 - m1,  m7 - m5,  m11 - m9,  m15 - m13),
+                   (m3 + m2,  m7 + m6,  m11 + m10, m15 + m14),
+                   (m3 - m2,  m7 - m6,  m11 - m10, m15 - m14) )
+
+        self._planes = []
+        for a, b, c, d in planes:
+            l = 1. / sqrt(a*a + b*b + c*c)
+            self._planes.append( (a*l, b*l, c*l, d*l) )
+        return self
+
+
+    def get_planes(self):
+        """Returns a list of the six planes, as (a, b, c, d) tuples where
+        a*x + b*y + c*z + d is the distance of a point inside the plane
+        (negative if the point is outside)."""
+
+        return self._planes[:]
+
+
+    def __str__(self):
+
+        return "Frustum(%s)" % ", ".join( "(%g, %g, %g, %g)" % plane
+                                          for plane in self._planes )
+
+
+    def contains_point(self, point):
+        """Returns True if a point is inside the frustum.
+
+        point -- A vector (or sequence of 3 values)
+
+        """
+
+        x, y, z = point
+        for a, b, c, d in self._planes:
+            if a*x + b*y + c*z + d < 0.:
+                return False
+        return True
+
+    __contains__ = contains_point
+
+
+    def intersects_sphere(self, sphere):
+        """Returns True if a Sphere is inside (or partly inside) the frustum.
+        Also called by Sphere.intersects.
+
+        sphere -- A Sphere
+
+        """
+
+        x, y, z = sphere.position
+        return self.test_sphere((x, y, z), sphere.radius)
+
+
+    def test_sphere(self, centre, radius):
+        """Returns True if a sphere is inside (or partly inside) the frustum.
+
+        centre -- Centre of the sphere
+        radius -- Radius of the sphere
+
+        """
+
+        x, y, z = centre
+        r = -radius
+        for a, b, c, d in self._planes:
+            if a*x + b*y + c*z + d < r:
+                return False
+        return True
+
+
+    def test_box(self, box_min, box_max):
+        """Returns True if an axis aligned box is inside (or partly inside)
+        the frustum. Boxes near the corners of the frustum may be reported as
+        visible when they are not (which is the same for all box culling with
+        planes).
+
+        box_min -- Corner of the box with the lowest x, y and z
+        box_max -- Corner of the box with the highest x, y and z
+
+        """
+
+        x0, y0, z0 = box_min
+        x1, y1, z1 = box_max
+        for a, b, c, d in self._planes:
+            # Test the corner furthest along the plane normal
+            if a * (x1 if a >= 0. else x0) + \
+               b * (y1 if b >= 0. else y0) + \
+               c * (z1 if c >= 0. else z0) + d < 0.:
+                return False
+        return True
+
+
+    def _cull_spheres_numpy(self, xs, ys, zs, radii, cache):
+
+        numpy = batch.numpy
+        planes = numpy.array(self._planes)
+        centres = numpy.vstack((xs, ys, zs))
+        distances = numpy.dot(planes[:, :3], centres) + planes[:, 3:]
+        outside = distances < -numpy.asarray(radii)
+        return self._mask_numpy(outside, cache)
+
+
+    def _mask_numpy(self, outside, cache):
+
+        numpy = batch.numpy
+        visible = ~outside.any(axis=0)
+        if cache is not None:
+            # Vectorised tests check every plane, the cache is only updated
+            rejected = numpy.flatnonzero(~visible)
+            failed = outside[:, rejected].argmax(axis=0)
+            for index, plane in izip(rejected, failed):
+                cache[index] = plane
+        return visible
+
+
+    def cull_spheres(self, centres, radii, cache=None):
+        """Tests a batch of spheres, and returns a mask with 1 (or True) for
+        each visible sphere. The mask is an array('B'), or a NumPy bool array
+        if the centres are stored in NumPy arrays.
+
+        centres -- A Vector3Array of sphere centres
+        radii -- A sequence of radii (one per sphere)
+        cache -- Plane cache from make_plane_cache, for coherent culling
+
+        """
+
+        xs, ys, zs = centres.get_components()
+        if len(radii) != len(xs):
+            raise ValueError("There must be one radius for each sphere")
+        if _is_numpy(xs):
+            return self._cull_spheres_numpy(xs, ys, zs, radii, cache)
+
+        planes = self._planes
+        mask = array('B', [1]) * len(xs)
+
+        if cache is None:
+            for index, x, y, z, r in izip(xrange(len(xs)), xs, ys, zs, radii):
+                r = -r
+                for a, b, c, d in planes:
+                    if a*x + b*y + c*z + d < r:
+                        mask[index] = 0
+                        break
+            return mask
+
+        for index, x, y, z, r in izip(xrange(len(xs)), xs, ys, zs, radii):
+            r = -r
+            last = cache[index]
+            a, b, c, d = planes[last]
+            if a*x + b*y + c*z + d < r:
+                mask[index] = 0
+                continue
+            for plane_index, (a, b, c, d) in enumerate(planes):
+                if plane_index != last and a*x + b*y + c*z + d < r:
+                    mask[index] = 0
+                    cache[index] = plane_index
+                    break
+        return mask
+
+
+    def cull_boxes(self, box_mins, box_maxs, cache=None):
+        """Tests a batch of axis aligned boxes, and returns a mask with 1 (or
+        True) for each visible box. The mask is an array('B'), or a NumPy
+        bool array if the corners are stored in NumPy arrays.
+
+        box_mins -- A Vector3Array of the minimum corners
+        box_maxs -- A Vector3Array of the maximum corners
+        cache -- Plane cache from make_plane_cache, for coherent culling
+
+        """
+
+        mins = box_mins.get_components()
+        maxs = box_maxs.get_components()
+        if len(mins[0]) != len(maxs[0]):
+            raise ValueError("There must be a maximum for each minimum")
+
+        if _is_numpy(mins[0]):
+            # The corner to test against each plane depends only on the
+            # direction of the plane normal
+            numpy = batch.numpy
+            outside = numpy.array([ a * (maxs[0] if a >= 0. else mins[0]) +
+                                    b * (maxs[1] if b >= 0. else mins[1]) +
+                                    c * (maxs[2] if c >= 0. else mins[2]) +
+                                    d < 0.
+                                    for a, b, c, d in self._planes ])
+            return self._mask_numpy(outside, cache)
+
+        planes = self._planes
+        x0s, y0s, z0s = mins
+        x1s, y1s, z1s = maxs
+        mask = array('B', [1]) * len(x0s)
+
+        for index, x0, y0, z0, x1, y1, z1 in izip( xrange(len(x0s)),
+                                                   x0s, y0s, z0s,
+                                                   x1s, y1s, z1s ):
+            if cache is not None:
+                last = cache[index]
+                a, b, c, d = planes[last]
+                if a * (x1 if a >= 0. else x0) + \
+                   b * (y1 if b >= 0. else y0) + \
+                   c * (z1 if c >= 0. else z0) + d < 0.:
+                    mask[index] = 0
+                    continue
+            for plane_index, (a, b, c, d) in enumerate(planes):
+                if a * (x1 if a >= 0. else x0) + \
+                   b * (y1 if b >= 0. else y0) + \
+                   c * (z1 if c >= 0. else z0) + d < 0.:
+                    mask[index] = 0
+                    if cache is not None:
+                        cache[index] = plane_index
+                    break
+        return mask
+
+
+    def visible_spheres(self, centres, radii, cache=None):
+        """Tests a batch of spheres, and returns a list of the indices of
+        the visible spheres. See cull_spheres."""
+
+        mask = self.cull_spheres(centres, radii, cache)
+        return [ index for index, visible in enumerate(mask) if visible ]
+
+
+    def visible_boxes(self, box_mins, box_maxs, cache=None):
+        """Tests a batch of axis aligned boxes, and returns a list of the
+        indices of the visible boxes. See cull_boxes."""
+
+        mask = self.cull_boxes(box_mins, box_maxs, cache)
+        return [ index for index, visible in enumerate(mask) if visible ]
+
+
+if __name__ == "__main__":
+
+    from math import radians
+    from matrix44 import Matrix44
+    from vector3array import Vector3Array
+    from sphere import Sphere
+
+    projection = Matrix44.perspective_projection_fov(radians(60), 1.5, 1., 100.)
+    frustum = Frustum(projection)
+    print frustum
+
+    print Sphere((0, 0, -10), 1).intersects(frustum)
+    print Sphere((0, 0, 10), 1).intersects(frustum)
+
+    centres = Vector3Array.from_vectors([ (0, 0, -10),
+                                          (0, 0, 10),
+                                          (50, 0, -10),
+                                          (0, 0, -200) ])
+    cache = make_plane_cache(len(centres))
+    print frustum.visible_spheres(centres, [1.] * 4, cache)
+    print list(cache)
@@ -0,0 +1,496 @@
+"""2D affine transforms.
+
+A Matrix33 transforms 2D points with a rotation, scale, skew and
+translation. It works like Matrix44 (points are row vectors, and A * B does
+B then A), but as the right column is always (0, 0, 1) only the 6 values
+that can change are stored, and a point is transformed with 4 multiplies.
+
+"""
+
+from math import sin, cos
+
+from util import format_number
+import util
+from vector2 import Vector2
+from batch import numpy
+
+
+class Matrix33Error(Exception):
+
+    """Matrix33 Exception class"""
+
+    def __init__(self, code, description):
+        Exception.__init__(self)
+        self.code = code
+        self.description = description
+
+    def __str__(self):
+        return "%s (%s)" % (self.description, self.code)
+
+
+def _mul(m1, m2):
+    """Returns the values of m1 * m2 (m2 applied first)."""
+
+    a0, a1, a2, a3, a4, a5 = m1
+    b0, b1, b2, b3, b4, b5 = m2
+    return [ b0 * a0 + b1 * a2,
+             b0 * a1 + b1 * a3,
+             b2 * a0 + b3 * a2,
+             b2 * a1 + b3 * a3,
+             b4 * a0 + b5 * a2 + a4,
+             b4 * a1 + b5 * a3 + a5 ]
+
+
+class Matrix33(object):
+
+    __slots__ = ('_m',)
+
+    def __init__(self, *args):
+
+        """If no parameters are given, the Matrix33 is initialised to
+        identity. If 3 parameters are given they should be the x axis, y axis
+        and translation rows (each 2 values, any third value is ignored).
+
+        """
+
+        if not args:
+            self._m = [1., 0.,
+                       0., 1.,
+                       0., 0.]
+        elif len(args) == 3:
+            self._m = []
+            for row in args:
+                x, y = tuple(row)[:2]
+                self._m += [float(x), float(y)]
+        else:
+            raise TypeError("Matrix33.__init__() takes 0, or 3 arguments (%i given)" % len(args))
+
+
+    @classmethod
+    def _from_values(cls, values):
+        m = cls.__new__(cls, object)
+        m._m = values
+        return m
+
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a Matrix33 from an iterable of 6 values (the first two
+        columns), or 9 values (the right column is ignored)."""
+
+        values = map(float, iterable)
+        if len(values) == 9:
+            del values[8], values[5], values[2]
+        elif len(values) != 6:
+            raise ValueError("Iterable must have 6 or 9 values")
+        return cls._from_values(values)
+
+
+    @classmethod
+    def clone(cls, copy_Matrix33):
+        """Creates a Matrix33 that is a copy of another."""
+
+        return cls._from_values(copy_Matrix33._m[:])
+
+
+    @classmethod
+    def identity(cls):
+        """Creates an identity Matrix33."""
+
+        return cls()
+
+
+    @classmethod
+    def translation(cls, x, y):
+        """Creates a translation Matrix33."""
+
+        return cls._from_values([1.,       0.,
+                                 0.,       1.,
+                                 float(x), float(y)])
+
+
+    @classmethod
+    def rotation(cls, angle):
+        """Creates a Matrix33 that rotates anti-clockwise (if y is up).
+
+        angle -- Angle of rotation (in radians)
+
+        """
+
+        m = cls.__new__(cls, object)
+        return m.make_rotation(angle)
+
+
+    @classmethod
+    def scale(cls, scale_x, scale_y=None):
+        """Creates a scale Matrix33. If one scale is given it is used for
+        both axis."""
+
+        if scale_y is None:
+            scale_y = scale_x
+        return cls._from_values([float(scale_x), 0.,
+                                 0.,             float(scale_y),
+                                 0.,             0.])
+
+
+    def make_identity(self):
+        """Makes an identity Matrix33."""
+
+        self._m = [1., 0.,
+                   0., 1.,
+                   0., 0.]
+        return self
+
+
+    def make_copy(self, other):
+        """Makes a copy of another Matrix33."""
+
+        self._m = other._m[:]
+        return self
+
+
+    def make_translation(self, x, y):
+        """Makes a translation Matrix33."""
+
+        self._m = [1.,       0.,
+                   0.,       1.,
+                   float(x), float(y)]
+        return self
+
+
+    def make_rotation(self, angle):
+        """Makes a Matrix33 that rotates anti-clockwise (if y is up)."""
+
+        if util.sin_cos_cached:
+            sin_a, cos_a = util.sin_cos(angle)
+        else:
+            sin_a = sin(angle)
+            cos_a = cos(angle)
+
+        self._m = [ cos_a, sin_a,
+                   -sin_a, cos_a,
+                    0.,    0.]
+        return self
+
+
+    def make_scale(self, scale_x, scale_y=None):
+        """Makes a scale Matrix33."""
+
+        if scale_y is None:
+            scale_y = scale_x
+        self._m = [float(scale_x), 0.,
+                   0.,             float(scale_y),
+                   0.,             0.]
+        return self
+
+
+    def make_transform(self, translation, angle, scale=1.):
+        """Makes a Matrix33 that scales, then rotates, then translates (the
+        usual transform of a sprite).
+
+        translation -- A vector (or sequence of 2 values)
+        angle -- Angle of rotation (in radians)
+        scale -- Scale to apply to both axis
+
+        """
+
+        if util.sin_cos_cached:
+            s, c = util.sin_cos(angle)
+        else:
+            s = sin(angle)
+            c = cos(angle)
+        s *= scale
+        c *= scale
+        x, y = translation
+        self._m = [ c,        s,
+                   -s,        c,
+                    float(x), float(y)]
+        return self
+
+
+    def copy(self):
+        """Returns a copy of this matrix."""
+
+        return self._from_values(self._m[:])
+
+    __copy__ = copy
+
+
+    def components(self):
+        """Returns an iterator over the 9 values of the matrix, including
+        the right column (0, 0, 1)."""
+
+        m0, m1, m2, m3, m4, m5 = self._m
+        return iter((m0, m1, 0., m2, m3, 0., m4, m5, 1.))
+
+    __iter__ = components
+
+
+    def to_opengl(self):
+        """Returns a list of the 9 values of the matrix, in the order
+        expected by a 3x3 matrix uniform."""
+
+        return list(self.components())
+
+
+    def rows(self):
+        """Returns an iterator for the rows in the Matrix33 (yields 3 tuples
+        of 3 values)."""
+
+        m0, m1, m2, m3, m4, m5 = self._m
+        return iter(( (m0, m1, 0.), (m2, m3, 0.), (m4, m5, 1.) ))
+
+
+    def get_row(self, row_no):
+        """Gets a row of the matrix as a tuple of 3 values.
+
+        row_no -- Index of row
+
+        """
+
+        if not 0 <= row_no < 3:
+            raise IndexError("Row must be 0, 1 or 2")
+        i = row_no * 2
+        m = self._m
+        return (m[i], m[i+1], float(row_no == 2))
+
+
+    def set_row(self, row_no, row):
+        """Sets the first two values in a row.
+
+        row_no -- Index of row
+        row -- A sequence of 2 (or more) values
+
+        """
+
+        if not 0 <= row_no < 3:
+            raise IndexError("Row must be 0, 1 or 2")
+        x, y = tuple(row)[:2]
+        i = row_no * 2
+        self._m[i] = float(x)
+        self._m[i+1] = float(y)
+
+
+    def _get_x_axis(self):
+        return tuple(self._m[0:2])
+    def _set_x_axis(self, values):
+        self.set_row(0, values)
+    x_axis = property(_get_x_axis, _set_x_axis, None, "The x axis (row 0).")
+
+    def _get_y_axis(self):
+        return tuple(self._m[2:4])
+    def _set_y_axis(self, values):
+        self.set_row(1, values)
+    y_axis = property(_get_y_axis, _set_y_axis, None, "The y axis (row 1).")
+
+    def _get_translate(self):
+        return tuple(self._m[4:6])
+    def _set_translate(self, values):
+        self.set_row(2, values)
+    translate = property(_get_translate, _set_translate, None,
+                         "The translation (row 2).")
+
+
+    def __str__(self):
+
+        rows = [ map(format_number, row) for row in self.rows() ]
+        widths = [ max(len(row[i]) for row in rows) for i in xrange(3) ]
+        return "\n".join( "[ %s ]" % " ".join( value.rjust(width)
+                                              for value, width
+                                              in zip(row, widths) )
+                          for row in rows )
+
+
+    def __repr__(self):
+
+        m0, m1, m2, m3, m4, m5 = map(format_number, self._m)
+        return "Matrix33((%s, %s), (%s, %s), (%s, %s))" % \
+            (m0, m1, m2, m3, m4, m5)
+
+
+    def __eq__(self, rhs):
+
+        return isinstance(rhs, Matrix33) and self._m == rhs._m
+
+    def __ne__(self, rhs):
+
+        return not self.__eq__(rhs)
+
+    def __hash__(self):
+
+        return hash(tuple(self._m))
+
+
+    def __mul__(self, rhs):
+        """Returns the result of multiplying this Matrix33 by another (rhs
+        is applied first)."""
+
+        return self._from_values(_mul(self._m, rhs._m))
+
+
+    def __imul__(self, rhs):
+        """Multiplies this Matrix33 by another, called by the *= operator."""
+
+        self._m = _mul(self._m, rhs._m)
+        return self
+
+    fast_mul = __imul__
+
+
+    def get_inverse(self):
+        """Returns the inverse of this matrix."""
+
+        ret = self.copy()
+        ret.invert()
+        return ret
+
+
+    def invert(self):
+        """Inverts this matrix."""
+
+        a0, a1, a2, a3, a4, a5 = self._m
+        d = a0 * a3 - a1 * a2
+        if not d:
+            raise Matrix33Error("notivertable", "This Matrix33 can not be inverted")
+        d = 1. / d
+        i0 =  a3 * d
+        i1 = -a1 * d
+        i2 = -a2 * d
+        i3 =  a0 * d
+        self._m = [ i0,                    i1,
+                    i2,                    i3,
+                    -(a4 * i0 + a5 * i2),  -(a4 * i1 + a5 * i3) ]
+        return self
+
+
+    def transform(self, v):
+        """Transforms a point and returns the result as a tuple.
+
+        v -- A point (any sequence of 2 values)
+
+        """
+
+        m0, m1, m2, m3, m4, m5 = self._m
+        x, y = v
+        return ( x * m0 + y * m2 + m4,
+                 x * m1 + y * m3 + m5 )
+
+
+    def transform_vec2(self, v):
+        """Transforms a point and returns the result as a Vector2.
+
+        v -- A point (any sequence of 2 values)
+
+        """
+
+        return Vector2.from_floats(*self.transform(v))
+
+
+    def rotate(self, v):
+        """Transforms a direction (ignoring the translation) and returns
+        the result as a tuple.
+
+        v -- A vector (any sequence of 2 values)
+
+        """
+
+        m0, m1, m2, m3, m4, m5 = self._m
+        x, y = v
+        return ( x * m0 + y * m2,
+                 x * m1 + y * m3 )
+
+
+    def transform_sequence(self, points, out=None):
+        """Transforms a sequence of points.
+
+        If out is not given, points should be a sequence of vectors and the
+        result is returned as a list of tuples. If out is given, points should
+        be a flat buffer of packed x, y values (a list, array, or NumPy
+        array) and the transformed points are written to out, which may be
+        the same object as points. No per-point objects are created.
+
+        points -- Points to transform
+        out -- Buffer to receive the transformed points
+
+        """
+
+        m0, m1, m2, m3, m4, m5 = self._m
+
+        if out is None:
+            return [ ( x * m0 + y * m2 + m4,
+                       x * m1 + y * m3 + m5 )
+                     for x, y in points ]
+
+        count = len(points)
+        if count % 2:
+            raise ValueError("Buffer should contain packed x, y values")
+        if len(out) < count:
+            raise ValueError("Output buffer is too small")
+
+        if numpy is not None and isinstance(points, numpy.ndarray) \
+                             and isinstance(out, numpy.ndarray):
+            m = numpy.array(self._m).reshape(3, 2)
+            out[:count] = (numpy.dot(points.reshape(-1, 2), m[:2]) +
+                           m[2]).reshape(-1)
+            return out
+
+        for i in xrange(0, count, 2):
+            x = points[i]
+            y = points[i+1]
+            out[i]   = x * m0 + y * m2 + m4
+            out[i+1] = x * m1 + y * m3 + m5
+
+        return out
+
+
+    def iter_transform(self, points):
+        """Transforms a sequence of points and yields the result as tuples.
+
+        points -- A sequence of vectors
+
+        """
+
+        m0, m1, m2, m3, m4, m5 = self._m
+
+        for x, y in points:
+            yield ( x * m0 + y * m2 + m4,
+                    x * m1 + y * m3 + m5 )
+
+
+    def transform_array(self, vectors, out=None):
+        """Transforms every point in a Vector2Array.
+
+        vectors -- A Vector2Array
+        out -- Vector2Array to receive the result (may be vectors), if not
+        given a new Vector2Array is returned
+
+        """
+
+        if out is not None and len(out) != len(vectors):
+            raise ValueError("Vector2Arrays must be the same length")
+        m0, m1, m2, m3, m4, m5 = self._m
+        xs, ys = vectors.get_components()
+        b = vectors._backend
+        add = b.add
+        mul = b.mul
+        tx = add(add(mul(xs, m0), mul(ys, m2)), m4)
+        ty = add(add(mul(xs, m1), mul(ys, m3)), m5)
+        if out is None:
+            return vectors._from_components(b, tx, ty)
+        out_x, out_y = out.get_components()
+        b.assign(out_x, tx)
+        b.assign(out_y, ty)
+        return out
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    m = Matrix33.translation(10, 0) * Matrix33.rotation(radians(90))
+    print m
+    print repr(m)
+    print m.transform((1, 0))
+    print m.get_inverse().transform(m.transform((1, 2)))
+    print m.transform_sequence([(1, 0), (0, 1)])
+    print m.transform_sequence([1., 0., 0., 1.], [0.] * 4)
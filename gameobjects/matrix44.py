@@ -1,8 +1,12 @@
 
 from util import format_number
+import util
 from vector3 import Vector3
+from batch import numpy, _orthonormalise
 
 from math import sin, cos, tan, sqrt, pi, radians
+from itertools import izip
+from array import array
 
 #import psyco
 #psyco.full()
@@ -59,6 +63,540 @@ class Row(tuple):
         return Vector3._from_float_sequence(self)
 
 
+class MatrixView(object):
+
+    """A row or column of a Matrix44, that reads and writes the values in the
+    matrix rather than a copy. Create with Matrix44.row_view or
+    Matrix44.column_view. A view may be kept and re-used for the lifetime of
+    the matrix.
+
+    """
+
+    __slots__ = ('_matrix', '_offset', '_step')
+
+    def __init__(self, matrix, offset, step):
+        """Creates a view of 4 values in a matrix.
+
+        matrix -- A Matrix44
+        offset -- Index of the first value (0 to 15)
+        step -- Distance between values (1 for a row, 4 for a column)
+
+        """
+
+        self._matrix = matrix
+        self._offset = offset
+        self._step = step
+
+
+    def __len__(self):
+
+        return 4
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if not -4 <= index < 4:
+            raise IndexError("MatrixView index out of range")
+        return self._matrix._m[self._offset + (index % 4) * self._step]
+
+    def __setitem__(self, index, value):
+
+        if not -4 <= index < 4:
+            raise IndexError("MatrixView index out of range")
+        matrix = self._matrix
+        matrix._m[self._offset + (index % 4) * self._step] = float(value)
+        matrix._kind = _classify(matrix._m)
+        if matrix._inverse:
+            matrix._inverse = None
+
+    def __iter__(self):
+
+        offset = self._offset
+        return iter(self._matrix._m[offset:offset + 4 * self._step:self._step])
+
+    def __eq__(self, rhs):
+
+        return tuple(self) == tuple(rhs)
+
+    def __ne__(self, rhs):
+
+        return tuple(self) != tuple(rhs)
+
+    def __repr__(self):
+
+        return "MatrixView(%s)" % ", ".join(map(format_number, self))
+
+
+    def set(self, values):
+        """Sets the values in the matrix. If fewer than 4 values are given,
+        the rest are unchanged.
+
+        values -- An iterable of up to 4 values
+
+        """
+
+        matrix = self._matrix
+        m = matrix._m
+        offset = self._offset
+        step = self._step
+        for i, value in enumerate(tuple(values)[:4]):
+            m[offset + i * step] = float(value)
+        matrix._kind = _classify(m)
+        if matrix._inverse:
+            matrix._inverse = None
+
+
+    def as_vec3(self):
+        """Returns the first 3 values as a Vector3."""
+
+        m = self._matrix._m
+        offset = self._offset
+        step = self._step
+        return Vector3.from_floats( m[offset],
+                                    m[offset + step],
+                                    m[offset + step * 2] )
+
+
+# Kinds of matrix, from the cheapest to the most expensive to work with.
+# ROTATION means the upper 3x3 is orthonormal, RIGID is a rotation with a
+# translation, AFFINE has a right column of (0, 0, 0, 1).
+( KIND_IDENTITY,
+  KIND_TRANSLATION,
+  KIND_ROTATION,
+  KIND_RIGID,
+  KIND_AFFINE,
+  KIND_PROJECTIVE ) = range(6)
+
+_kind_names = ( "identity",
+                "translation",
+                "rotation",
+                "rigid",
+                "affine",
+                "projective" )
+
+
+def _combine_kinds(kind1, kind2):
+    if kind1 == KIND_IDENTITY:
+        return kind2
+    if kind2 == KIND_IDENTITY or kind1 == kind2:
+        return kind1
+    return max(kind1, kind2, KIND_RIGID)
+
+_product_kinds = tuple( tuple( _combine_kinds(kind1, kind2)
+                               for kind2 in xrange(6) )
+                        for kind1 in xrange(6) )
+
+
+kernel_counts = dict.fromkeys( ( "mul_identity",
+                                 "mul_translation",
+                                 "mul_rotation",
+                                 "mul_affine",
+                                 "mul_full",
+                                 "inverse_identity",
+                                 "inverse_translation",
+                                 "inverse_rotation",
+                                 "inverse_rigid",
+                                 "inverse_affine",
+                                 "inverse_full" ), 0 )
+
+def reset_kernel_counts():
+    """Sets the counts of the multiply and inverse kernels to zero."""
+
+    for key in kernel_counts:
+        kernel_counts[key] = 0
+
+
+def enable_kernel_counts(enable=True):
+    """Turns counting of the multiply and inverse kernels (in kernel_counts)
+    on or off. Counting is off by default, as it slows every product.
+
+    enable -- True to count the kernels that run, False to stop counting
+
+    """
+
+    global _mul_kernels, _inverse_kernels
+    if enable:
+        _mul_kernels = _counted_mul_kernels
+        _inverse_kernels = _counted_inverse_kernels
+    else:
+        _mul_kernels = _plain_mul_kernels
+        _inverse_kernels = _plain_inverse_kernels
+
+
+def _counted(name, kernel):
+    """Wraps a kernel so that it increments its count in kernel_counts."""
+
+    def counted_kernel(*args):
+        kernel_counts[name] += 1
+        return kernel(*args)
+    return counted_kernel
+
+
+def _classify(m):
+    """Returns the kind of a matrix, from the values in its list."""
+
+    if m[3] or m[7] or m[11] or m[15] != 1.:
+        return KIND_PROJECTIVE
+
+    translated = bool(m[12] or m[13] or m[14])
+
+    if m[0] == 1. and m[5] == 1. and m[10] == 1. and \
+       not (m[1] or m[2] or m[4] or m[6] or m[8] or m[9]):
+        if translated:
+            return KIND_TRANSLATION
+        return KIND_IDENTITY
+
+    m0, m1, m2, m3, \
+    m4, m5, m6, m7, \
+    m8, m9, m10, m11 = m[:12]
+
+    e = 1e-9
+    if abs(m0*m0 + m1*m1 + m2*m2 - 1.) < e and \
+       abs(m4*m4 + m5*m5 + m6*m6 - 1.) < e and \
+       abs(m8*m8 + m9*m9 + m10*m10 - 1.) < e and \
+       abs(m0*m4 + m1*m5 + m2*m6) < e and \
+       abs(m0*m8 + m1*m9 + m2*m10) < e and \
+       abs(m4*m8 + m5*m9 + m6*m10) < e:
+        if translated:
+            return KIND_RIGID
+        return KIND_ROTATION
+
+    return KIND_AFFINE
+
+
+def _mul_translation(m1, m2):
+
+    return [ 1., 0., 0., 0.,
+             0., 1., 0., 0.,
+             0., 0., 1., 0.,
+             m1[12] + m2[12], m1[13] + m2[13], m1[14] + m2[14], 1. ]
+
+
+def _mul_rotation(m1, m2):
+
+    m1_0,  m1_1,  m1_2,  m1_3, \
+    m1_4,  m1_5,  m1_6,  m1_7, \
+    m1_8,  m1_9,  m1_10, m1_11 = m1[:12]
+
+    m2_0,  m2_1,  m2_2,  m2_3, \
+    m2_4,  m2_5,  m2_6,  m2_7, \
+    m2_8,  m2_9,  m2_10, m2_11 = m2[:12]
+
+    return [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8,
+             m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9,
+             m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10,
+             0.0,
+
+             m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8,
+             m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9,
+             m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10,
+             0.0,
+
+             m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8,
+             m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9,
+             m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10,
+             0.0,
+
+             0.0, 0.0, 0.0, 1.0 ]
+
+
+def _mul_affine(m1, m2):
+
+    m1_0,  m1_1,  m1_2,  m1_3, \
+    m1_4,  m1_5,  m1_6,  m1_7, \
+    m1_8,  m1_9,  m1_10, m1_11, \
+    m1_12, m1_13, m1_14, m1_15 = m1
+
+    m2_0,  m2_1,  m2_2,  m2_3, \
+    m2_4,  m2_5,  m2_6,  m2_7, \
+    m2_8,  m2_9,  m2_10, m2_11, \
+    m2_12, m2_13, m2_14, m2_15 = m2
+
+    return [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8,
+             m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9,
+             m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10,
+             0.0,
+
+             m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8,
+             m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9,
+             m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10,
+             0.0,
+
+             m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8,
+             m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9,
+             m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10,
+             0.0,
+
+             m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m1_12,
+             m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m1_13,
+             m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m1_14,
+             1.0 ]
+
+
+def _mul_full(m1, m2):
+
+    m1_0,  m1_1,  m1_2,  m1_3, \
+    m1_4,  m1_5,  m1_6,  m1_7, \
+    m1_8,  m1_9,  m1_10, m1_11, \
+    m1_12, m1_13, m1_14, m1_15 = m1
+
+    m2_0,  m2_1,  m2_2,  m2_3, \
+    m2_4,  m2_5,  m2_6,  m2_7, \
+    m2_8,  m2_9,  m2_10, m2_11, \
+    m2_12, m2_13, m2_14, m2_15 = m2
+
+    return [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8 + m2_3 * m1_12,
+             m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9 + m2_3 * m1_13,
+             m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10 + m2_3 * m1_14,
+             m2_0 * m1_3 + m2_1 * m1_7 + m2_2 * m1_11 + m2_3 * m1_15,
+
+             m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8 + m2_7 * m1_12,
+             m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9 + m2_7 * m1_13,
+             m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10 + m2_7 * m1_14,
+             m2_4 * m1_3 + m2_5 * m1_7 + m2_6 * m1_11 + m2_7 * m1_15,
+
+             m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8 + m2_11 * m1_12,
+             m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9 + m2_11 * m1_13,
+             m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10 + m2_11 * m1_14,
+             m2_8 * m1_3 + m2_9 * m1_7 + m2_10 * m1_11 + m2_11 * m1_15,
+
+             m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m2_15 * m1_12,
+             m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m2_15 * m1_13,
+             m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m2_15 * m1_14,
+             m2_12 * m1_3 + m2_13 * m1_7 + m2_14 * m1_11 + m2_15 * m1_15 ]
+
+
+def _store(target, values):
+    """Writes 16 values into the existing storage of a matrix, in place, so
+    no new list is created."""
+
+    m = target._m
+    if m.__class__ is list:
+        m[:] = values
+    else:
+        # Array storage converts the values itself (see Matrix44f)
+        target._m = values
+
+
+def _mul_identity_lhs(m1, m2):
+
+    return list(m2)
+
+
+def _mul_identity_rhs(m1, m2):
+
+    return list(m1)
+
+
+def _pick_mul_kernel(kind1, kind2):
+    """Returns the name of the cheapest kernel that is correct for the
+    product of two kinds of matrix, and the kernel."""
+
+    if kind1 == KIND_IDENTITY:
+        return "mul_identity", _mul_identity_lhs
+    elif kind2 == KIND_IDENTITY:
+        return "mul_identity", _mul_identity_rhs
+    elif kind1 == KIND_TRANSLATION and kind2 == KIND_TRANSLATION:
+        return "mul_translation", _mul_translation
+    elif kind1 == KIND_ROTATION and kind2 == KIND_ROTATION:
+        return "mul_rotation", _mul_rotation
+    elif kind1 < KIND_PROJECTIVE and kind2 < KIND_PROJECTIVE:
+        return "mul_affine", _mul_affine
+    else:
+        return "mul_full", _mul_full
+
+# _mul_kernels[kind1][kind2] is the kernel for a product (it is re-bound to
+# the counted kernels by enable_kernel_counts). Kernels return a new list.
+_plain_mul_kernels = tuple( tuple( _pick_mul_kernel(kind1, kind2)[1]
+                                   for kind2 in xrange(6) )
+                            for kind1 in xrange(6) )
+_counted_mul_kernels = tuple( tuple( _counted(*_pick_mul_kernel(kind1, kind2))
+                                     for kind2 in xrange(6) )
+                              for kind1 in xrange(6) )
+_mul_kernels = _plain_mul_kernels
+
+
+def _set_product(target, lhs, rhs):
+    """Sets target to lhs * rhs, in place."""
+
+    kind1 = lhs._kind
+    kind2 = rhs._kind
+    _store(target, _mul_kernels[kind1][kind2](lhs._m, rhs._m))
+    target._kind = _product_kinds[kind1][kind2]
+    if target._inverse:
+        target._inverse = None
+
+
+def _inverse_rotation(i):
+
+    i0,  i1,  i2,  i3, \
+    i4,  i5,  i6,  i7, \
+    i8,  i9,  i10, i11 = i[:12]
+
+    return [ i0, i4, i8,  0.,
+             i1, i5, i9,  0.,
+             i2, i6, i10, 0.,
+             0., 0., 0.,  1. ]
+
+
+def _inverse_rigid(i):
+
+    i0,  i1,  i2,  i3, \
+    i4,  i5,  i6,  i7, \
+    i8,  i9,  i10, i11, \
+    i12, i13, i14, i15 = i
+
+    return [ i0, i4, i8,  0.,
+             i1, i5, i9,  0.,
+             i2, i6, i10, 0.,
+             -(i0 * i12 + i1 * i13 + i2 * i14),
+             -(i4 * i12 + i5 * i13 + i6 * i14),
+             -(i8 * i12 + i9 * i13 + i10 * i14),
+             1. ]
+
+
+def _inverse_affine(i):
+
+    i0,  i1,  i2,  i3, \
+    i4,  i5,  i6,  i7, \
+    i8,  i9,  i10, i11, \
+    i12, i13, i14, i15 = i
+
+    negpos=[0., 0.]
+    temp = i0 * i5 * i10
+    negpos[temp > 0.] += temp
+
+    temp = i1 * i6 * i8
+    negpos[temp > 0.] += temp
+
+    temp = i2 * i4 * i9
+    negpos[temp > 0.] += temp
+
+    temp = -i2 * i5 * i8
+    negpos[temp > 0.] += temp
+
+    temp = -i1 * i4 * i10
+    negpos[temp > 0.] += temp
+
+    temp = -i0 * i6 * i9
+    negpos[temp > 0.] += temp
+
+    det_1 = negpos[0]+negpos[1]
+
+    if (det_1 == 0.) or (abs(det_1 / (negpos[1] - negpos[0])) < \
+                         (2. * 0.00000000000000001) ):
+        raise Matrix44Error("notivertable", "This Matrix44 can not be inverted")
+
+    det_1 = 1. / det_1
+
+    m0 =  (i5*i10 - i6*i9)*det_1
+    m1 = -(i1*i10 - i2*i9)*det_1
+    m2 =  (i1*i6 - i2*i5 )*det_1
+    m4 = -(i4*i10 - i6*i8)*det_1
+    m5 =  (i0*i10 - i2*i8)*det_1
+    m6 = -(i0*i6 - i2*i4)*det_1
+    m8 =  (i4*i9 - i5*i8 )*det_1
+    m9 = -(i0*i9 - i1*i8)*det_1
+    m10 = (i0*i5 - i1*i4)*det_1
+
+    return [ m0, m1, m2, 0.0,
+             m4, m5, m6, 0.0,
+             m8, m9, m10, 0.0,
+             - ( i12 * m0 + i13 * m4 + i14 * m8 ),
+             - ( i12 * m1 + i13 * m5 + i14 * m9 ),
+             - ( i12 * m2 + i13 * m6 + i14 * m10 ),
+             1.0 ]
+
+
+def _inverse_full(i):
+
+    i0,  i1,  i2,  i3, \
+    i4,  i5,  i6,  i7, \
+    i8,  i9,  i10, i11, \
+    i12, i13, i14, i15 = i
+
+    # 2x2 sub-determinants of the top and bottom two rows
+    s0 = i0 * i5 - i4 * i1
+    s1 = i0 * i6 - i4 * i2
+    s2 = i0 * i7 - i4 * i3
+    s3 = i1 * i6 - i5 * i2
+    s4 = i1 * i7 - i5 * i3
+    s5 = i2 * i7 - i6 * i3
+
+    c5 = i10 * i15 - i14 * i11
+    c4 = i9 * i15 - i13 * i11
+    c3 = i9 * i14 - i13 * i10
+    c2 = i8 * i15 - i12 * i11
+    c1 = i8 * i14 - i12 * i10
+    c0 = i8 * i13 - i12 * i9
+
+    det = s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+
+    if det == 0.:
+        raise Matrix44Error("notivertable", "This Matrix44 can not be inverted")
+
+    det_1 = 1. / det
+
+    return [ ( i5 * c5 - i6 * c4 + i7 * c3) * det_1,
+             (-i1 * c5 + i2 * c4 - i3 * c3) * det_1,
+             ( i13 * s5 - i14 * s4 + i15 * s3) * det_1,
+             (-i9 * s5 + i10 * s4 - i11 * s3) * det_1,
+
+             (-i4 * c5 + i6 * c2 - i7 * c1) * det_1,
+             ( i0 * c5 - i2 * c2 + i3 * c1) * det_1,
+             (-i12 * s5 + i14 * s2 - i15 * s1) * det_1,
+             ( i8 * s5 - i10 * s2 + i11 * s1) * det_1,
+
+             ( i4 * c4 - i5 * c2 + i7 * c0) * det_1,
+             (-i0 * c4 + i1 * c2 - i3 * c0) * det_1,
+             ( i12 * s4 - i13 * s2 + i15 * s0) * det_1,
+             (-i8 * s4 + i9 * s2 - i11 * s0) * det_1,
+
+             (-i4 * c3 + i5 * c1 - i6 * c0) * det_1,
+             ( i0 * c3 - i1 * c1 + i2 * c0) * det_1,
+             (-i12 * s3 + i13 * s1 - i14 * s0) * det_1,
+             ( i8 * s3 - i9 * s1 + i10 * s0) * det_1 ]
+
+
+def _inverse_identity(i):
+
+    return list(i)
+
+
+def _inverse_translation(i):
+
+    return [ 1., 0., 0., 0.,
+             0., 1., 0., 0.,
+             0., 0., 1., 0.,
+             -i[12], -i[13], -i[14], 1. ]
+
+
+# _inverse_kernels[kind] is the cheapest kernel that is correct for the
+# inverse of a kind of matrix (see _mul_kernels)
+_inverse_kernel_names = ( ("inverse_identity", _inverse_identity),
+                          ("inverse_translation", _inverse_translation),
+                          ("inverse_rotation", _inverse_rotation),
+                          ("inverse_rigid", _inverse_rigid),
+                          ("inverse_affine", _inverse_affine),
+                          ("inverse_full", _inverse_full) )
+_plain_inverse_kernels = tuple( kernel for name, kernel
+                                in _inverse_kernel_names )
+_counted_inverse_kernels = tuple( _counted(name, kernel) for name, kernel
+                                  in _inverse_kernel_names )
+_inverse_kernels = _plain_inverse_kernels
+
+
+def _set_inverse(target, source):
+    """Sets target to the inverse of source, in place."""
+
+    kind = source._kind
+    _store(target, _inverse_kernels[kind](source._m))
+    target._kind = kind
+    if target._inverse:
+        target._inverse = None
+
+
 class Matrix44(object):
 
     _identity = ( (1.0, 0.0, 0.0, 0.0),
@@ -66,7 +604,7 @@ class Matrix44(object):
                   (0.0, 0.0, 1.0, 0.0),
                   (0.0, 0.0, 0.0, 1.0) )
 
-    __slots__ = ('_m',)
+    __slots__ = ('_m', '_kind', '_inverse')
 
     def __init__(self, *args):
 
@@ -82,11 +620,15 @@ class Matrix44(object):
 
         if not args:
             self._m = [1.,0.,0.,0., 0.,1.,0.,0., 0.,0.,1.,0., 0.,0.,0.,1.]
+            self._kind = KIND_IDENTITY
+            self._inverse = False
             return
 
 
         elif len(args) == 4:
             self._m = [1.,0.,0.,0., 0.,1.,0.,0., 0.,0.,1.,0., 0.,0.,0.,1.]
+            self._kind = KIND_IDENTITY
+            self._inverse = False
 
             row_0, row_1, row_2, row_3 = self._setters
             r1, r2, r3, r4 = args
@@ -115,18 +657,30 @@ class Matrix44(object):
     def _set_row_0(self, values):
         values = tuple(values)[:4]
         self._m[0:len(values)] = map(float, values)
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
 
     def _set_row_1(self, values):
         values = tuple(values)[:4]
         self._m[4:4+len(values)] = map(float, values)
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
 
     def _set_row_2(self, values):
         values = tuple(values)[:4]
         self._m[8:8+len(values)] = map(float, values)
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
 
     def _set_row_3(self, values):
         values = tuple(values)[:4]
         self._m[12:12+len(values)] = map(float, values)
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
 
     _getters = (_get_row_0, _get_row_1, _get_row_2, _get_row_3)
     _setters = (_set_row_0, _set_row_1, _set_row_2, _set_row_3)
@@ -145,6 +699,16 @@ class Matrix44(object):
     translate = _row3
 
 
+    def _get_kind(self):
+        return self._kind
+    kind = property(_get_kind, None, None, "The kind of matrix (one of the "\
+                    "KIND_ constants), used to pick the quickest math.")
+
+    def get_kind_name(self):
+        """Returns the kind of matrix as a string."""
+        return _kind_names[self._kind]
+
+
     def to_opengl(self):
 
         """Converts the matrix in to a list of values, suitable for using
@@ -155,6 +719,31 @@ class Matrix44(object):
         return self._m[:]
 
 
+    def write_into(self, buffer, offset=0):
+        """Writes the 16 values of the matrix in to a buffer (in the same
+        order as to_opengl), and returns the offset after the matrix. Use
+        this to pack many matrices in to one preallocated buffer. e.g.
+
+            offset = 0
+            for m in matrices:
+                offset = m.write_into(uniforms, offset)
+
+        buffer -- A list, array or NumPy array with room for 16 values
+        offset -- Index of the first value to write
+
+        """
+
+        end = offset + 16
+        if len(buffer) < end:
+            raise ValueError("Buffer is too small")
+        m = self._m
+        if isinstance(buffer, array) and not (isinstance(m, array) and
+                                              m.typecode == buffer.typecode):
+            m = array(buffer.typecode, m)
+        buffer[offset:end] = m
+        return end
+
+
     def set(self, row1, row2, row3, row4):
 
         """Sets all four rows of the matrix,
@@ -199,6 +788,8 @@ class Matrix44(object):
         m._m = map(float, iterable)
         if len(m._m) != 16:
             raise ValueError("Iterable must have 16 values")
+        m._kind = _classify(m._m)
+        m._inverse = False
         return m
 
 
@@ -207,7 +798,9 @@ class Matrix44(object):
         """Creates a Matrix44 that is a copy of another."""
 
         m = cls.__new__(cls, object)
-        m._m = copy_Matrix44._m[:]
+        m._m = list(copy_Matrix44._m)
+        m._kind = copy_Matrix44._kind
+        m._inverse = False
         return m
 
 
@@ -221,6 +814,8 @@ class Matrix44(object):
 
         m = cls.__new__(cls, object)
         m._m = [0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0., 0.,]
+        m._kind = KIND_PROJECTIVE
+        m._inverse = False
         return m
 
 
@@ -230,6 +825,8 @@ class Matrix44(object):
 
         m = cls.__new__(cls, object)
         m._m = [1., 0., 0., 0., 0., 1., 0., 0., 0., 0., 1., 0., 0., 0., 0., 1.]
+        m._kind = KIND_IDENTITY
+        m._inverse = False
         return m
 
 
@@ -242,6 +839,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_scale(scale_x, scale_y, scale_z)
 
 
@@ -256,6 +854,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_translation(x, y, z)
 
 
@@ -268,6 +867,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_x_rotation(angle)
 
 
@@ -280,6 +880,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_y_rotation(angle)
 
 
@@ -292,6 +893,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_z_rotation(angle)
 
 
@@ -305,6 +907,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_rotation_about_axis(axis, angle)
 
 
@@ -319,9 +922,23 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_xyz_rotation(angle_x, angle_y, angle_z)
 
 
+    @classmethod
+    def quaternion_rotation(cls, q):
+        """Creates a Matrix44 that does the rotation of a quaternion.
+
+        q -- A Quaternion, or a sequence of 4 values (x, y, z, w)
+
+        """
+
+        m = cls.__new__(cls, object)
+        m._inverse = False
+        return m.make_quaternion_rotation(q)
+
+
     @classmethod
     def perspective_projection(cls, left, right, top, bottom, near, far):
         """Creates a Matrix44 that projects points in to 2d space.
@@ -336,6 +953,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_perspective_projection( left,
                                               right,
                                               top,
@@ -356,6 +974,7 @@ class Matrix44(object):
         """
 
         m = cls.__new__(cls, object)
+        m._inverse = False
         return m.make_perspective_projection_fov(fov, aspect, near, far)
 
 
@@ -424,6 +1043,9 @@ class Matrix44(object):
             raise IndexError( "Row and Column should be 0, 1, 2 or 3" )
         except TypeError:
             raise TypeError( "Must be a number" )
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
 
 
     def __getitem__(self, coord):
@@ -458,41 +1080,15 @@ class Matrix44(object):
 
     def __mul__(self, rhs):
         """Returns the result of multiplying this Matrix44 by another, called
-        by the * (multiply) operator."""
-
-        m1_0,  m1_1,  m1_2,  m1_3, \
-        m1_4,  m1_5,  m1_6,  m1_7, \
-        m1_8,  m1_9,  m1_10, m1_11, \
-        m1_12, m1_13, m1_14, m1_15 = self._m
-
-        m2_0,  m2_1,  m2_2,  m2_3, \
-        m2_4,  m2_5,  m2_6,  m2_7, \
-        m2_8,  m2_9,  m2_10, m2_11, \
-        m2_12, m2_13, m2_14, m2_15 = rhs._m
-
-        retm =  [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8 + m2_3 * m1_12,
-                  m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9 + m2_3 * m1_13,
-                  m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10 + m2_3 * m1_14,
-                  m2_0 * m1_3 + m2_1 * m1_7 + m2_2 * m1_11 + m2_3 * m1_15,
-
-                  m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8 + m2_7 * m1_12,
-                  m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9 + m2_7 * m1_13,
-                  m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10 + m2_7 * m1_14,
-                  m2_4 * m1_3 + m2_5 * m1_7 + m2_6 * m1_11 + m2_7 * m1_15,
-
-                  m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8 + m2_11 * m1_12,
-                  m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9 + m2_11 * m1_13,
-                  m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10 + m2_11 * m1_14,
-                  m2_8 * m1_3 + m2_9 * m1_7 + m2_10 * m1_11 + m2_11 * m1_15,
-
-                  m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m2_15 * m1_12,
-                  m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m2_15 * m1_13,
-                  m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m2_15 * m1_14,
-                  m2_12 * m1_3 + m2_13 * m1_7 + m2_14 * m1_11 + m2_15 * m1_15 ]
+        by the * (multiply) operator. The quickest method for the kinds of
+        the two matrices is used."""
 
+        kind1 = self._kind
+        kind2 = rhs._kind
         ret = self.__new__(self.__class__, object)
-        ret._m = retm
-
+        ret._m = _mul_kernels[kind1][kind2](self._m, rhs._m)
+        ret._kind = _product_kinds[kind1][kind2]
+        ret._inverse = False
         return ret
 
 
@@ -500,37 +1096,7 @@ class Matrix44(object):
 
         """Multiplies this Matrix44 by another, called by the *= operator."""
 
-        m1_0,  m1_1,  m1_2,  m1_3, \
-        m1_4,  m1_5,  m1_6,  m1_7, \
-        m1_8,  m1_9,  m1_10, m1_11, \
-        m1_12, m1_13, m1_14, m1_15 = self._m
-
-        m2_0,  m2_1,  m2_2,  m2_3, \
-        m2_4,  m2_5,  m2_6,  m2_7, \
-        m2_8,  m2_9,  m2_10, m2_11, \
-        m2_12, m2_13, m2_14, m2_15 = rhs._m
-
-
-        self._m = [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8 + m2_3 * m1_12,
-                    m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9 + m2_3 * m1_13,
-                    m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10 + m2_3 * m1_14,
-                    m2_0 * m1_3 + m2_1 * m1_7 + m2_2 * m1_11 + m2_3 * m1_15,
-
-                    m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8 + m2_7 * m1_12,
-                    m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9 + m2_7 * m1_13,
-                    m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10 + m2_7 * m1_14,
-                    m2_4 * m1_3 + m2_5 * m1_7 + m2_6 * m1_11 + m2_7 * m1_15,
-
-                    m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8 + m2_11 * m1_12,
-                    m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9 + m2_11 * m1_13,
-                    m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10 + m2_11 * m1_14,
-                    m2_8 * m1_3 + m2_9 * m1_7 + m2_10 * m1_11 + m2_11 * m1_15,
-
-                    m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m2_15 * m1_12,
-                    m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m2_15 * m1_13,
-                    m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m2_15 * m1_14,
-                    m2_12 * m1_3 + m2_13 * m1_7 + m2_14 * m1_11 + m2_15 * m1_15]
-
+        _set_product(self, self, rhs)
         return self
 
     def fast_mul(self, rhs):
@@ -538,42 +1104,24 @@ class Matrix44(object):
         """Multiplies this matrix by another. Assumes that both matrices have
         a right column of (0, 0, 0, 1). This is true for matrices composed
         of rotations, translations and scales. fast_mul is approximately 25%
-        quicker than the *= operator.
+        quicker than the *= operator for a general matrix (the *= operator
+        will pick this method automatically for matrices that it knows are
+        affine).
 
         rhs -- A matrix
 
         """
 
-        m1_0,  m1_1,  m1_2,  m1_3, \
-        m1_4,  m1_5,  m1_6,  m1_7, \
-        m1_8,  m1_9,  m1_10, m1_11, \
-        m1_12, m1_13, m1_14, m1_15 = self._m
-
-        m2_0,  m2_1,  m2_2,  m2_3, \
-        m2_4,  m2_5,  m2_6,  m2_7, \
-        m2_8,  m2_9,  m2_10, m2_11, \
-        m2_12, m2_13, m2_14, m2_15 = rhs._m
-
-
-        self._m = [ m2_0 * m1_0 + m2_1 * m1_4 + m2_2 * m1_8,
-                    m2_0 * m1_1 + m2_1 * m1_5 + m2_2 * m1_9,
-                    m2_0 * m1_2 + m2_1 * m1_6 + m2_2 * m1_10,
-                    0.0,
-
-                    m2_4 * m1_0 + m2_5 * m1_4 + m2_6 * m1_8,
-                    m2_4 * m1_1 + m2_5 * m1_5 + m2_6 * m1_9,
-                    m2_4 * m1_2 + m2_5 * m1_6 + m2_6 * m1_10,
-                    0.0,
-
-                    m2_8 * m1_0 + m2_9 * m1_4 + m2_10 * m1_8,
-                    m2_8 * m1_1 + m2_9 * m1_5 + m2_10 * m1_9,
-                    m2_8 * m1_2 + m2_9 * m1_6 + m2_10 * m1_10,
-                    0.0,
-
-                    m2_12 * m1_0 + m2_13 * m1_4 + m2_14 * m1_8 + m1_12,
-                    m2_12 * m1_1 + m2_13 * m1_5 + m2_14 * m1_9 + m1_13,
-                    m2_12 * m1_2 + m2_13 * m1_6 + m2_14 * m1_10 + m1_14,
-                    1.0 ]
+        kind1 = self._kind
+        kind2 = rhs._kind
+        if kind1 < KIND_PROJECTIVE and kind2 < KIND_PROJECTIVE:
+            _set_product(self, self, rhs)
+        else:
+            mul_affine = _mul_kernels[KIND_AFFINE][KIND_AFFINE]
+            _store(self, mul_affine(self._m, rhs._m))
+            self._kind = min(_product_kinds[kind1][kind2], KIND_AFFINE)
+            if self._inverse:
+                self._inverse = None
 
         return self
 
@@ -641,6 +1189,32 @@ class Matrix44(object):
             raise IndexError( "Row and Column should be 0, 1, 2 or 3" )
 
 
+    def row_view(self, row_no):
+        """Returns a MatrixView of a row, which reads and writes the values
+        in this matrix without copying them.
+
+        row_no -- The row index
+
+        """
+
+        if not 0 <= row_no < 4:
+            raise IndexError( "Row should be 0, 1, 2 or 3" )
+        return MatrixView(self, row_no * 4, 1)
+
+
+    def column_view(self, col_no):
+        """Returns a MatrixView of a column, which reads and writes the
+        values in this matrix without copying them.
+
+        col_no -- The column index
+
+        """
+
+        if not 0 <= col_no < 4:
+            raise IndexError( "Column should be 0, 1, 2 or 3" )
+        return MatrixView(self, col_no, 4)
+
+
     def get_column(self, col_no):
         """Returns a column as a tuple of 4 values.
 
@@ -691,6 +1265,9 @@ class Matrix44(object):
 
         except IndexError:
             raise IndexError( "Column should be 0, 1, 2 or 3" )
+        self._kind = _classify(m)
+        if self._inverse:
+            self._inverse = None
 
 
     def transform_vec3(self, v):
@@ -731,10 +1308,26 @@ class Matrix44(object):
         x, y, z, w = v
         return ( x * m[0] + y * m[4] + z * m[8]  + w * m[12],
                  x * m[1] + y * m[5] + z * m[9]  + w * m[13],
-                 x * m[2] + y * m[6] + z * m[10] + w * m[14] )
+                 x * m[2] + y * m[6] + z * m[10] + w * m[14],
+                 x * m[3] + y * m[7] + z * m[11] + w * m[15] )
+
 
+    def transform_sequence(self, points, out=None):
+        """Transforms a sequence of points.
 
-    def transform_sequence(self, points):
+        If out is not given, points should be a sequence of vectors and the
+        result is returned as a list of tuples. If out is given, points should
+        be a flat buffer of packed x, y, z values (a list, array, or NumPy
+        array) and the transformed points are written to out, which may be
+        the same object as points. No per-point objects are created.
+
+        points -- Points to transform
+        out -- Buffer to receive the transformed points
+
+        """
+
+        if out is not None:
+            return self._transform_buffer(points, out)
 
         m_0,  m_1,  m_2,  m_3, \
         m_4,  m_5,  m_6,  m_7, \
@@ -747,6 +1340,107 @@ class Matrix44(object):
                    for x,y,z in points ]
 
 
+    def _transform_buffer(self, points, out):
+
+        count = len(points)
+        if count % 3:
+            raise ValueError("Buffer should contain packed x, y, z values")
+        if len(out) < count:
+            raise ValueError("Output buffer is too small")
+
+        if numpy is not None and isinstance(points, numpy.ndarray) \
+                             and isinstance(out, numpy.ndarray):
+            m = numpy.array(self._m).reshape(4, 4)
+            result = numpy.dot(points.reshape(-1, 3), m[:3, :3]) + m[3, :3]
+            out[:count] = result.reshape(-1)
+            return out
+
+        m_0,  m_1,  m_2,  m_3, \
+        m_4,  m_5,  m_6,  m_7, \
+        m_8,  m_9,  m_10, m_11, \
+        m_12, m_13, m_14, m_15 = self._m
+
+        for i in xrange(0, count, 3):
+            x = points[i]
+            y = points[i+1]
+            z = points[i+2]
+            out[i]   = x * m_0 + y * m_4 + z * m_8  + m_12
+            out[i+1] = x * m_1 + y * m_5 + z * m_9  + m_13
+            out[i+2] = x * m_2 + y * m_6 + z * m_10 + m_14
+
+        return out
+
+
+    def transform_sequence4(self, points, out=None, w_divide=False):
+        """Transforms a sequence of 4d points.
+
+        If out is not given, points should be a sequence of 4 values and the
+        result is returned as a list of (x, y, z, w) tuples. If out is given,
+        points should be a flat buffer of packed x, y, z, w values and the
+        results are written to out (which may be the same object as points).
+
+        points -- Points to transform
+        out -- Buffer to receive the transformed points
+        w_divide -- If True, x, y and z are divided by w (w is unchanged)
+
+        """
+
+        m_0,  m_1,  m_2,  m_3, \
+        m_4,  m_5,  m_6,  m_7, \
+        m_8,  m_9,  m_10, m_11, \
+        m_12, m_13, m_14, m_15 = self._m
+
+        if out is None:
+            ret = []
+            append = ret.append
+            for x, y, z, w in points:
+                tx = x * m_0 + y * m_4 + z * m_8  + w * m_12
+                ty = x * m_1 + y * m_5 + z * m_9  + w * m_13
+                tz = x * m_2 + y * m_6 + z * m_10 + w * m_14
+                tw = x * m_3 + y * m_7 + z * m_11 + w * m_15
+                if w_divide:
+                    append( (tx / tw, ty / tw, tz / tw, tw) )
+                else:
+                    append( (tx, ty, tz, tw) )
+            return ret
+
+        count = len(points)
+        if count % 4:
+            raise ValueError("Buffer should contain packed x, y, z, w values")
+        if len(out) < count:
+            raise ValueError("Output buffer is too small")
+
+        if numpy is not None and isinstance(points, numpy.ndarray) \
+                             and isinstance(out, numpy.ndarray):
+            m = numpy.array(self._m).reshape(4, 4)
+            result = numpy.dot(points.reshape(-1, 4), m)
+            if w_divide:
+                result[:, :3] /= result[:, 3:4]
+            out[:count] = result.reshape(-1)
+            return out
+
+        for i in xrange(0, count, 4):
+            x = points[i]
+            y = points[i+1]
+            z = points[i+2]
+            w = points[i+3]
+            tx = x * m_0 + y * m_4 + z * m_8  + w * m_12
+            ty = x * m_1 + y * m_5 + z * m_9  + w * m_13
+            tz = x * m_2 + y * m_6 + z * m_10 + w * m_14
+            tw = x * m_3 + y * m_7 + z * m_11 + w * m_15
+            if w_divide:
+                out[i]   = tx / tw
+                out[i+1] = ty / tw
+                out[i+2] = tz / tw
+            else:
+                out[i]   = tx
+                out[i+1] = ty
+                out[i+2] = tz
+            out[i+3] = tw
+
+        return out
+
+
     def transform_sequence_vec3(self, points):
 
         m_0,  m_1,  m_2,  m_3, \
@@ -855,30 +1549,50 @@ class Matrix44(object):
 
     def inverse_transform(self, v):
         """Inverse trasforms a Vector3 and returns the result.
-        Warning: This is expensive, pre-calculate an inverse Matrix44 if you
-        can.
+        Warning: This is expensive, pre-calculate an inverse Matrix44 (or
+        call enable_inverse_cache) if you can.
 
         v -- Vector to transform
 
         """
 
-        return self.get_inverse().transform(v)
+        inverse = self._inverse
+        if inverse is None:
+            self.get_inverse()
+            inverse = self._inverse
+        elif not inverse:
+            return self.get_inverse().transform(v)
+        return inverse.transform(v)
 
 
     def make_identity(self):
         """Makes an identity Matrix44."""
 
-        self._m = [1., 0., 0., 0.,
-                   0., 1., 0., 0.,
-                   0., 0., 1., 0.,
-                   0., 0., 0., 1.]
+        _store(self, (1., 0., 0., 0.,
+                      0., 1., 0., 0.,
+                      0., 0., 1., 0.,
+                      0., 0., 0., 1.))
+        self._kind = KIND_IDENTITY
+        if self._inverse:
+            self._inverse = None
         return self
 
 
     def make_copy(self, other):
         """Makes a copy of another Matrix44."""
 
-        self._m = other._m[:]
+        _store(self, other._m)
+        self._kind = other._kind
+        if self._inverse:
+            self._inverse = None
+        return self
+
+
+    def make_product(self, lhs, rhs):
+        """Makes the product of two matrices (lhs * rhs), either of which may
+        be this matrix."""
+
+        _set_product(self, lhs, rhs)
         return self
 
 
@@ -897,6 +1611,9 @@ class Matrix44(object):
                      0.,             float(scale_y), 0.,             0.,
                      0.,             0.,             float(scale_z), 0.,
                      0.,             0.,             0.,             1.]
+        self._kind = KIND_AFFINE
+        if self._inverse:
+            self._inverse = None
         return self
 
 
@@ -907,44 +1624,65 @@ class Matrix44(object):
                      0.,       1.,       0.,       0.,
                      0.,       0.,       1.,       0.,
                      float(x), float(y), float(z), 1.]
+        self._kind = KIND_TRANSLATION
+        if self._inverse:
+            self._inverse = None
         return self
 
 
     def make_x_rotation(self, angle):
         """Makes a rotation Matrix44 around the x axis."""
 
-        cos_a = cos(angle)
-        sin_a = sin(angle)
+        if util.sin_cos_cached:
+            sin_a, cos_a = util.sin_cos(angle)
+        else:
+            sin_a = sin(angle)
+            cos_a = cos(angle)
 
         self._m =  [1.,  0.,      0.,     0.,
                     0.,  cos_a,   sin_a,  0.,
                     0., -sin_a,   cos_a,  0.,
                     0.,  0.,      0.,     1.]
+        self._kind = KIND_ROTATION
+        if self._inverse:
+            self._inverse = None
         return self
 
     def make_y_rotation(self, angle):
         """Makes a rotation Matrix44 around the y axis."""
 
-        cos_a = cos(angle)
-        sin_a = sin(angle)
+        if util.sin_cos_cached:
+            sin_a, cos_a = util.sin_cos(angle)
+        else:
+            sin_a = sin(angle)
+            cos_a = cos(angle)
 
         self._m =  [ cos_a,  0., -sin_a,  0.,
                      0.,     1.,  0.,     0.,
                      sin_a,  0.,  cos_a,  0.,
                      0.,     0.,  0.,     1.]
+        self._kind = KIND_ROTATION
+        if self._inverse:
+            self._inverse = None
         return self
 
 
     def make_z_rotation(self, angle):
         """Makes a rotation Matrix44 around the z axis."""
 
-        cos_a = cos(angle)
-        sin_a = sin(angle)
+        if util.sin_cos_cached:
+            sin_a, cos_a = util.sin_cos(angle)
+        else:
+            sin_a = sin(angle)
+            cos_a = cos(angle)
 
         self._m =  [  cos_a,   sin_a,  0.,  0.,
                      -sin_a,   cos_a,  0.,  0.,
                       0.,      0.,     1.,  0.,
                       0.,      0.,     0.,  1.]
+        self._kind = KIND_ROTATION
+        if self._inverse:
+            self._inverse = None
         return self
 
 
@@ -956,8 +1694,11 @@ class Matrix44(object):
 
         """
 
-        c = cos(angle)
-        s = sin(angle)
+        if util.sin_cos_cached:
+            s, c = util.sin_cos(angle)
+        else:
+            s = sin(angle)
+            c = cos(angle)
         omc = 1. - c
         x, y, z = axis
 
@@ -965,18 +1706,30 @@ class Matrix44(object):
                    x*y*omc-z*s, y*y*omc+c,   y*z*omc+x*s, 0.,
                    x*z*omc+y*s, y*z*omc-x*s, z*z*omc+c,   0.,
                    0.,          0.,          0.,          1.]
+        if abs(x*x + y*y + z*z - 1.) < 1e-9:
+            self._kind = KIND_ROTATION
+        else:
+            self._kind = KIND_AFFINE
+        if self._inverse:
+            self._inverse = None
         return self
 
 
     def make_xyz_rotation(self, angle_x, angle_y, angle_z):
         """Makes a rotation Matrix44 about 3 axis."""
 
-        cx = cos(angle_x)
-        sx = sin(angle_x)
-        cy = cos(angle_y)
-        sy = sin(angle_y)
-        cz = cos(angle_z)
-        sz = sin(angle_z)
+        if util.sin_cos_cached:
+            sin_cos = util.sin_cos
+            sx, cx = sin_cos(angle_x)
+            sy, cy = sin_cos(angle_y)
+            sz, cz = sin_cos(angle_z)
+        else:
+            sx = sin(angle_x)
+            cx = cos(angle_x)
+            sy = sin(angle_y)
+            cy = cos(angle_y)
+            sz = sin(angle_z)
+            cz = cos(angle_z)
 
         sxsy = sx*sy
         cxsy = cx*sy
@@ -998,6 +1751,98 @@ class Matrix44(object):
                     -cy*sz, -sxsy*sz+cx*cz, cxsy*sz+sx*cz,  0.,
                     sy,     -sx*cy,         cx*cy,          0.,
                     0.,     0.,             0.,             1.]
+        self._kind = KIND_ROTATION
+        if self._inverse:
+            self._inverse = None
+
+        return self
+
+
+    def make_quaternion_rotation(self, q):
+        """Makes a rotation Matrix44 from a quaternion.
+
+        q -- A Quaternion, or a sequence of 4 values (x, y, z, w)
+
+        """
+
+        x, y, z, w = q
+
+        x2 = x + x
+        y2 = y + y
+        z2 = z + z
+
+        xx = x * x2
+        yy = y * y2
+        zz = z * z2
+        xy = x * y2
+        xz = x * z2
+        yz = y * z2
+        wx = w * x2
+        wy = w * y2
+        wz = w * z2
+
+        self._m = [ 1.-(yy+zz), xy+wz,      xz-wy,      0.,
+                    xy-wz,      1.-(xx+zz), yz+wx,      0.,
+                    xz+wy,      yz-wx,      1.-(xx+yy), 0.,
+                    0.,         0.,         0.,         1. ]
+        if abs(x*x + y*y + z*z + w*w - 1.) < 1e-9:
+            self._kind = KIND_ROTATION
+        else:
+            self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
+        return self
+
+
+    def make_transform(self, translation, rotation, scale=1.):
+        """Makes a Matrix44 that scales, then rotates, then translates.
+
+        translation -- A vector (or sequence of 3 values)
+        rotation -- A unit quaternion (or sequence of 4 values x, y, z, w)
+        scale -- Scale to apply to all three axis
+
+        """
+
+        tx, ty, tz = translation
+        x, y, z, w = rotation
+
+        x2 = x + x
+        y2 = y + y
+        z2 = z + z
+
+        xx = x * x2
+        yy = y * y2
+        zz = z * z2
+        xy = x * y2
+        xz = x * z2
+        yz = y * z2
+        wx = w * x2
+        wy = w * y2
+        wz = w * z2
+
+        s = float(scale)
+        self._m = [ (1.-(yy+zz))*s, (xy+wz)*s,      (xz-wy)*s,      0.,
+                    (xy-wz)*s,      (1.-(xx+zz))*s, (yz+wx)*s,      0.,
+                    (xz+wy)*s,      (yz-wx)*s,      (1.-(xx+yy))*s, 0.,
+                    float(tx),      float(ty),      float(tz),      1. ]
+        if abs(x*x + y*y + z*z + w*w - 1.) >= 1e-9:
+            # Not a pure rotation, so the transpose is not the inverse
+            self._kind = _classify(self._m)
+        elif s != 1.:
+            self._kind = KIND_AFFINE
+        elif x or y or z:
+            if tx or ty or tz:
+                self._kind = KIND_RIGID
+            else:
+                self._kind = KIND_ROTATION
+        else:
+            if tx or ty or tz:
+                self._kind = KIND_TRANSLATION
+            else:
+                self._kind = KIND_IDENTITY
+        if self._inverse:
+            self._inverse = None
 
         return self
 
@@ -1018,6 +1863,9 @@ class Matrix44(object):
                    0.,                        (2.*near)/(top-bottom),    0.,                          0.,
                    (right+left)/(right-left), (top+bottom)/(top-bottom), -((far+near)/(far-near)),   -1.,
                    0.,                        0.,                        -((2.*far*near)/(far-near)), 0.]
+        self._kind = KIND_PROJECTIVE
+        if self._inverse:
+            self._inverse = None
         return self
 
 
@@ -1061,6 +1909,11 @@ class Matrix44(object):
                     m02, m12, m22, m32,
                     m03, m13, m23, m33 ]
 
+        if self._kind not in (KIND_IDENTITY, KIND_ROTATION):
+            self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
 
     def get_transpose(self):
         """Returns a Matrix44 that is a copy of this, but with rows and
@@ -1072,12 +1925,18 @@ class Matrix44(object):
         m30, m31, m32, m33 = self._m
 
         ret = self.__new__(self.__class__, object)
+        ret._inverse = False
 
         ret._m = [ m00, m10, m20, m30,
                    m01, m11, m21, m31,
                    m02, m12, m22, m32,
                    m03, m13, m23, m33 ]
 
+        if self._kind in (KIND_IDENTITY, KIND_ROTATION):
+            ret._kind = self._kind
+        else:
+            ret._kind = _classify(ret._m)
+
         return ret
 
 
@@ -1120,68 +1979,97 @@ class Matrix44(object):
         """Returns the inverse (matrix with the opposite effect) of this
         matrix."""
 
+        inverse = self._inverse
+        if inverse:
+            return inverse.copy()
+
         ret = self.__new__(self.__class__, object)
-        i = self._m
+        ret._m = _inverse_kernels[self._kind](self._m)
+        ret._kind = self._kind
+        ret._inverse = False
+        if inverse is None:
+            self._inverse = ret
+            return ret.copy()
+        return ret
 
-        i0,  i1,  i2,  i3, \
-        i4,  i5,  i6,  i7, \
-        i8,  i9,  i10, i11, \
-        i12, i13, i14, i15 = i
 
-        negpos=[0., 0.]
-        temp = i0 * i5 * i10
-        negpos[temp > 0.] += temp
+    def make_inverse(self, other):
+
+        """Makes the inverse of another Matrix44 (which may be this
+        matrix). The quickest method for the kind of matrix is used."""
+
+        inverse = other._inverse
+        if inverse:
+            _store(self, inverse._m)
+            self._kind = inverse._kind
+            if self._inverse:
+                self._inverse = None
+        else:
+            _set_inverse(self, other)
+        return self
+
 
-        temp = i1 * i6 * i8
-        negpos[temp > 0.] += temp
+    def invert(self):
 
-        temp = i2 * i4 * i9
-        negpos[temp > 0.] += temp
+        """Inverts this matrix."""
 
-        temp = -i2 * i5 * i8
-        negpos[temp > 0.] += temp
+        inverse = self._inverse
+        if inverse:
+            # The inverse of the inverse is this matrix
+            inverse._m, self._m = self._m[:], inverse._m[:]
+            inverse._kind, self._kind = self._kind, inverse._kind
+        else:
+            _set_inverse(self, self)
 
-        temp = -i1 * i4 * i10
-        negpos[temp > 0.] += temp
 
-        temp = -i0 * i6 * i9
-        negpos[temp > 0.] += temp
+    def orthonormalise(self):
 
-        det_1 = negpos[0]+negpos[1]
+        """Removes any scale and skew from the upper 3x3 of the matrix, such
+        as the drift that builds up after many products of rotations. The x
+        axis keeps its direction, the y axis is made perpendicular to it, and
+        the z axis is recalculated from the x and y axis. The translation
+        and the right column are unchanged."""
 
-        if (det_1 == 0.) or (abs(det_1 / (negpos[1] - negpos[0])) < \
-                             (2. * 0.00000000000000001) ):
-            raise Matrix44Error("notivertable", "This Matrix44 can not be inverted")
+        kind = self._kind
+        if kind <= KIND_TRANSLATION:
+            return self
 
-        det_1 = 1. / det_1
+        m = self._m
+        _orthonormalise(m)
+        if kind == KIND_AFFINE:
+            if m[12] or m[13] or m[14]:
+                self._kind = KIND_RIGID
+            else:
+                self._kind = KIND_ROTATION
+        if self._inverse:
+            self._inverse = None
+        return self
 
-        ret._m = [ (i5*i10 - i6*i9)*det_1,
-                  -(i1*i10 - i2*i9)*det_1,
-                   (i1*i6 - i2*i5 )*det_1,
-                   0.0,
-                  -(i4*i10 - i6*i8)*det_1,
-                   (i0*i10 - i2*i8)*det_1,
-                  -(i0*i6 - i2*i4)*det_1,
-                   0.0,
-                  (i4*i9 - i5*i8 )*det_1,
-                  -(i0*i9 - i1*i8)*det_1,
-                   (i0*i5 - i1*i4)*det_1,
-                   0.0,
-                   0.0, 0.0, 0.0, 1.0 ]
+    orthonormalize = orthonormalise
 
-        m = ret._m
-        m[12] = - ( i12 * m[0] + i13 * m[4] + i14 * m[8] )
-        m[13] = - ( i12 * m[1] + i13 * m[5] + i14 * m[9] )
-        m[14] = - ( i12 * m[2] + i13 * m[6] + i14 * m[10] )
 
-        return ret
+    def enable_inverse_cache(self, enable=True):
 
+        """Enables (or disables) caching of the inverse. When enabled the
+        inverse is only calculated when it is first needed after the matrix
+        changes, so repeated calls to get_inverse and inverse_transform are
+        cheap.
 
-    def invert(self):
+        enable -- True to cache the inverse, False to stop caching
+
+        """
+
+        if enable:
+            if self._inverse is False:
+                self._inverse = None
+        else:
+            self._inverse = False
 
-        """Inverts this matrix."""
 
-        self._m[:] = self.get_inverse()._m
+    def _get_inverse_cached(self):
+        return self._inverse is not False
+    inverse_cached = property(_get_inverse_cached, None, None,
+                              "True if the inverse of this matrix is cached.")
 
 
     def move(self, forward=None, right=None, up=None):
@@ -1196,18 +2084,455 @@ class Matrix44(object):
 
         """
 
+        m = self._m
+        x, y, z = m[12], m[13], m[14]
+
         if forward is not None:
-            self.translate = Vector3(self.translate) + \
-                Vector3(self.forward) * forward
+            x += m[8] * forward
+            y += m[9] * forward
+            z += m[10] * forward
 
         if right is not None:
-            self.translate = Vector3(self.translate) + \
-                Vector3(self.right) * right
+            x += m[0] * right
+            y += m[1] * right
+            z += m[2] * right
 
         if up is not None:
-            self.translate = Vector3(self.translate) + \
-                Vector3(self.up) * up
+            x += m[4] * up
+            y += m[5] * up
+            z += m[6] * up
+
+        m[12] = x
+        m[13] = y
+        m[14] = z
+
+        # Adding a translation can only change these kinds
+        kind = self._kind
+        if kind == KIND_IDENTITY:
+            self._kind = KIND_TRANSLATION
+        elif kind == KIND_ROTATION:
+            self._kind = KIND_RIGID
+        if self._inverse:
+            self._inverse = None
+
+
+
+_m_slot = Matrix44.__dict__['_m']
+
+class Matrix44f(Matrix44):
+
+    """A Matrix44 that stores its values as 32 bit floats, in an array('f').
+    The array is created once and updated in place, so to_opengl can return
+    it without a copy and the same buffer may be handed to the renderer each
+    frame. Math is done in double precision, and rounded when it is stored.
+
+    Convert with Matrix44f.clone(matrix) and Matrix44.clone(matrix_f).
+
+    """
+
+    __slots__ = ()
+
+    # The array is stored in the _m slot of Matrix44, behind a property that
+    # rounds assigned values to 32 bit floats
+
+    def _get_m(self, _get=_m_slot.__get__):
+        return _get(self)
+    def _set_m(self, values, _get=_m_slot.__get__, _set=_m_slot.__set__):
+        try:
+            _get(self)[:] = array('f', values)
+        except AttributeError:
+            _set(self, array('f', values))
+    _m = property(_get_m, _set_m)
+
+
+    # Slices of an array('f') can only be assigned from another array('f')
+
+    def _set_row_0(self, values):
+        values = tuple(values)[:4]
+        self._m[0:len(values)] = array('f', map(float, values))
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
+    def _set_row_1(self, values):
+        values = tuple(values)[:4]
+        self._m[4:4+len(values)] = array('f', map(float, values))
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
+    def _set_row_2(self, values):
+        values = tuple(values)[:4]
+        self._m[8:8+len(values)] = array('f', map(float, values))
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
+    def _set_row_3(self, values):
+        values = tuple(values)[:4]
+        self._m[12:12+len(values)] = array('f', map(float, values))
+        self._kind = _classify(self._m)
+        if self._inverse:
+            self._inverse = None
+
+    _setters = (_set_row_0, _set_row_1, _set_row_2, _set_row_3)
+
+    _row0 = property(Matrix44._get_row_0.im_func, _set_row_0, None, "Row 0")
+    _row1 = property(Matrix44._get_row_1.im_func, _set_row_1, None, "Row 1")
+    _row2 = property(Matrix44._get_row_2.im_func, _set_row_2, None, "Row 2")
+    _row3 = property(Matrix44._get_row_3.im_func, _set_row_3, None, "Row 3")
+
+    x_axis = _row0
+    right = _row0
+    y_axis = _row1
+    up = _row1
+    z_axis = _row2
+    forward = _row2
+    translate = _row3
+
+
+    def to_opengl(self):
+        """Returns the array('f') that holds the values of the matrix (not a
+        copy). It supports the buffer interface, and is updated in place
+        when the matrix changes."""
+
+        return self._m
+
+
+class MatrixStack(object):
+
+    """A stack of matrices, like glPushMatrix and glPopMatrix. All the
+    matrices are created up front, so pushing and popping only copy values
+    and move the top of the stack. e.g.
+
+        stack = MatrixStack()
+        stack.push()
+        stack.mul(node_matrix)
+        draw(stack.top)
+        stack.pop()
+
+    """
+
+    __slots__ = ('_matrices', '_top')
+
+    def __init__(self, depth=32, matrix_class=Matrix44):
+        """Creates a stack with an identity matrix on top.
+
+        depth -- Maximum number of matrices on the stack
+        matrix_class -- Class of the matrices (Matrix44 or Matrix44f)
+
+        """
+
+        if depth < 1:
+            raise ValueError("Depth must be at least 1")
+        self._matrices = [ matrix_class() for _ in xrange(depth) ]
+        self._top = 0
+
+
+    def __len__(self):
+
+        return self._top + 1
+
+
+    def get_depth(self):
+        """Returns the maximum number of matrices on the stack."""
+
+        return len(self._matrices)
+
+
+    def _get_top(self):
+        return self._matrices[self._top]
+    top = property(_get_top, None, None, "The matrix on top of the stack. "
+                   "It is re-used after a pop, use top.copy() to keep it.")
+
+
+    def push(self):
+        """Pushes a copy of the top matrix on to the stack."""
+
+        top = self._top + 1
+        matrices = self._matrices
+        if top == len(matrices):
+            raise Matrix44Error("overflow", "MatrixStack is full")
+        source = matrices[top - 1]
+        matrix = matrices[top]
+        matrix._m[:] = source._m
+        matrix._kind = source._kind
+        if matrix._inverse:
+            matrix._inverse = None
+        self._top = top
+        return matrix
+
+
+    def pop(self):
+        """Pops the top matrix off the stack."""
+
+        if not self._top:
+            raise Matrix44Error("underflow", "Can not pop the last matrix")
+        self._top -= 1
+        return self._matrices[self._top]
+
+
+    def mul(self, matrix):
+        """Multiplies the top matrix by another, in place.
+
+        matrix -- A Matrix44
+
+        """
+
+        top = self._matrices[self._top]
+        top *= matrix
+        return top
+
+
+    def fast_mul(self, matrix):
+        """Multiplies the top matrix by an affine matrix, in place. See
+        Matrix44.fast_mul.
+
+        matrix -- A Matrix44
+
+        """
+
+        return self._matrices[self._top].fast_mul(matrix)
+
+
+    def load(self, matrix):
+        """Replaces the top matrix with a copy of another.
+
+        matrix -- A Matrix44
+
+        """
+
+        return self._matrices[self._top].make_copy(matrix)
+
+
+    def load_identity(self):
+        """Replaces the top matrix with the identity matrix."""
+
+        return self._matrices[self._top].make_identity()
+
+
+    def clear(self):
+        """Pops all but the bottom matrix, and sets it to identity."""
+
+        self._top = 0
+        return self.load_identity()
+
+
+# Steps recorded by a MatrixChain
+( _CHAIN_MUL,
+  _CHAIN_MUL_INVERSE,
+  _CHAIN_MUL_TRANSPOSE,
+  _CHAIN_INVERT,
+  _CHAIN_TRANSPOSE ) = range(5)
+
+
+class MatrixChain(object):
+
+    """Records a chain of matrix products (and inverses and transposes), to
+    be evaluated later. No intermediate matrices are created, each product
+    uses the cheapest kernel for the kinds of matrix involved, and the
+    result is re-used if the chain is evaluated again before any of its
+    matrices change. e.g.
+
+        chain = MatrixChain(projection, view, model)
+        ...
+        chain.evaluate(model_view_projection)
+
+    """
+
+    __slots__ = ( '_steps',
+                  '_inputs',
+                  '_snapshots',
+                  '_plan',
+                  '_result',
+                  '_run',
+                  '_scratch' )
+
+    def __init__(self, *matrices):
+        """Creates a chain that multiplies matrices together.
+
+        matrices -- Matrices to multiply, in the same order as the *
+        operator (i.e. the last matrix is applied to a point first)
+
+        """
+
+        self._steps = []
+        self._inputs = []
+        self._snapshots = None
+        self._plan = None
+        self._result = Matrix44()
+        self._run = Matrix44()
+        self._scratch = Matrix44()
+        for matrix in matrices:
+            self.mul(matrix)
+
+
+    def _add_step(self, step, matrix=None):
+        self._steps.append( (step, matrix) )
+        if matrix is not None:
+            self._inputs.append(matrix)
+        self._snapshots = None
+        self._plan = None
+        return self
+
+
+    def mul(self, matrix):
+        """Multiplies the chain by a matrix.
+
+        matrix -- A Matrix44 (read when the chain is evaluated)
+
+        """
+
+        return self._add_step(_CHAIN_MUL, matrix)
+
+
+    def mul_inverse(self, matrix):
+        """Multiplies the chain by the inverse of a matrix. If the matrix
+        has an up to date cached inverse, it is used.
+
+        matrix -- A Matrix44 (read when the chain is evaluated)
+
+        """
+
+        return self._add_step(_CHAIN_MUL_INVERSE, matrix)
+
+
+    def mul_transpose(self, matrix):
+        """Multiplies the chain by the transpose of a matrix.
+
+        matrix -- A Matrix44 (read when the chain is evaluated)
+
+        """
+
+        return self._add_step(_CHAIN_MUL_TRANSPOSE, matrix)
+
+
+    def invert(self):
+        """Inverts the product of the chain so far."""
+
+        return self._add_step(_CHAIN_INVERT)
+
+
+    def transpose(self):
+        """Transposes the product of the chain so far."""
+
+        return self._add_step(_CHAIN_TRANSPOSE)
+
+
+    def _first_changed(self):
+        """Returns the index of the first input that has changed since the
+        chain was evaluated, or None if no inputs have changed."""
+
+        snapshots = self._snapshots
+        if snapshots is None:
+            return 0
+        index = 0
+        for matrix, snapshot in izip(self._inputs, snapshots):
+            if matrix._m != snapshot:
+                return index
+            index += 1
+        return None
+
+
+    def is_current(self):
+        """Returns True if none of the matrices in the chain have changed
+        since it was last evaluated."""
+
+        return self._first_changed() is None
+
+
+    def _get_plan(self):
+        """Returns the steps with each run of multiplies grouped together,
+        as a list of (step, matrices) tuples."""
+
+        plan = self._plan
+        if plan is None:
+            plan = []
+            for step, matrix in self._steps:
+                if step == _CHAIN_MUL and plan and plan[-1][0] == _CHAIN_MUL:
+                    plan[-1][1].append(matrix)
+                else:
+                    plan.append( (step, [matrix]) )
+            self._plan = plan
+        return plan
+
+
+    def _evaluate(self):
+
+        result = self._result
+        run = self._run
+        scratch = self._scratch
+        first = True
+
+        for step, matrices in self._get_plan():
+
+            if step == _CHAIN_MUL:
+                # Multiply a run of matrices from the right, so that affine
+                # matrices (e.g. view and model) are multiplied together with
+                # a cheap kernel before any projection is applied
+                if len(matrices) == 1:
+                    if first:
+                        result.make_copy(matrices[0])
+                    else:
+                        _set_product(result, result, matrices[0])
+                else:
+                    target = result if first else run
+                    _set_product(target, matrices[-2], matrices[-1])
+                    for lhs in matrices[-3::-1]:
+                        _set_product(target, lhs, target)
+                    if not first:
+                        _set_product(result, result, run)
+                first = False
+                continue
+
+            if first:
+                result.make_identity()
+                first = False
+
+            if step == _CHAIN_MUL_INVERSE:
+                matrix = matrices[0]
+                inverse = matrix._inverse
+                if not inverse:
+                    _set_inverse(scratch, matrix)
+                    inverse = scratch
+                _set_product(result, result, inverse)
+            elif step == _CHAIN_MUL_TRANSPOSE:
+                scratch.make_copy(matrices[0])
+                scratch.transpose()
+                _set_product(result, result, scratch)
+            elif step == _CHAIN_INVERT:
+                _set_inverse(result, result)
+            else:
+                result.transpose()
+
+        if first:
+            result.make_identity()
+
+
+    def evaluate(self, out=None):
+        """Evaluates the chain, or re-uses the previous result if none of the
+        matrices have changed.
+
+        out -- Matrix44 to receive the result. If not given, a matrix owned
+        by the chain is returned, which must not be modified
+
+        """
 
+        changed = self._first_changed()
+        if changed is not None:
+            self._evaluate()
+            # Keep copies of the values of the inputs, to detect changes
+            # (inputs before the first change are already up to date)
+            inputs = self._inputs
+            snapshots = self._snapshots
+            if snapshots is None:
+                self._snapshots = [ matrix._m[:] for matrix in inputs ]
+            else:
+                for index in xrange(changed, len(inputs)):
+                    snapshots[index] = inputs[index]._m[:]
+        if out is None:
+            return self._result
+        return out.make_copy(self._result)
 
 
 def test():
@@ -0,0 +1,236 @@
+from matrix44 import Matrix44
+import batch
+
+
+class Matrix44Array(object):
+
+    """A sequence of 4x4 matrices stored in one contiguous block of floats
+    (16 per matrix, in the same order as Matrix44). Operations apply to every
+    matrix in one call.
+
+    """
+
+    __slots__ = ('_m', '_backend')
+
+
+    def __init__(self, size=0, use_numpy=False):
+        """Creates an array of identity matrices.
+
+        size -- Number of matrices
+        use_numpy -- If True, the matrices are stored in a NumPy array
+
+        """
+
+        self._backend = backend = batch.get_backend(use_numpy)
+        self._m = backend.identity_matrices(size)
+
+
+    @classmethod
+    def _from_values(cls, values, backend):
+        ma = cls.__new__(cls, object)
+        ma._backend = backend
+        ma._m = values
+        return ma
+
+
+    @classmethod
+    def from_matrices(cls, matrices, use_numpy=False):
+        """Creates a Matrix44Array from a sequence of Matrix44 objects.
+
+        matrices -- A sequence of matrices
+
+        """
+
+        values = []
+        extend = values.extend
+        for matrix in matrices:
+            extend(matrix.components())
+        return cls.from_iter(values, use_numpy)
+
+
+    @classmethod
+    def from_iter(cls, iterable, use_numpy=False):
+        """Creates a Matrix44Array from an iterable of floats (16 per
+        matrix)."""
+
+        backend = batch.get_backend(use_numpy)
+        values = backend.from_iter(iterable)
+        if len(values) % 16:
+            raise ValueError("Iterable must have a multiple of 16 values")
+        return cls._from_values(values, backend)
+
+
+    def to_matrices(self):
+        """Returns a list of Matrix44 objects."""
+
+        m = self._m
+        from_iter = Matrix44.from_iter
+        return [ from_iter(m[i:i+16]) for i in xrange(0, len(m), 16) ]
+
+
+    def copy(self):
+        """Returns a copy of this array."""
+
+        backend = self._backend
+        return self._from_values(backend.copy(self._m), backend)
+
+    __copy__ = copy
+
+
+    def __len__(self):
+
+        return len(self._m) // 16
+
+
+    def _offset(self, index):
+        count = len(self._m) // 16
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("Matrix44Array index out of range")
+        return index * 16
+
+
+    def __getitem__(self, index):
+        """Retrieves a copy of a matrix, as a Matrix44."""
+
+        i = self._offset(index)
+        return Matrix44.from_iter(self._m[i:i+16])
+
+
+    def __setitem__(self, index, matrix):
+        """Sets a matrix.
+
+        index -- Index of the matrix
+        matrix -- A Matrix44
+
+        """
+
+        i = self._offset(index)
+        self._backend.assign_range(self._m, i, tuple(matrix.components()))
+
+
+    def __iter__(self):
+        """Iterates over copies of the matrices, as Matrix44 objects."""
+
+        m = self._m
+        from_iter = Matrix44.from_iter
+        for i in xrange(0, len(m), 16):
+            yield from_iter(m[i:i+16])
+
+
+    def mul(self, rhs, out=None):
+        """Multiplies each matrix by a matrix (self[i] * rhs), or by the
+        corresponding matrix in another Matrix44Array (self[i] * rhs[i]).
+
+        rhs -- A Matrix44 or a Matrix44Array
+        out -- Matrix44Array to store the result in (may be self), if not
+        given a new Matrix44Array is returned
+
+        """
+
+        count = len(self._m) // 16
+        if out is not None and len(out._m) != len(self._m):
+            raise ValueError("Matrix44Arrays must be the same length")
+        if isinstance(rhs, Matrix44Array):
+            if len(rhs._m) != len(self._m):
+                raise ValueError("Matrix44Arrays must be the same length")
+            rhs_values = rhs._m
+            rhs_step = 16
+        else:
+            rhs_values = tuple(rhs.components())
+            rhs_step = 0
+
+        backend = self._backend
+        values = backend.mul_matrices(self._m, rhs_values, count, 16, rhs_step)
+
+        if out is None:
+            return self._from_values(values, backend)
+        out._backend.assign(out._m, values)
+        return out
+
+    __mul__ = mul
+
+    def __imul__(self, rhs):
+        return self.mul(rhs, self)
+
+
+    def rmul(self, lhs, out=None):
+        """Multiplies a matrix by each matrix in this array (lhs * self[i]).
+
+        lhs -- A Matrix44
+        out -- Matrix44Array to store the result in (may be self), if not
+        given a new Matrix44Array is returned
+
+        """
+
+        count = len(self._m) // 16
+        if out is not None and len(out._m) != len(self._m):
+            raise ValueError("Matrix44Arrays must be the same length")
+        lhs_values = tuple(lhs.components())
+
+        backend = self._backend
+        values = backend.mul_matrices(lhs_values, self._m, count, 0, 16)
+
+        if out is None:
+            return self._from_values(values, backend)
+        out._backend.assign(out._m, values)
+        return out
+
+
+    def transpose(self):
+        """Swaps the rows for columns of every matrix."""
+
+        self._backend.transpose_matrices(self._m)
+
+
+    def get_transpose(self):
+        """Returns a Matrix44Array with the rows and columns of every matrix
+        swapped."""
+
+        ret = self.copy()
+        ret.transpose()
+        return ret
+
+
+    def get_inverse_rot_trans(self):
+        """Returns a Matrix44Array containing the inverse of each matrix.
+        The matrices should contain only rotation and translation."""
+
+        backend = self._backend
+        return self._from_values(backend.inverse_rot_trans_matrices(self._m),
+                                 backend)
+
+
+    def orthonormalise(self):
+        """Removes any scale and skew from the upper 3x3 of every matrix, in
+        place. See Matrix44.orthonormalise."""
+
+        self._backend.orthonormalise_matrices(self._m)
+
+    orthonormalize = orthonormalise
+
+
+    def to_float32(self):
+        """Returns all the matrices in one contiguous block of 32 bit floats
+        (an array('f'), or a NumPy float32 array), ready to upload to the
+        GPU."""
+
+        return self._backend.to_float32(self._m)
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    matrices = [ Matrix44.z_rotation(radians(a)) for a in xrange(0, 90, 30) ]
+    for m in matrices:
+        m.translate = (1, 2, 3)
+
+    ma = Matrix44Array.from_matrices(matrices)
+    scale = Matrix44.scale(2.)
+    print (ma * scale)[1]
+    print matrices[1] * scale
+    print ma.get_inverse_rot_trans()[1]
+    print matrices[1].get_inverse_rot_trans()
+    print len(ma.to_float32())
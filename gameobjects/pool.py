@@ -0,0 +1,201 @@
+"""Free-list pools for re-using Vector3 and Matrix44 objects.
+
+Pooling is opt in. Objects are taken from a pool with acquire() and given
+back with release(), or acquired inside a scope which releases everything
+that was acquired in it on exit. e.g.
+
+    with pool.scope():
+        offset = pool.vector3(1., 2., 3.)
+        world = pool.matrix44_mul(parent, local)
+        ...
+
+Objects acquired in a scope must not be used after the scope exits, and
+must not be released by hand. Free lists are kept per thread.
+
+"""
+
+import threading
+
+from vector3 import Vector3
+from matrix44 import Matrix44
+
+
+class _PoolState(threading.local):
+
+    def __init__(self):
+        self.free = []
+        self.scopes = []
+
+
+class ObjectPool(object):
+
+    def __init__(self, create, capacity=1024):
+        """Creates a pool of objects.
+
+        create -- Callable that creates a new object when the free list is
+        empty
+        capacity -- Maximum number of free objects kept (per thread)
+
+        """
+
+        self.create = create
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._state = _PoolState()
+
+
+    def acquire(self):
+        """Returns an object from the free list, or a new object if the free
+        list is empty. The contents of the object are undefined."""
+
+        state = self._state
+        free = state.free
+        if free:
+            self.hits += 1
+            obj = free.pop()
+        else:
+            self.misses += 1
+            obj = self.create()
+        if state.scopes:
+            state.scopes[-1].append(obj)
+        return obj
+
+
+    def release(self, obj):
+        """Returns an object to the free list.
+
+        obj -- An object that will no longer be used by the caller
+
+        """
+
+        free = self._state.free
+        if len(free) < self.capacity:
+            free.append(obj)
+
+
+    def scope(self):
+        """Returns a context manager that releases all the objects acquired
+        from this pool (in this thread) when it exits."""
+
+        return PoolScope(self)
+
+
+    def get_stats(self):
+        """Returns a tuple of the number of hits, misses, and the hit rate.
+        Counts are shared between threads and are approximate."""
+
+        total = self.hits + self.misses
+        if total:
+            return self.hits, self.misses, float(self.hits) / total
+        return self.hits, self.misses, 0.0
+
+
+    def reset_stats(self):
+        """Sets the hit and miss counts to zero."""
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def clear(self):
+        """Empties the free list (for the current thread)."""
+
+        del self._state.free[:]
+
+
+class PoolScope(object):
+
+    """Context manager that releases objects acquired while it is active.
+    Scopes may be nested."""
+
+    def __init__(self, *pools):
+
+        self.pools = pools
+
+    def __enter__(self):
+
+        for pool in self.pools:
+            pool._state.scopes.append([])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        for pool in self.pools:
+            state = pool._state
+            acquired = state.scopes.pop()
+            free = state.free
+            capacity = pool.capacity
+            free.extend(acquired[:max(0, capacity - len(free))])
+        return False
+
+
+vector3_pool = ObjectPool(Vector3)
+matrix44_pool = ObjectPool(Matrix44)
+
+
+def scope():
+    """Returns a context manager that releases all the vectors and matrices
+    acquired from the default pools when it exits."""
+
+    return PoolScope(vector3_pool, matrix44_pool)
+
+
+def get_stats():
+    """Returns a dictionary of the stats (hits, misses, hit rate) of the
+    default pools."""
+
+    return { 'vector3' : vector3_pool.get_stats(),
+             'matrix44' : matrix44_pool.get_stats() }
+
+
+def vector3(x, y, z):
+    """Acquires a Vector3 and sets its components."""
+
+    return vector3_pool.acquire().set(x, y, z)
+
+
+def vector3_copy(v):
+    """Acquires a Vector3 that is a copy of another vector."""
+
+    x, y, z = v
+    return vector3_pool.acquire().set(x, y, z)
+
+
+def matrix44_identity():
+    """Acquires an identity Matrix44."""
+
+    return matrix44_pool.acquire().make_identity()
+
+
+def matrix44_copy(m):
+    """Acquires a Matrix44 that is a copy of another."""
+
+    return matrix44_pool.acquire().make_copy(m)
+
+
+def matrix44_mul(lhs, rhs):
+    """Acquires a Matrix44 that is the product of two matrices (lhs * rhs)."""
+
+    return matrix44_pool.acquire().make_product(lhs, rhs)
+
+
+def matrix44_inverse(m):
+    """Acquires a Matrix44 that is the inverse of another."""
+
+    return matrix44_pool.acquire().make_inverse(m)
+
+
+if __name__ == "__main__":
+
+    parent = Matrix44.translation(1, 2, 3)
+    local = Matrix44.z_rotation(1.)
+
+    for frame in xrange(3):
+        with scope():
+            world = matrix44_mul(parent, local)
+            inverse = matrix44_inverse(world)
+            offset = vector3(*world.transform((1, 0, 0)))
+
+    print world
+    print get_stats()
@@ -0,0 +1,517 @@
+"""A loose quadtree, for finding 2D circles and rectangles that overlap.
+
+Each node of a loose quadtree has loose bounds twice the size of its
+quarter of the world, so an object can be placed in a node from its size and
+the position of its centre alone, without checking the nodes it overlaps.
+Nodes are created only when they contain objects, so sparse regions cost no
+memory. Nodes are found by calculation rather than by walking down the tree.
+
+Objects are any hashable items, with a circle or rectangle as their shape.
+e.g.
+
+    tree = LooseQuadTree((0, 0), (1000, 1000))
+    tree.insert_circle(ship, ship.position, 10.)
+    ...
+    tree.move_circle(ship, ship.position)
+    for a, b in tree.query_pairs():
+        ...
+
+"""
+
+from math import floor, ceil, sqrt, log
+
+from vector2 import Vector2
+
+
+def _clamp(value, low, high):
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
+
+
+def _box_intersects_circle(x0, y0, x1, y1, cx, cy, r):
+    """Returns True if a box overlaps a circle."""
+
+    dx = cx - _clamp(cx, x0, x1)
+    dy = cy - _clamp(cy, y0, y1)
+    return dx*dx + dy*dy <= r*r
+
+
+def _ray_box(ox, oy, dx, dy, x0, y0, x1, y1, max_distance):
+    """Returns the distance along a ray to a box, or None if the ray misses
+    it. The distance is 0 if the ray starts inside the box."""
+
+    t0 = 0.
+    t1 = max_distance
+    for o, d, low, high in ((ox, dx, x0, x1), (oy, dy, y0, y1)):
+        if d:
+            near = (low - o) / d
+            far = (high - o) / d
+            if near > far:
+                near, far = far, near
+            if near > t0:
+                t0 = near
+            if far < t1:
+                t1 = far
+            if t0 > t1:
+                return None
+        elif o < low or o > high:
+            return None
+    return t0
+
+
+def _ray_circle(ox, oy, dx, dy, cx, cy, r, max_distance):
+    """Returns the distance along a ray (with a normalised direction) to a
+    circle, or None if the ray misses it."""
+
+    fx = ox - cx
+    fy = oy - cy
+    c = fx*fx + fy*fy - r*r
+    if c <= 0.:
+        return 0.
+    b = fx*dx + fy*dy
+    if b > 0.:
+        return None
+    d = b*b - c
+    if d < 0.:
+        return None
+    t = -b - sqrt(d)
+    if t > max_distance:
+        return None
+    return t
+
+
+class LooseQuadTree(object):
+
+    __slots__ = ( '_origin',
+                  '_size',
+                  '_max_depth',
+                  '_levels',
+                  '_nodes' )
+
+    def __init__(self, rect_min, rect_max, max_depth=8):
+        """Creates an empty quadtree. Objects may be placed outside of the
+        bounds, but they are all kept in the root node.
+
+        rect_min -- Corner of the world with the lowest x and y
+        rect_max -- Corner of the world with the highest x and y
+        max_depth -- Depth of the smallest nodes
+
+        """
+
+        x0, y0 = rect_min
+        x1, y1 = rect_max
+        self._origin = (float(x0), float(y0))
+        self._size = float(max(x1 - x0, y1 - y0))
+        if self._size <= 0.:
+            raise ValueError("Bounds must have a size")
+        self._max_depth = max_depth
+        # For each depth, maps a node (x, y) on to a dictionary of
+        # item : (x0, y0, x1, y1, radius), radius is None for rectangles
+        self._levels = [ {} for _ in xrange(max_depth + 1) ]
+        # Maps an item on to the depth and key of its node
+        self._nodes = {}
+
+
+    def __len__(self):
+
+        return len(self._nodes)
+
+    def __contains__(self, item):
+
+        return item in self._nodes
+
+    def __iter__(self):
+        """Iterates over all the items."""
+
+        return iter(self._nodes)
+
+
+    def _find_node(self, x0, y0, x1, y1):
+        """Returns the depth and key of the node for a bounding box."""
+
+        extent = max(x1 - x0, y1 - y0)
+        cx = (x0 + x1) * .5
+        cy = (y0 + y1) * .5
+        ox, oy = self._origin
+        root_size = self._size
+        if not (ox <= cx < ox + root_size and oy <= cy < oy + root_size):
+            return 0, (0, 0)
+
+        # The deepest node with a size at least the extent of the object
+        if extent > 0.:
+            depth = int(floor(log(root_size / extent, 2)))
+            depth = min(max(depth, 0), self._max_depth)
+            while depth and root_size / (1 << depth) < extent:
+                depth -= 1
+        else:
+            depth = self._max_depth
+
+        scale = (1 << depth) / root_size
+        return depth, ( int((cx - ox) * scale), int((cy - oy) * scale) )
+
+
+    def _add(self, item, entry):
+        depth, key = self._nodes[item] = self._find_node(*entry[:4])
+        level = self._levels[depth]
+        try:
+            level[key][item] = entry
+        except KeyError:
+            level[key] = { item : entry }
+
+
+    def _update(self, item, entry):
+        depth, key = self._nodes[item]
+        new_depth, new_key = self._find_node(*entry[:4])
+        if depth == new_depth and key == new_key:
+            self._levels[depth][key][item] = entry
+            return
+        level = self._levels[depth]
+        node = level[key]
+        del node[item]
+        if not node:
+            del level[key]
+        self._nodes[item] = (new_depth, new_key)
+        level = self._levels[new_depth]
+        try:
+            level[new_key][item] = entry
+        except KeyError:
+            level[new_key] = { item : entry }
+
+
+    def _get_entry(self, item):
+        depth, key = self._nodes[item]
+        return self._levels[depth][key][item]
+
+
+    def insert_circle(self, item, centre, radius):
+        """Adds a circle.
+
+        item -- Any hashable object
+        centre -- A Vector2 (or sequence of 2 values)
+        radius -- Radius of the circle
+
+        """
+
+        if item in self._nodes:
+            raise ValueError("Item is already in the quadtree")
+        x, y = centre
+        r = float(radius)
+        self._add(item, (x - r, y - r, x + r, y + r, r))
+
+
+    def insert_rect(self, item, rect_min, rect_max):
+        """Adds an axis aligned rectangle.
+
+        item -- Any hashable object
+        rect_min -- Corner of the rectangle with the lowest x and y
+        rect_max -- Corner of the rectangle with the highest x and y
+
+        """
+
+        if item in self._nodes:
+            raise ValueError("Item is already in the quadtree")
+        x0, y0 = rect_min
+        x1, y1 = rect_max
+        self._add(item, (float(x0), float(y0), float(x1), float(y1), None))
+
+
+    def move_circle(self, item, centre, radius=None):
+        """Moves (or resizes) a circle. Cheap if it stays in the same node.
+
+        item -- A circle in the quadtree
+        centre -- The new centre
+        radius -- The new radius, or None to keep the same radius
+
+        """
+
+        if radius is None:
+            radius = self._get_entry(item)[4]
+            if radius is None:
+                raise ValueError("Item is not a circle")
+        x, y = centre
+        r = float(radius)
+        self._update(item, (x - r, y - r, x + r, y + r, r))
+
+
+    def move_rect(self, item, rect_min, rect_max):
+        """Moves (or resizes) a rectangle. Cheap if it stays in the same
+        node.
+
+        item -- A rectangle in the quadtree
+        rect_min -- The new corner with the lowest x and y
+        rect_max -- The new corner with the highest x and y
+
+        """
+
+        x0, y0 = rect_min
+        x1, y1 = rect_max
+        self._update(item, (float(x0), float(y0), float(x1), float(y1), None))
+
+
+    def remove(self, item):
+        """Removes an item."""
+
+        depth, key = self._nodes.pop(item)
+        level = self._levels[depth]
+        node = level[key]
+        del node[item]
+        if not node:
+            del level[key]
+
+
+    def clear(self):
+        """Removes all the items."""
+
+        for level in self._levels:
+            level.clear()
+        self._nodes.clear()
+
+
+    def get_bounds(self, item):
+        """Returns the bounding box of an item, as two Vector2s (the
+        minimum and maximum corners)."""
+
+        x0, y0, x1, y1, r = self._get_entry(item)
+        return Vector2.from_floats(x0, y0), Vector2.from_floats(x1, y1)
+
+
+    def _iter_nodes(self, x0, y0, x1, y1, first_depth=0):
+        """Iterates over the (depth, key, node) of the non-empty nodes, at
+        first_depth or deeper, with loose bounds that overlap a box."""
+
+        ox, oy = self._origin
+        root_size = self._size
+        levels = self._levels
+
+        if first_depth == 0:
+            root = levels[0].get((0, 0))
+            if root is not None:
+                yield 0, (0, 0), root
+            first_depth = 1
+
+        for depth in xrange(first_depth, self._max_depth + 1):
+            level = levels[depth]
+            if not level:
+                continue
+            count = 1 << depth
+            s = root_size / count
+            # Loose bounds extend half a node beyond the node on every side
+            ix0 = max(int(ceil((x0 - ox) / s - 1.5)), 0)
+            iy0 = max(int(ceil((y0 - oy) / s - 1.5)), 0)
+            ix1 = min(int(floor((x1 - ox) / s + .5)), count - 1)
+            iy1 = min(int(floor((y1 - oy) / s + .5)), count - 1)
+            if ix0 > ix1 or iy0 > iy1:
+                continue
+
+            if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(level):
+                for key, node in level.iteritems():
+                    ix, iy = key
+                    if ix0 <= ix <= ix1 and iy0 <= iy <= iy1:
+                        yield depth, key, node
+            else:
+                get = level.get
+                for iy in xrange(iy0, iy1 + 1):
+                    for ix in xrange(ix0, ix1 + 1):
+                        node = get((ix, iy))
+                        if node is not None:
+                            yield depth, (ix, iy), node
+
+
+    def query_rect(self, rect_min, rect_max):
+        """Returns a list of the items that overlap a rectangle.
+
+        rect_min -- Corner of the rectangle with the lowest x and y
+        rect_max -- Corner of the rectangle with the highest x and y
+
+        """
+
+        qx0, qy0 = rect_min
+        qx1, qy1 = rect_max
+        ret = []
+        append = ret.append
+        for depth, key, node in self._iter_nodes(qx0, qy0, qx1, qy1):
+            for item, (x0, y0, x1, y1, r) in node.iteritems():
+                if x0 > qx1 or x1 < qx0 or y0 > qy1 or y1 < qy0:
+                    continue
+                if r is None or _box_intersects_circle(qx0, qy0, qx1, qy1,
+                                                       x0 + r, y0 + r, r):
+                    append(item)
+        return ret
+
+
+    def query_circle(self, centre, radius):
+        """Returns a list of the items that overlap a circle.
+
+        centre -- A Vector2 (or sequence of 2 values)
+        radius -- Radius of the circle
+
+        """
+
+        cx, cy = centre
+        qx0 = cx - radius
+        qy0 = cy - radius
+        qx1 = cx + radius
+        qy1 = cy + radius
+        ret = []
+        append = ret.append
+        for depth, key, node in self._iter_nodes(qx0, qy0, qx1, qy1):
+            for item, (x0, y0, x1, y1, r) in node.iteritems():
+                if x0 > qx1 or x1 < qx0 or y0 > qy1 or y1 < qy0:
+                    continue
+                if r is None:
+                    if _box_intersects_circle(x0, y0, x1, y1, cx, cy, radius):
+                        append(item)
+                else:
+                    dx = x0 + r - cx
+                    dy = y0 + r - cy
+                    d = r + radius
+                    if dx*dx + dy*dy <= d*d:
+                        append(item)
+        return ret
+
+
+    def query_point(self, point):
+        """Returns a list of the items that contain a point.
+
+        point -- A Vector2 (or sequence of 2 values)
+
+        """
+
+        x, y = point
+        ret = []
+        append = ret.append
+        for depth, key, node in self._iter_nodes(x, y, x, y):
+            for item, (x0, y0, x1, y1, r) in node.iteritems():
+                if x < x0 or x > x1 or y < y0 or y > y1:
+                    continue
+                if r is None:
+                    append(item)
+                else:
+                    dx = x0 + r - x
+                    dy = y0 + r - y
+                    if dx*dx + dy*dy <= r*r:
+                        append(item)
+        return ret
+
+
+    def raycast(self, origin, direction, max_distance=None):
+        """Returns a list of (distance, item) tuples for the items hit by a
+        ray, nearest first.
+
+        origin -- Start of the ray
+        direction -- Direction of the ray (need not be normalised)
+        max_distance -- Length of the ray, or None for a ray of unlimited
+        length
+
+        """
+
+        ox, oy = origin
+        dx, dy = direction
+        l = sqrt(dx*dx + dy*dy)
+        if not l:
+            raise ValueError("Direction must not be a null vector")
+        dx /= l
+        dy /= l
+
+        root_distance = max_distance
+        if max_distance is None:
+            # Far enough to leave the loose bounds of every node. Items in
+            # the root node may be anywhere, so the ray is not limited for
+            # those.
+            rx, ry = self._origin
+            size = self._size
+            max_distance = max( sqrt((x - ox)**2 + (y - oy)**2)
+                                for x in (rx - size, rx + size * 2.)
+                                for y in (ry - size, ry + size * 2.) )
+            root_distance = float('inf')
+
+        ex = ox + dx * max_distance
+        ey = oy + dy * max_distance
+        ret = []
+        append = ret.append
+        root_size = self._size
+        rx, ry = self._origin
+
+        for depth, (ix, iy), node in self._iter_nodes( min(ox, ex),
+                                                       min(oy, ey),
+                                                       max(ox, ex),
+                                                       max(oy, ey) ):
+            if depth:
+                s = root_size / (1 << depth)
+                nx = rx + ix * s
+                ny = ry + iy * s
+                if _ray_box( ox, oy, dx, dy,
+                             nx - s * .5, ny - s * .5,
+                             nx + s * 1.5, ny + s * 1.5,
+                             max_distance ) is None:
+                    continue
+                distance = max_distance
+            else:
+                distance = root_distance
+
+            for item, (x0, y0, x1, y1, r) in node.iteritems():
+                t = _ray_box(ox, oy, dx, dy, x0, y0, x1, y1, distance)
+                if t is None:
+                    continue
+                if r is not None:
+                    t = _ray_circle( ox, oy, dx, dy, x0 + r, y0 + r, r,
+                                     distance )
+                    if t is None:
+                        continue
+                append( (t, item) )
+
+        ret.sort(key=lambda hit: hit[0])
+        return ret
+
+
+    def query_pairs(self):
+        """Returns a list of (item, item) tuples for every pair of items with
+        overlapping bounding boxes (the candidates for collision tests).
+        Each pair is returned once."""
+
+        ret = []
+        append = ret.append
+        iter_nodes = self._iter_nodes
+
+        for depth, level in enumerate(self._levels):
+            for key, node in level.iteritems():
+                entries = node.items()
+                for i, (item1, (x0, y0, x1, y1, r)) in enumerate(entries):
+
+                    # Other items in the same node
+                    for item2, (bx0, by0, bx1, by1, br) in entries[i+1:]:
+                        if not (bx0 > x1 or bx1 < x0 or
+                                by0 > y1 or by1 < y0):
+                            append( (item1, item2) )
+
+                    # Items in other nodes at the same depth, or deeper
+                    for other_depth, other_key, other in \
+                            iter_nodes(x0, y0, x1, y1, depth):
+                        if other is node or \
+                           (other_depth == depth and other_key < key):
+                            continue
+                        for item2, (bx0, by0, bx1, by1, br) in \
+                                other.iteritems():
+                            if not (bx0 > x1 or bx1 < x0 or
+                                    by0 > y1 or by1 < y0):
+                                append( (item1, item2) )
+
+        return ret
+
+
+if __name__ == "__main__":
+
+    tree = LooseQuadTree((0, 0), (100, 100))
+    tree.insert_circle("a", (10, 10), 5)
+    tree.insert_circle("b", (14, 10), 2)
+    tree.insert_rect("c", (50, 50), (90, 60))
+    tree.insert_rect("d", (-20, -20), (-10, -10))
+    print sorted(tree.query_pairs())
+    print tree.query_point((55, 55))
+    print sorted(tree.query_circle((50, 10), 40))
+    print tree.raycast((0, 55), (1, 0))
+    tree.move_circle("b", (70, 58))
+    print sorted(tree.query_pairs())
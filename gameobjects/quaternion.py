@@ -0,0 +1,832 @@
+from math import sqrt, sin, cos, acos
+from itertools import izip
+
+from util import format_number
+from vector3 import Vector3
+from vector3array import Vector3Array
+from matrix44 import Matrix44
+from matrix44array import Matrix44Array
+import batch
+
+
+def _slerp(x1, y1, z1, w1, x2, y2, z2, w2, t):
+    """Spherical linear interpolation of two unit quaternions, returns a
+    tuple of 4 values. The shortest path is taken."""
+
+    d = x1*x2 + y1*y2 + z1*z2 + w1*w2
+    if d < 0.:
+        d = -d
+        x2 = -x2
+        y2 = -y2
+        z2 = -z2
+        w2 = -w2
+
+    if d > 0.9995:
+        # Very close, a (normalised) linear interpolation is accurate enough
+        x = x1 + (x2 - x1) * t
+        y = y1 + (y2 - y1) * t
+        z = z1 + (z2 - z1) * t
+        w = w1 + (w2 - w1) * t
+        l = 1. / sqrt(x*x + y*y + z*z + w*w)
+        return x*l, y*l, z*l, w*l
+
+    angle = acos(d)
+    sin_angle = sin(angle)
+    s1 = sin((1. - t) * angle) / sin_angle
+    s2 = sin(t * angle) / sin_angle
+    return ( x1*s1 + x2*s2,
+             y1*s1 + y2*s2,
+             z1*s1 + z2*s2,
+             w1*s1 + w2*s2 )
+
+
+def _rotation_values(x, y, z, w):
+    """Returns the 16 values of the rotation matrix of a quaternion."""
+
+    x2 = x + x
+    y2 = y + y
+    z2 = z + z
+
+    xx = x * x2
+    yy = y * y2
+    zz = z * z2
+    xy = x * y2
+    xz = x * z2
+    yz = y * z2
+    wx = w * x2
+    wy = w * y2
+    wz = w * z2
+
+    return ( 1.-(yy+zz), xy+wz,      xz-wy,      0.,
+             xy-wz,      1.-(xx+zz), yz+wx,      0.,
+             xz+wy,      yz-wx,      1.-(xx+yy), 0.,
+             0.,         0.,         0.,         1. )
+
+
+class Quaternion(object):
+
+    """A rotation, stored as 4 values (x, y, z, w). Quaternions are
+    multiplied in the same order as Matrix44 objects, i.e. q1 * q2 rotates by
+    q2 first, then by q1, and q.to_matrix44() equals the Matrix44 for the same
+    rotation.
+
+    """
+
+    __slots__ = ('_q',)
+
+
+    def __init__(self, x=0., y=0., z=0., w=1.):
+        """Creates a Quaternion from 4 values. No arguments result in the
+        identity quaternion (no rotation)."""
+
+        self._q = [float(x), float(y), float(z), float(w)]
+
+
+    @classmethod
+    def from_floats(cls, x, y, z, w):
+        """Creates a Quaternion from individual float values.
+        Warning: There is no checking (for efficiency) here: x, y, z, w _must_
+        be floats.
+
+        """
+        q = cls.__new__(cls, object)
+        q._q = [x, y, z, w]
+        return q
+
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a Quaternion from an iterable containing 4 values."""
+        next = iter(iterable).next
+        q = cls.__new__(cls, object)
+        q._q = [ float(next()), float(next()), float(next()), float(next()) ]
+        return q
+
+
+    @classmethod
+    def identity(cls):
+        """Creates a Quaternion that does no rotation."""
+        q = cls.__new__(cls, object)
+        q._q = [0., 0., 0., 1.]
+        return q
+
+
+    @classmethod
+    def from_axis_angle(cls, axis, angle):
+        """Creates a Quaternion that rotates about an axis. Matches
+        Matrix44.rotation_about_axis.
+
+        axis -- A unit vector for the axis of rotation
+        angle -- Angle of rotation, in radians
+
+        """
+
+        x, y, z = axis
+        half_angle = angle * .5
+        s = sin(half_angle)
+        return cls.from_floats(x*s, y*s, z*s, cos(half_angle))
+
+
+    @classmethod
+    def from_xyz_rotation(cls, angle_x, angle_y, angle_z):
+        """Creates a Quaternion that does a rotation about each axis. Matches
+        Matrix44.xyz_rotation.
+
+        angle_x -- Angle of rotation, about x
+        angle_y -- Angle of rotation, about y
+        angle_z -- Angle of rotation, about z
+
+        """
+
+        sx = sin(angle_x * .5)
+        cx = cos(angle_x * .5)
+        sy = sin(angle_y * .5)
+        cy = cos(angle_y * .5)
+        sz = sin(angle_z * .5)
+        cz = cos(angle_z * .5)
+
+        return cls.from_floats( sx*cy*cz + cx*sy*sz,
+                                cx*sy*cz - sx*cy*sz,
+                                cx*cy*sz + sx*sy*cz,
+                                cx*cy*cz - sx*sy*sz )
+
+
+    @classmethod
+    def from_matrix44(cls, m):
+        """Creates a Quaternion from the rotation in a Matrix44. The upper 3x3
+        of the matrix should be a rotation (with no scale).
+
+        m -- A Matrix44
+
+        """
+
+        m0,  m1,  m2,  m3, \
+        m4,  m5,  m6,  m7, \
+        m8,  m9,  m10, m11, \
+        m12, m13, m14, m15 = m.components()
+
+        trace = m0 + m5 + m10
+        if trace > 0.:
+            s = .5 / sqrt(trace + 1.)
+            return cls.from_floats( (m6 - m9) * s,
+                                    (m8 - m2) * s,
+                                    (m1 - m4) * s,
+                                    .25 / s )
+        if m0 > m5 and m0 > m10:
+            s = 2. * sqrt(1. + m0 - m5 - m10)
+            return cls.from_floats( .25 * s,
+                                    (m4 + m1) / s,
+                                    (m8 + m2) / s,
+                                    (m6 - m9) / s )
+        if m5 > m10:
+            s = 2. * sqrt(1. + m5 - m0 - m10)
+            return cls.from_floats( (m4 + m1) / s,
+                                    .25 * s,
+                                    (m9 + m6) / s,
+                                    (m8 - m2) / s )
+        s = 2. * sqrt(1. + m10 - m0 - m5)
+        return cls.from_floats( (m8 + m2) / s,
+                                (m9 + m6) / s,
+                                .25 * s,
+                                (m1 - m4) / s )
+
+
+    def copy(self):
+        """Returns a copy of this quaternion."""
+
+        q = self.__new__(self.__class__, object)
+        q._q = self._q[:]
+        return q
+
+    __copy__ = copy
+
+
+    def _get_x(self):
+        return self._q[0]
+    def _set_x(self, x):
+        self._q[0] = 1.0 * x
+    x = property(_get_x, _set_x, None, "x component.")
+
+    def _get_y(self):
+        return self._q[1]
+    def _set_y(self, y):
+        self._q[1] = 1.0 * y
+    y = property(_get_y, _set_y, None, "y component.")
+
+    def _get_z(self):
+        return self._q[2]
+    def _set_z(self, z):
+        self._q[2] = 1.0 * z
+    z = property(_get_z, _set_z, None, "z component.")
+
+    def _get_w(self):
+        return self._q[3]
+    def _set_w(self, w):
+        self._q[3] = 1.0 * w
+    w = property(_get_w, _set_w, None, "w component.")
+
+
+    def set(self, x, y, z, w):
+        """Sets the components of this quaternion."""
+
+        q = self._q
+        q[0] = x * 1.0
+        q[1] = y * 1.0
+        q[2] = z * 1.0
+        q[3] = w * 1.0
+        return self
+
+
+    def __str__(self):
+
+        return "(%s)" % ", ".join(format_number(c) for c in self._q)
+
+
+    def __repr__(self):
+
+        x, y, z, w = self._q
+        return "Quaternion(%s, %s, %s, %s)" % (x, y, z, w)
+
+
+    def __len__(self):
+
+        return 4
+
+    def __iter__(self):
+        """Iterates the components in x, y, z, w order."""
+        return iter(self._q[:])
+
+    def __getitem__(self, index):
+        """Retrieves a component, given its index.
+
+        index -- 0, 1, 2 or 3 for x, y, z or w
+
+        """
+        try:
+            return self._q[index]
+        except IndexError:
+            raise IndexError("There are 4 values in this object, index should be 0, 1, 2 or 3!")
+
+
+    def __eq__(self, rhs):
+
+        x, y, z, w = self._q
+        xx, yy, zz, ww = rhs
+        return x==xx and y==yy and z==zz and w==ww
+
+    def __ne__(self, rhs):
+
+        x, y, z, w = self._q
+        xx, yy, zz, ww = rhs
+        return x!=xx or y!=yy or z!=zz or w!=ww
+
+
+    def __mul__(self, rhs):
+        """Returns the product of this quaternion and another, which is the
+        rotation of rhs followed by the rotation of this quaternion.
+
+        rhs -- A Quaternion (or sequence of 4 values)
+
+        """
+
+        if isinstance(rhs, QuaternionArray):
+            return NotImplemented
+        x1, y1, z1, w1 = self._q
+        x2, y2, z2, w2 = rhs
+        return self.from_floats( w1*x2 + x1*w2 + y1*z2 - z1*y2,
+                                 w1*y2 - x1*z2 + y1*w2 + z1*x2,
+                                 w1*z2 + x1*y2 - y1*x2 + z1*w2,
+                                 w1*w2 - x1*x2 - y1*y2 - z1*z2 )
+
+
+    def __imul__(self, rhs):
+        """Multiplies this quaternion by another, in place."""
+
+        q = self._q
+        x1, y1, z1, w1 = q
+        x2, y2, z2, w2 = rhs
+        q[0] = w1*x2 + x1*w2 + y1*z2 - z1*y2
+        q[1] = w1*y2 - x1*z2 + y1*w2 + z1*x2
+        q[2] = w1*z2 + x1*y2 - y1*x2 + z1*w2
+        q[3] = w1*w2 - x1*x2 - y1*y2 - z1*z2
+        return self
+
+
+    def dot(self, other):
+        """Returns the dot product of this quaternion and another."""
+
+        x1, y1, z1, w1 = self._q
+        x2, y2, z2, w2 = other
+        return x1*x2 + y1*y2 + z1*z2 + w1*w2
+
+
+    def get_length(self):
+        """Returns the length of the quaternion (1 for a rotation)."""
+
+        x, y, z, w = self._q
+        return sqrt(x*x + y*y + z*z + w*w)
+    length = property(get_length, None, None, "Length of the quaternion.")
+
+
+    def normalise(self):
+        """Scales the quaternion to be length 1, correcting any drift from
+        repeated multiplication."""
+
+        q = self._q
+        x, y, z, w = q
+        l = 1. / sqrt(x*x + y*y + z*z + w*w)
+        q[0] = x * l
+        q[1] = y * l
+        q[2] = z * l
+        q[3] = w * l
+        return self
+    normalize = normalise
+
+
+    def get_normalised(self):
+        """Returns a normalised copy of this quaternion."""
+
+        x, y, z, w = self._q
+        l = 1. / sqrt(x*x + y*y + z*z + w*w)
+        return self.from_floats(x*l, y*l, z*l, w*l)
+    get_normalized = get_normalised
+
+
+    def conjugate(self):
+        """Reverses the rotation (for a unit quaternion), in place."""
+
+        q = self._q
+        q[0] = -q[0]
+        q[1] = -q[1]
+        q[2] = -q[2]
+        return self
+
+
+    def get_conjugate(self):
+        """Returns the conjugate of this quaternion."""
+
+        x, y, z, w = self._q
+        return self.from_floats(-x, -y, -z, w)
+
+
+    def get_inverse(self):
+        """Returns the inverse of this quaternion. For a unit quaternion this
+        is the same as the (cheaper) conjugate."""
+
+        x, y, z, w = self._q
+        l = x*x + y*y + z*z + w*w
+        return self.from_floats(-x/l, -y/l, -z/l, w/l)
+
+
+    def rotate(self, v):
+        """Rotates a vector and returns the result as a tuple. The quaternion
+        should be normalised.
+
+        v -- A vector (or sequence of 3 values)
+
+        """
+
+        qx, qy, qz, qw = self._q
+        vx, vy, vz = v
+
+        # t = 2 * cross(q.xyz, v)
+        tx = 2. * (qy*vz - qz*vy)
+        ty = 2. * (qz*vx - qx*vz)
+        tz = 2. * (qx*vy - qy*vx)
+
+        # v + w * t + cross(q.xyz, t)
+        return ( vx + qw*tx + qy*tz - qz*ty,
+                 vy + qw*ty + qz*tx - qx*tz,
+                 vz + qw*tz + qx*ty - qy*tx )
+
+
+    def rotate_vec3(self, v):
+        """Rotates a vector and returns the result as a Vector3.
+
+        v -- A vector (or sequence of 3 values)
+
+        """
+
+        return Vector3.from_floats(*self.rotate(v))
+
+
+    def get_axis_angle(self):
+        """Returns a tuple of the (unit) axis of rotation and the angle, in
+        radians. The quaternion should be normalised."""
+
+        x, y, z, w = self._q
+        w = max(-1., min(1., w))
+        s = sqrt(1. - w*w)
+        if s < 1e-12:
+            return (1., 0., 0.), 0.
+        return (x/s, y/s, z/s), 2. * acos(w)
+
+
+    def to_matrix44(self):
+        """Returns a Matrix44 that does the same rotation."""
+
+        return Matrix44.quaternion_rotation(self._q)
+
+
+    def nlerp(self, other, t):
+        """Returns a normalised linear interpolation between this quaternion
+        and another. Quicker than slerp, but the rotation does not change at
+        a constant speed.
+
+        other -- A Quaternion
+        t -- Amount to interpolate, 0 is this quaternion, 1 is other
+
+        """
+
+        x1, y1, z1, w1 = self._q
+        x2, y2, z2, w2 = other
+        if x1*x2 + y1*y2 + z1*z2 + w1*w2 < 0.:
+            x2 = -x2
+            y2 = -y2
+            z2 = -z2
+            w2 = -w2
+        x = x1 + (x2 - x1) * t
+        y = y1 + (y2 - y1) * t
+        z = z1 + (z2 - z1) * t
+        w = w1 + (w2 - w1) * t
+        l = 1. / sqrt(x*x + y*y + z*z + w*w)
+        return self.from_floats(x*l, y*l, z*l, w*l)
+
+
+    def slerp(self, other, t):
+        """Returns a spherical linear interpolation between this quaternion
+        and another.
+
+        other -- A Quaternion
+        t -- Amount to interpolate, 0 is this quaternion, 1 is other
+
+        """
+
+        x1, y1, z1, w1 = self._q
+        x2, y2, z2, w2 = other
+        return self.from_floats(*_slerp(x1, y1, z1, w1, x2, y2, z2, w2, t))
+
+
+class QuaternionArray(object):
+
+    """A sequence of quaternions, stored as four contiguous arrays of floats
+    (one for each of the x, y, z and w components).
+
+    """
+
+    __slots__ = ('_x', '_y', '_z', '_w', '_backend')
+
+
+    def __init__(self, size=0, use_numpy=False):
+        """Creates an array of identity quaternions.
+
+        size -- Number of quaternions in the array
+        use_numpy -- If True, components are stored in NumPy arrays
+
+        """
+
+        backend = batch.get_backend(use_numpy)
+        self._backend = backend
+        self._x = backend.zeros(size)
+        self._y = backend.zeros(size)
+        self._z = backend.zeros(size)
+        self._w = backend.full(size, 1.)
+
+
+    @classmethod
+    def _from_components(cls, backend, x, y, z, w):
+        qa = cls.__new__(cls, object)
+        qa._backend = backend
+        qa._x = x
+        qa._y = y
+        qa._z = z
+        qa._w = w
+        return qa
+
+
+    @classmethod
+    def from_components(cls, xs, ys, zs, ws, use_numpy=False):
+        """Creates a QuaternionArray from four sequences of the same length."""
+
+        if not len(xs) == len(ys) == len(zs) == len(ws):
+            raise ValueError("Component sequences must be the same length")
+        backend = batch.get_backend(use_numpy)
+        return cls._from_components( backend,
+                                     backend.from_iter(xs),
+                                     backend.from_iter(ys),
+                                     backend.from_iter(zs),
+                                     backend.from_iter(ws) )
+
+
+    @classmethod
+    def from_quaternions(cls, quaternions, use_numpy=False):
+        """Creates a QuaternionArray from a sequence of Quaternions (or any
+        other objects that contain 4 values)."""
+
+        quaternions = list(quaternions)
+        if not quaternions:
+            return cls(0, use_numpy)
+        xs, ys, zs, ws = zip(*quaternions)
+        return cls.from_components(xs, ys, zs, ws, use_numpy)
+
+
+    def to_quaternions(self):
+        """Returns a list of Quaternion objects."""
+
+        from_floats = Quaternion.from_floats
+        return [ from_floats(float(x), float(y), float(z), float(w))
+                 for x, y, z, w in izip(self._x, self._y, self._z, self._w) ]
+
+
+    def get_components(self):
+        """Returns the x, y, z and w component arrays (not copies)."""
+
+        return self._x, self._y, self._z, self._w
+
+
+    def copy(self):
+        """Returns a copy of this array."""
+
+        copy = self._backend.copy
+        return self._from_components( self._backend,
+                                      copy(self._x),
+                                      copy(self._y),
+                                      copy(self._z),
+                                      copy(self._w) )
+
+    __copy__ = copy
+
+
+    def __len__(self):
+
+        return len(self._x)
+
+
+    def __iter__(self):
+        """Iterates over the quaternions, yielding Quaternion objects."""
+
+        from_floats = Quaternion.from_floats
+        for x, y, z, w in izip(self._x, self._y, self._z, self._w):
+            yield from_floats(float(x), float(y), float(z), float(w))
+
+
+    def __getitem__(self, index):
+        """Retrieves a Quaternion (a copy) given its index."""
+
+        try:
+            return Quaternion.from_floats( float(self._x[index]),
+                                           float(self._y[index]),
+                                           float(self._z[index]),
+                                           float(self._w[index]) )
+        except IndexError:
+            raise IndexError("QuaternionArray index out of range")
+
+
+    def __setitem__(self, index, value):
+        """Sets a quaternion, given its index.
+
+        index -- Index of the quaternion
+        value -- A Quaternion, or sequence of 4 values
+
+        """
+
+        x, y, z, w = value
+        try:
+            self._x[index] = x
+            self._y[index] = y
+            self._z[index] = z
+            self._w[index] = w
+        except IndexError:
+            raise IndexError("QuaternionArray index out of range")
+
+
+    def _split(self, other):
+        """Returns the components of other, which may be a QuaternionArray or
+        a single quaternion."""
+
+        if isinstance(other, QuaternionArray):
+            if len(other._x) != len(self._x):
+                raise ValueError("QuaternionArrays must be the same length")
+            return other._x, other._y, other._z, other._w
+        x, y, z, w = other
+        return float(x), float(y), float(z), float(w)
+
+
+    def _product(self, x1, y1, z1, w1, x2, y2, z2, w2):
+
+        b = self._backend
+        add = b.add
+        sub = b.sub
+        mul = b.mul
+        return self._from_components(
+            b,
+            add(add(mul(w1, x2), mul(x1, w2)), sub(mul(y1, z2), mul(z1, y2))),
+            add(sub(mul(w1, y2), mul(x1, z2)), add(mul(y1, w2), mul(z1, x2))),
+            add(add(mul(w1, z2), mul(x1, y2)), sub(mul(z1, w2), mul(y1, x2))),
+            sub(sub(mul(w1, w2), mul(x1, x2)), add(mul(y1, y2), mul(z1, z2))) )
+
+
+    def __mul__(self, rhs):
+        """Multiplies each quaternion by a quaternion (self[i] * rhs), or by
+        the corresponding quaternion in another QuaternionArray."""
+
+        x2, y2, z2, w2 = self._split(rhs)
+        return self._product(self._x, self._y, self._z, self._w,
+                             x2, y2, z2, w2)
+
+
+    def __rmul__(self, lhs):
+        """Multiplies a quaternion by each quaternion (lhs * self[i])."""
+
+        x1, y1, z1, w1 = self._split(lhs)
+        return self._product(x1, y1, z1, w1,
+                             self._x, self._y, self._z, self._w)
+
+
+    def __imul__(self, rhs):
+
+        product = self * rhs
+        self._x = product._x
+        self._y = product._y
+        self._z = product._z
+        self._w = product._w
+        return self
+
+
+    def dot(self, other):
+        """Returns an array of the dot products of each quaternion with
+        another (or with the corresponding quaternion in a QuaternionArray).
+
+        """
+
+        b = self._backend
+        add = b.add
+        mul = b.mul
+        ox, oy, oz, ow = self._split(other)
+        return add( add(mul(self._x, ox), mul(self._y, oy)),
+                    add(mul(self._z, oz), mul(self._w, ow)) )
+
+
+    def normalise(self):
+        """Scales every quaternion to be length 1, in place."""
+
+        b = self._backend
+        scale = b.safe_reciprocal(b.sqrt(self.dot(self)))
+        self._x = b.imul(self._x, scale)
+        self._y = b.imul(self._y, scale)
+        self._z = b.imul(self._z, scale)
+        self._w = b.imul(self._w, scale)
+        return self
+    normalize = normalise
+
+
+    def get_normalised(self):
+        """Returns a copy of this array, with every quaternion normalised."""
+
+        return self.copy().normalise()
+    get_normalized = get_normalised
+
+
+    def conjugate(self):
+        """Reverses every rotation (for unit quaternions), in place."""
+
+        neg = self._backend.neg
+        self._x = neg(self._x)
+        self._y = neg(self._y)
+        self._z = neg(self._z)
+        return self
+
+
+    def get_conjugate(self):
+        """Returns a copy of this array, with every quaternion conjugated."""
+
+        return self.copy().conjugate()
+
+
+    def rotate(self, vectors):
+        """Rotates each vector in a Vector3Array by the corresponding
+        quaternion (or a single vector by every quaternion), and returns a
+        new Vector3Array.
+
+        vectors -- A Vector3Array of the same length, or a single vector
+
+        """
+
+        b = self._backend
+        add = b.add
+        sub = b.sub
+        mul = b.mul
+
+        if isinstance(vectors, Vector3Array):
+            if len(vectors) != len(self._x):
+                raise ValueError("Arrays must be the same length")
+            vx, vy, vz = vectors.get_components()
+        else:
+            vx, vy, vz = map(float, vectors)
+            vx, vy, vz = ( b.full(len(self._x), vx),
+                           b.full(len(self._x), vy),
+                           b.full(len(self._x), vz) )
+
+        qx, qy, qz, qw = self._x, self._y, self._z, self._w
+
+        # t = 2 * cross(q.xyz, v)
+        tx = mul(sub(mul(qy, vz), mul(qz, vy)), 2.)
+        ty = mul(sub(mul(qz, vx), mul(qx, vz)), 2.)
+        tz = mul(sub(mul(qx, vy), mul(qy, vx)), 2.)
+
+        # v + w * t + cross(q.xyz, t)
+        return Vector3Array._from_components(
+            b,
+            add(add(vx, mul(qw, tx)), sub(mul(qy, tz), mul(qz, ty))),
+            add(add(vy, mul(qw, ty)), sub(mul(qz, tx), mul(qx, tz))),
+            add(add(vz, mul(qw, tz)), sub(mul(qx, ty), mul(qy, tx))) )
+
+
+    def nlerp(self, other, t):
+        """Returns a QuaternionArray of the normalised linear interpolation
+        between each quaternion and another (or the corresponding quaternion
+        in a QuaternionArray).
+
+        other -- A QuaternionArray or a single quaternion
+        t -- Amount to interpolate, 0 is this array, 1 is other
+
+        """
+
+        b = self._backend
+        add = b.add
+        mul = b.mul
+        ox, oy, oz, ow = self._split(other)
+        # Negate other where needed, so that the shortest path is taken
+        t2 = b.from_iter( -t if d < 0. else t for d in self.dot(other) )
+        t1 = 1. - t
+        ret = self._from_components( b,
+                                     add(mul(self._x, t1), mul(ox, t2)),
+                                     add(mul(self._y, t1), mul(oy, t2)),
+                                     add(mul(self._z, t1), mul(oz, t2)),
+                                     add(mul(self._w, t1), mul(ow, t2)) )
+        return ret.normalise()
+
+
+    def slerp(self, other, t):
+        """Returns a QuaternionArray of the spherical linear interpolation
+        between each quaternion and another (or the corresponding quaternion
+        in a QuaternionArray).
+
+        other -- A QuaternionArray or a single quaternion
+        t -- Amount to interpolate, 0 is this array, 1 is other
+
+        """
+
+        count = len(self._x)
+        components = list(self._split(other))
+        for i, c in enumerate(components):
+            if batch.is_scalar(c):
+                components[i] = [c] * count
+        ox, oy, oz, ow = components
+
+        xs = []
+        ys = []
+        zs = []
+        ws = []
+        for x1, y1, z1, w1, x2, y2, z2, w2 in izip( self._x, self._y,
+                                                    self._z, self._w,
+                                                    ox, oy, oz, ow ):
+            x, y, z, w = _slerp(x1, y1, z1, w1, x2, y2, z2, w2, t)
+            xs.append(x)
+            ys.append(y)
+            zs.append(z)
+            ws.append(w)
+
+        from_iter = self._backend.from_iter
+        return self._from_components( self._backend,
+                                      from_iter(xs),
+                                      from_iter(ys),
+                                      from_iter(zs),
+                                      from_iter(ws) )
+
+
+    def to_matrix44_array(self):
+        """Returns a Matrix44Array containing the rotation matrix of each
+        quaternion."""
+
+        values = []
+        extend = values.extend
+        for x, y, z, w in izip(self._x, self._y, self._z, self._w):
+            extend(_rotation_values(x, y, z, w))
+        return Matrix44Array.from_iter( values,
+                                        self._backend is batch.numpy_backend )
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    q = Quaternion.from_axis_angle((0, 0, 1), radians(90))
+    print q
+    print q.rotate_vec3((1, 0, 0))
+    print q.to_matrix44()
+    print Matrix44.rotation_about_axis((0, 0, 1), radians(90))
+    print Quaternion.identity().slerp(q, .5).get_axis_angle()
+
+    qa = QuaternionArray.from_quaternions([q, q * q, Quaternion()])
+    print qa.rotate((1, 0, 0))
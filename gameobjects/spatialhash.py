@@ -0,0 +1,267 @@
+"""A uniform grid for finding 2D points near a position.
+
+Items (any hashable objects, such as sprites) are stored in the cell of a
+grid that contains their position. Only the cells that overlap a query are
+searched, and distances are compared squared so no square roots are taken.
+e.g.
+
+    spatial_hash = SpatialHash(50.)
+    for sprite in sprites:
+        spatial_hash.insert(sprite, sprite.position)
+    ...
+    spatial_hash.move(sprite, sprite.position)
+    near = spatial_hash.query_radius(player.position, 100.)
+
+For best results the cell size should be about the same as the radius of a
+typical query.
+
+"""
+
+from math import floor, ceil
+
+
+class SpatialHash(object):
+
+    __slots__ = ('_cell_size', '_scale', '_cells', '_keys')
+
+    def __init__(self, cell_size=50.):
+        """Creates an empty spatial hash.
+
+        cell_size -- Width and height of a grid cell
+
+        """
+
+        if cell_size <= 0.:
+            raise ValueError("Cell size must be greater than zero")
+        self._cell_size = float(cell_size)
+        self._scale = 1. / cell_size
+        # Maps a cell (x, y) on to a dictionary of item : position
+        self._cells = {}
+        # Maps an item on to the cell that contains it
+        self._keys = {}
+
+
+    def _get_cell_size(self):
+        return self._cell_size
+    cell_size = property(_get_cell_size, None, None, "Size of a cell.")
+
+
+    def __len__(self):
+
+        return len(self._keys)
+
+    def __contains__(self, item):
+
+        return item in self._keys
+
+    def __iter__(self):
+        """Iterates over all the items."""
+
+        return iter(self._keys)
+
+
+    def _key(self, x, y):
+        scale = self._scale
+        return ( int(floor(x * scale)), int(floor(y * scale)) )
+
+
+    def insert(self, item, position):
+        """Adds an item.
+
+        item -- Any hashable object
+        position -- A Vector2 (or sequence of 2 values)
+
+        """
+
+        if item in self._keys:
+            raise ValueError("Item is already in the spatial hash")
+        x, y = position
+        x = float(x)
+        y = float(y)
+        key = self._key(x, y)
+        self._keys[item] = key
+        try:
+            self._cells[key][item] = (x, y)
+        except KeyError:
+            self._cells[key] = { item : (x, y) }
+
+
+    def remove(self, item):
+        """Removes an item.
+
+        item -- An item in the spatial hash
+
+        """
+
+        key = self._keys.pop(item)
+        cell = self._cells[key]
+        del cell[item]
+        if not cell:
+            del self._cells[key]
+
+
+    def move(self, item, position):
+        """Changes the position of an item. Cheap if the item stays in the
+        same cell.
+
+        item -- An item in the spatial hash
+        position -- The new position
+
+        """
+
+        x, y = position
+        x = float(x)
+        y = float(y)
+        scale = self._scale
+        key = ( int(floor(x * scale)), int(floor(y * scale)) )
+        old_key = self._keys[item]
+        if key == old_key:
+            self._cells[key][item] = (x, y)
+            return
+
+        cell = self._cells[old_key]
+        del cell[item]
+        if not cell:
+            del self._cells[old_key]
+        self._keys[item] = key
+        try:
+            self._cells[key][item] = (x, y)
+        except KeyError:
+            self._cells[key] = { item : (x, y) }
+
+
+    def get_position(self, item):
+        """Returns the position of an item, as a tuple."""
+
+        return self._cells[self._keys[item]][item]
+
+
+    def clear(self):
+        """Removes all the items."""
+
+        self._cells.clear()
+        self._keys.clear()
+
+
+    def _iter_cells(self, x0, y0, x1, y1):
+        """Iterates over the non-empty cells that overlap a rectangle."""
+
+        scale = self._scale
+        cx0 = int(floor(x0 * scale))
+        cy0 = int(floor(y0 * scale))
+        cx1 = int(floor(x1 * scale))
+        cy1 = int(floor(y1 * scale))
+        cells = self._cells
+
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Cheaper to check every non-empty cell
+            for (cx, cy), cell in cells.iteritems():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield cell
+            return
+
+        get = cells.get
+        for cy in xrange(cy0, cy1 + 1):
+            for cx in xrange(cx0, cx1 + 1):
+                cell = get((cx, cy))
+                if cell is not None:
+                    yield cell
+
+
+    def query_radius(self, centre, radius):
+        """Returns a list of the items within a distance of a point.
+
+        centre -- A Vector2 (or sequence of 2 values)
+        radius -- Maximum distance from centre
+
+        """
+
+        x, y = centre
+        r2 = radius * radius
+        ret = []
+        append = ret.append
+        for cell in self._iter_cells(x - radius, y - radius,
+                                     x + radius, y + radius):
+            for item, (ix, iy) in cell.iteritems():
+                dx = ix - x
+                dy = iy - y
+                if dx*dx + dy*dy <= r2:
+                    append(item)
+        return ret
+
+
+    def query_rect(self, rect_min, rect_max):
+        """Returns a list of the items inside a rectangle.
+
+        rect_min -- Corner of the rectangle with the lowest x and y
+        rect_max -- Corner of the rectangle with the highest x and y
+
+        """
+
+        x0, y0 = rect_min
+        x1, y1 = rect_max
+        ret = []
+        append = ret.append
+        for cell in self._iter_cells(x0, y0, x1, y1):
+            for item, (x, y) in cell.iteritems():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    append(item)
+        return ret
+
+
+    def query_pairs(self, distance):
+        """Returns a list of (item, item) tuples for every pair of items
+        within a distance of each other. Each pair is returned once.
+
+        distance -- Maximum distance between the items in a pair
+
+        """
+
+        d2 = distance * distance
+        reach = int(ceil(distance * self._scale))
+        # Each pair of cells is visited once, by only looking 'forward'
+        offsets = [ (dx, dy) for dy in xrange(0, reach + 1)
+                             for dx in xrange(-reach, reach + 1)
+                             if dy > 0 or dx > 0 ]
+
+        cells = self._cells
+        get = cells.get
+        ret = []
+        append = ret.append
+
+        for (cx, cy), cell in cells.iteritems():
+
+            items = cell.items()
+            for i, (item1, (x1, y1)) in enumerate(items):
+                for item2, (x2, y2) in items[i+1:]:
+                    dx = x2 - x1
+                    dy = y2 - y1
+                    if dx*dx + dy*dy <= d2:
+                        append( (item1, item2) )
+
+            for ox, oy in offsets:
+                other = get((cx + ox, cy + oy))
+                if other is None:
+                    continue
+                for item1, (x1, y1) in items:
+                    for item2, (x2, y2) in other.iteritems():
+                        dx = x2 - x1
+                        dy = y2 - y1
+                        if dx*dx + dy*dy <= d2:
+                            append( (item1, item2) )
+
+        return ret
+
+
+if __name__ == "__main__":
+
+    from vector2 import Vector2
+
+    spatial_hash = SpatialHash(10.)
+    for i in xrange(10):
+        spatial_hash.insert(i, Vector2(i * 5., 0.))
+    print sorted(spatial_hash.query_radius((20., 0.), 6.))
+    print sorted(spatial_hash.query_rect((0., -1.), (12., 1.)))
+    spatial_hash.move(9, (21., 1.))
+    print sorted(spatial_hash.query_radius((20., 0.), 6.))
+    print sorted(spatial_hash.query_pairs(5.))
@@ -0,0 +1,105 @@
+import unittest
+
+from vector3 import Vector3
+from vector2 import Vector2
+from flatvector import FlatVector3, FlatVector2
+from sphere import Sphere
+
+class TestFlatVector3(unittest.TestCase):
+
+    def assertSame(self, flat, vector):
+        self.assertEqual(type(flat) is FlatVector3, True)
+        self.assertEqual(tuple(flat), tuple(vector))
+
+    def test_operators(self):
+        for values in [(1, 2, 3), (-4.5, 0, 7)]:
+            f = FlatVector3(values)
+            v = Vector3(values)
+            self.assertSame(f + (1, 1, 1), v + (1, 1, 1))
+            self.assertSame(f - (1, 2, 3), v - (1, 2, 3))
+            self.assertSame((1, 2, 3) - f, (1, 2, 3) - v)
+            self.assertSame(f * 3, v * 3)
+            self.assertSame(f * (1, 2, 3), v * (1, 2, 3))
+            self.assertSame(f / 2, v / 2)
+            self.assertSame(f / (2, 4, 8), v / (2, 4, 8))
+            self.assertSame(-f, -v)
+            self.assertEqual(f.length, v.length)
+            self.assertSame(f.get_normalised(), v.get_normalised())
+            self.assertEqual(f.dot((3, 2, 1)), v.dot((3, 2, 1)))
+            self.assertSame(f.cross((3, 2, 1)), v.cross((3, 2, 1)))
+            self.assertEqual(f.get_distance_to((1, 1, 1)),
+                             v.get_distance_to((1, 1, 1)))
+            self.assertEqual(f, v)
+            self.assertEqual(str(f), str(v))
+
+    def test_integer_components(self):
+        # Components assigned directly are not converted to floats, but must
+        # still divide like Vector3
+        f = FlatVector3()
+        f.x = 1
+        v = Vector3()
+        v.x = 1
+        self.assertSame(f / 2, v / 2)
+        self.assertSame(2 / FlatVector3(1, 2, 4), 2 / Vector3(1, 2, 4))
+        f.y = 3
+        f /= 2
+        self.assertEqual(tuple(f), (.5, 1.5, 0.))
+        f.z = 5
+        f.scalar_div(2)
+        self.assertEqual(tuple(f), (.25, .75, 2.5))
+        f.x = 1
+        self.assertEqual(tuple(f.get_scalar_div(4)), (.25, .1875, .625))
+
+    def test_in_place(self):
+        f = FlatVector3(1, 2, 3)
+        v = Vector3(1, 2, 3)
+        f += (1, 1, 1)
+        v += (1, 1, 1)
+        f *= 2
+        v *= 2
+        f.normalise()
+        v.normalise()
+        self.assertSame(f, v)
+        f.length = 5.
+        v.length = 5.
+        self.assertSame(f, v)
+
+    def test_in_sphere(self):
+        sphere = Sphere((1, 2, 3), 2.)
+        for point in [(1, 2, 3), (2, 3, 4), (3, 2, 3), (3.1, 2, 3)]:
+            self.assertEqual(FlatVector3(point).in_sphere(sphere),
+                             Vector3(point).in_sphere(sphere))
+
+class TestFlatVector2(unittest.TestCase):
+
+    def assertSame(self, flat, vector):
+        self.assertEqual(type(flat) is FlatVector2, True)
+        self.assertEqual(tuple(flat), tuple(vector))
+
+    def test_operators(self):
+        for values in [(1, 2), (-4.5, 7)]:
+            f = FlatVector2(*values)
+            v = Vector2(*values)
+            self.assertSame(f + (1, 1), v + (1, 1))
+            self.assertSame(f - (1, 2), v - (1, 2))
+            self.assertSame(f * 3, v * 3)
+            self.assertSame(f / 2, v / 2)
+            self.assertSame(f / (2, 4), v / (2, 4))
+            self.assertSame(-f, -v)
+            self.assertEqual(f.length, v.length)
+            self.assertSame(f.get_normalised(), v.get_normalised())
+            self.assertEqual(f.get_distance_to((1, 1)),
+                             v.get_distance_to((1, 1)))
+            self.assertEqual(f, v)
+
+    def test_integer_components(self):
+        f = FlatVector2()
+        f.x = 1
+        f.y = 3
+        self.assertSame(f / 2, Vector2(1, 3) / 2)
+        self.assertEqual(tuple(3 / f), (3., 1.))
+        f /= 2
+        self.assertEqual(tuple(f), (.5, 1.5))
+
+if __name__ == '__main__':
+    unittest.main()
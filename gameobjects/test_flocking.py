@@ -0,0 +1,108 @@
+import unittest
+import random
+
+from vector2 import Vector2
+from vector2array import Vector2Array
+from batch import numpy
+from flocking import Flock
+
+class TestFlock(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(3)
+        self.positions = [ Vector2(random.uniform(0., 200.),
+                                   random.uniform(0., 200.))
+                           for _ in xrange(200) ]
+        self.velocities = [ Vector2(random.uniform(-20., 20.),
+                                    random.uniform(-20., 20.))
+                            for _ in xrange(200) ]
+        self.flock = Flock(self.positions, self.velocities, radius=25.,
+                           max_speed=20., max_force=30.)
+        self.flock.set_weights(2., .5, .8)
+
+    def steering(self, index):
+        """The steering for one agent, with a loop over every agent."""
+        position = self.positions[index]
+        velocity = self.velocities[index]
+        neighbours = [ i for i, other in enumerate(self.positions)
+                       if i != index and
+                          position.get_distance_to(other) <= 25. ]
+        if not neighbours:
+            return Vector2()
+        centre = Vector2()
+        average = Vector2()
+        push = Vector2()
+        for i in neighbours:
+            centre += self.positions[i]
+            average += self.velocities[i]
+            away = position - self.positions[i]
+            d = away.get_length()
+            if 0. < d < 12.5:
+                push += away * ((12.5 - d) / d)
+        n = len(neighbours)
+        force = push * 2. + (average / n - velocity) * .5 + \
+                (centre / n - position) * .8
+        if force.get_length() > 30.:
+            force.length = 30.
+        return force
+
+    def test_neighbours(self):
+        for index in (0, 50, 199):
+            position = self.positions[index]
+            expected = [ i for i, other in enumerate(self.positions)
+                         if i != index and
+                            position.get_distance_to(other) <= 25. ]
+            self.assertEqual(sorted(self.flock.get_neighbours(index)),
+                             expected)
+
+    def test_steering(self):
+        steering = self.flock.get_steering()
+        for index in xrange(200):
+            for a, b in zip(steering[index], self.steering(index)):
+                self.assertAlmostEqual(a, b)
+
+    def test_step(self):
+        steering = self.flock.get_steering().to_vectors()
+        self.flock.step(.1)
+        for index in xrange(200):
+            velocity = self.velocities[index] + steering[index] * .1
+            if velocity.get_length() > 20.:
+                velocity.length = 20.
+            position = self.positions[index] + velocity * .1
+            for a, b in zip(self.flock.velocities[index], velocity):
+                self.assertAlmostEqual(a, b)
+            for a, b in zip(self.flock.positions[index], position):
+                self.assertAlmostEqual(a, b)
+        # The neighbours are found at the new positions
+        self.positions = self.flock.positions.to_vectors()
+        self.velocities = self.flock.velocities.to_vectors()
+        self.test_neighbours()
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        flock = Flock(Vector2Array.from_vectors(self.positions, True),
+                      Vector2Array.from_vectors(self.velocities, True),
+                      radius=25., max_speed=20., max_force=30.)
+        flock.set_weights(2., .5, .8)
+        for _ in xrange(3):
+            self.flock.step(.1)
+            flock.step(.1)
+        for a, b in zip(self.flock.positions.as_tuples(),
+                        flock.positions.as_tuples()):
+            self.assertAlmostEqual(a[0], b[0])
+            self.assertAlmostEqual(a[1], b[1])
+        self.assertEqual(sorted(flock.get_neighbours(7)),
+                         sorted(self.flock.get_neighbours(7)))
+
+    def test_empty(self):
+        backends = [False]
+        if numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            flock = Flock(Vector2Array(0, use_numpy), Vector2Array(0, use_numpy))
+            self.assertEqual(len(flock.get_steering()), 0)
+            flock.step(.1)
+            self.assertEqual(len(flock.positions), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from math import radians
+from random import Random
+
+import batch
+from matrix44 import Matrix44
+from vector3array import Vector3Array
+from frustum import Frustum, make_plane_cache
+
+class TestFrustum(unittest.TestCase):
+
+    def setUp(self):
+        random = Random(4)
+        self.centres = [ ( random.uniform(-60, 60),
+                           random.uniform(-60, 60),
+                           random.uniform(-120, 20) ) for _ in xrange(300) ]
+        self.radii = [ random.uniform(.1, 10) for _ in self.centres ]
+        self.box_mins = [ (x - r, y - r, z - r)
+                          for (x, y, z), r in zip(self.centres, self.radii) ]
+        self.box_maxs = [ (x + r * .5, y + r, z + r * 2.)
+                          for (x, y, z), r in zip(self.centres, self.radii) ]
+        projection = Matrix44.perspective_projection_fov(radians(60), 1.5,
+                                                         1., 100.)
+        self.frustums = []
+        for angle in (0, 10, 20, 90, 100):
+            view = Matrix44.y_rotation(radians(angle))
+            view.translate = (angle * .1, 0, 0)
+            self.frustums.append(Frustum(projection * view.get_inverse()))
+        self.backends = [False]
+        if batch.numpy is not None:
+            self.backends.append(True)
+
+    def test_spheres(self):
+        for use_numpy in self.backends:
+            centres = Vector3Array.from_vectors(self.centres, use_numpy)
+            cache = make_plane_cache(len(self.centres))
+            for frustum in self.frustums:
+                expected = [ frustum.test_sphere(c, r)
+                             for c, r in zip(self.centres, self.radii) ]
+                self.assertTrue(0 < sum(expected) < len(expected))
+                mask = frustum.cull_spheres(centres, self.radii)
+                self.assertEqual(map(bool, mask), expected)
+                mask = frustum.cull_spheres(centres, self.radii, cache)
+                self.assertEqual(map(bool, mask), expected)
+                self.assertEqual(frustum.visible_spheres(centres, self.radii),
+                                 [ i for i, v in enumerate(expected) if v ])
+                self.check_cache(frustum, cache, expected, self.sphere_outside)
+            self.assertRaises(ValueError, frustum.cull_spheres, centres, [1.])
+
+    def test_boxes(self):
+        for use_numpy in self.backends:
+            box_mins = Vector3Array.from_vectors(self.box_mins, use_numpy)
+            box_maxs = Vector3Array.from_vectors(self.box_maxs, use_numpy)
+            cache = make_plane_cache(len(self.box_mins))
+            for frustum in self.frustums:
+                expected = [ frustum.test_box(b0, b1)
+                             for b0, b1 in zip(self.box_mins, self.box_maxs) ]
+                self.assertTrue(0 < sum(expected) < len(expected))
+                mask = frustum.cull_boxes(box_mins, box_maxs)
+                self.assertEqual(map(bool, mask), expected)
+                mask = frustum.cull_boxes(box_mins, box_maxs, cache)
+                self.assertEqual(map(bool, mask), expected)
+                self.assertEqual(frustum.visible_boxes(box_mins, box_maxs),
+                                 [ i for i, v in enumerate(expected) if v ])
+                self.check_cache(frustum, cache, expected, self.box_outside)
+
+    def sphere_outside(self, plane, index):
+        a, b, c, d = plane
+        x, y, z = self.centres[index]
+        return a*x + b*y + c*z + d < -self.radii[index]
+
+    def box_outside(self, plane, index):
+        a, b, c, d = plane
+        x0, y0, z0 = self.box_mins[index]
+        x1, y1, z1 = self.box_maxs[index]
+        return a * (x1 if a >= 0. else x0) + \
+               b * (y1 if b >= 0. else y0) + \
+               c * (z1 if c >= 0. else z0) + d < 0.
+
+    def check_cache(self, frustum, cache, expected, outside):
+        # Every culled shape records a plane that rejects it
+        planes = frustum.get_planes()
+        for index, visible in enumerate(expected):
+            self.assertTrue(0 <= cache[index] < 6)
+            if not visible:
+                self.assertTrue(outside(planes[cache[index]], index))
+
+    def test_everything(self):
+        frustum = Frustum()
+        centres = Vector3Array.from_vectors(self.centres)
+        self.assertEqual(list(frustum.cull_spheres(centres, self.radii)),
+                         [1] * len(self.centres))
+        self.assertTrue((1e6, -1e6, 1e6) in frustum)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from array import array
+from math import pi
+
+from matrix33 import Matrix33, Matrix33Error
+from matrix44 import Matrix44
+from vector2 import Vector2
+from vector2array import Vector2Array
+
+class TestMatrix33(unittest.TestCase):
+
+    def setUp(self):
+        self.m = Matrix33.translation(1, 2) * Matrix33.rotation(.5) * \
+                 Matrix33.scale(2., 3.)
+        m44 = Matrix44.translation(1, 2, 0) * Matrix44.z_rotation(.5) * \
+              Matrix44.scale(2., 3., 1.)
+        self.points = [(1, 0), (0, 1), (-2, 5)]
+        self.expected = [ m44.transform((x, y, 0))[:2] for x, y in self.points ]
+
+    def assertPointsEqual(self, points1, points2):
+        for p1, p2 in zip(points1, points2):
+            for a, b in zip(p1, p2):
+                self.assertAlmostEqual(a, b)
+
+    def test_transform(self):
+        self.assertPointsEqual(map(self.m.transform, self.points),
+                               self.expected)
+        self.assertPointsEqual(self.m.transform_sequence(self.points),
+                               self.expected)
+        self.assertPointsEqual(self.m.iter_transform(self.points),
+                               self.expected)
+        self.assertEqual(Matrix33.rotation(pi / 3.).rotate((1, 2)),
+                         Vector2(1, 2).get_rotated(pi / 3.))
+
+    def test_batch(self):
+        packed = array('d', [v for p in self.points for v in p])
+        self.m.transform_sequence(packed, packed)
+        self.assertPointsEqual(zip(packed[0::2], packed[1::2]), self.expected)
+        va = Vector2Array.from_vectors(self.points)
+        self.m.transform_array(va, va)
+        self.assertPointsEqual(va.as_tuples(), self.expected)
+        for size in (len(va) - 1, len(va) + 1):
+            out = Vector2Array(size)
+            self.assertRaises(ValueError, self.m.transform_array, va, out)
+            self.assertEqual(len(out), size)
+
+    def test_inverse(self):
+        product = self.m * self.m.get_inverse()
+        self.assertPointsEqual([product.components()],
+                               [Matrix33().components()])
+        self.assertRaises(Matrix33Error, Matrix33.scale(0.).invert)
+
+    def test_conversion(self):
+        self.assertEqual(Matrix33.from_iter(self.m.components()), self.m)
+        self.assertEqual(Matrix33(*self.m.rows()), self.m)
+        self.assertEqual(self.m.get_row(2), self.m.translate + (1.,))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,453 @@
+import unittest
+from array import array
+
+import matrix44
+import batch
+import util
+from vector3 import Vector3
+from matrix44array import Matrix44Array
+from matrix44 import Matrix44, Matrix44f, MatrixStack, MatrixChain, \
+                     Matrix44Error
+
+class MatrixTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        matrix44.enable_kernel_counts(False)
+
+    def assertMatrixEqual(self, m1, m2):
+        for a, b in zip(m1.components(), m2.components()):
+            self.assertAlmostEqual(a, b)
+
+class TestMatrix44Kind(MatrixTestCase):
+
+    def setUp(self):
+        rigid = Matrix44.x_rotation(.5)
+        rigid.translate = (4, 5, 6)
+        self.matrices = [ Matrix44(),
+                          Matrix44.translation(1, 2, 3),
+                          Matrix44.z_rotation(.3),
+                          rigid,
+                          Matrix44.scale(2, 3, 4),
+                          Matrix44.perspective_projection_fov(1, 1.3, 1, 100) ]
+
+    def test_kinds(self):
+        self.assertEqual([m.kind for m in self.matrices], range(6))
+        m = Matrix44.translation(1, 2, 3)
+        m.translate = (0, 0, 0)
+        self.assertEqual(m.kind, matrix44.KIND_IDENTITY)
+        m[0, 3] = 1
+        self.assertEqual(m.kind, matrix44.KIND_PROJECTIVE)
+
+    def test_mul(self):
+        for m1 in self.matrices:
+            for m2 in self.matrices:
+                full = Matrix44.from_iter(matrix44._mul_full(m1._m, m2._m))
+                self.assertMatrixEqual(m1 * m2, full)
+                m = m1.copy()
+                m *= m2
+                self.assertMatrixEqual(m, full)
+
+    def test_inverse(self):
+        for m in self.matrices:
+            self.assertMatrixEqual(m * m.get_inverse(), Matrix44())
+            self.assertMatrixEqual(m.get_inverse() * m, Matrix44())
+
+    def test_inverse_cache(self):
+        m = self.matrices[3].copy()
+        m.enable_inverse_cache()
+        matrix44.enable_kernel_counts()
+        matrix44.reset_kernel_counts()
+        m.get_inverse()
+        m.inverse_transform((1, 2, 3))
+        self.assertEqual(matrix44.kernel_counts["inverse_rigid"], 1)
+        for change in ( lambda: m.set_row(0, (2, 0, 0)),
+                        lambda: m.__setitem__((1, 1), 3.),
+                        lambda: m.__imul__(Matrix44.translation(1, 2, 3)),
+                        lambda: m.fast_mul(Matrix44.scale(2.)),
+                        lambda: m.make_x_rotation(1.) ):
+            change()
+            self.assertMatrixEqual(m * m.get_inverse(), Matrix44())
+
+    def test_kernel_counts(self):
+        matrix44.reset_kernel_counts()
+        Matrix44.translation(1, 2, 3) * Matrix44.translation(4, 5, 6)
+        self.assertEqual(sum(matrix44.kernel_counts.values()), 0)
+        matrix44.enable_kernel_counts()
+        Matrix44.translation(1, 2, 3) * Matrix44.translation(4, 5, 6)
+        Matrix44.x_rotation(.1).get_inverse()
+        m = Matrix44.perspective_projection_fov(1, 1.3, 1, 100)
+        m.fast_mul(m)
+        self.assertEqual(matrix44.kernel_counts["mul_translation"], 1)
+        self.assertEqual(matrix44.kernel_counts["inverse_rotation"], 1)
+        self.assertEqual(matrix44.kernel_counts["mul_affine"], 1)
+        self.assertEqual(matrix44.kernel_counts["mul_full"], 0)
+        matrix44.enable_kernel_counts(False)
+        Matrix44.x_rotation(.1).get_inverse()
+        self.assertEqual(matrix44.kernel_counts["inverse_rotation"], 1)
+
+    def test_new_storage(self):
+        # Products and inverses never share storage with their operands
+        for m1 in self.matrices:
+            for m2 in self.matrices:
+                product = m1 * m2
+                self.assertTrue(product._m.__class__ is list)
+                self.assertFalse(product._m is m1._m or product._m is m2._m)
+            self.assertFalse(m1.get_inverse()._m is m1._m)
+
+    def test_float32(self):
+        f = Matrix44f.clone(self.matrices[4])
+        buffer = f.to_opengl()
+        self.assertEqual(buffer.typecode, 'f')
+        f *= self.matrices[3]
+        f.set_row(3, (1, 2, 3, 1))
+        f.invert()
+        self.assertTrue(f.to_opengl() is buffer)
+        self.assertMatrixEqual(f * Matrix44.clone(f).get_inverse(), Matrix44())
+
+    def test_rows(self):
+        for cls in (Matrix44, Matrix44f):
+            m = cls()
+            storage = m._m
+            m.translate = (1, 2, 3)
+            self.assertEqual(m.kind, matrix44.KIND_TRANSLATION)
+            m.right = (2, 0)
+            self.assertEqual(tuple(m.get_row(0)), (2, 0, 0, 0))
+            self.assertEqual(m.kind, matrix44.KIND_AFFINE)
+            m.set_row(3, (0, 0, 0, 2))
+            self.assertEqual(m.kind, matrix44.KIND_PROJECTIVE)
+            self.assertTrue(m._m is storage)
+        self.assertEqual(Matrix44f.__slots__, ())
+
+    def test_write_into(self):
+        m = self.matrices[5]
+        values = array('f', [0.]) * 32
+        self.assertEqual(m.write_into(values, 16), 32)
+        self.assertEqual(list(values[16:]), list(array('f', m.to_opengl())))
+        self.assertRaises(ValueError, m.write_into, values, 20)
+
+class TestMatrixStack(unittest.TestCase):
+
+    def test_push_pop(self):
+        stack = MatrixStack(3)
+        bottom = stack.top
+        stack.mul(Matrix44.translation(1, 2, 3))
+        stack.push()
+        self.assertEqual(len(stack), 2)
+        stack.mul(Matrix44.x_rotation(.5))
+        expected = Matrix44.translation(1, 2, 3) * Matrix44.x_rotation(.5)
+        self.assertEqual(list(stack.top), list(expected))
+        stack.push()
+        self.assertRaises(Matrix44Error, stack.push)
+        stack.pop()
+        stack.pop()
+        self.assertTrue(stack.top is bottom)
+        self.assertEqual(stack.top.kind, matrix44.KIND_TRANSLATION)
+        self.assertRaises(Matrix44Error, stack.pop)
+
+    def test_float32(self):
+        stack = MatrixStack(2, Matrix44f)
+        buffer = stack.push().to_opengl()
+        stack.load(Matrix44.scale(2.))
+        stack.pop()
+        self.assertTrue(stack.push().to_opengl() is buffer)
+        self.assertEqual(list(buffer), list(Matrix44().to_opengl()))
+
+class TestOrthonormalise(MatrixTestCase):
+
+    def setUp(self):
+        drift = Matrix44.xyz_rotation(.1, .2, .3)
+        drift.set_row(0, (drift[0, 0] * 1.01, drift[0, 1], drift[0, 2]))
+        self.matrices = []
+        for i in xrange(3):
+            m = Matrix44.translation(i, 0, 0)
+            for _ in xrange(10):
+                m *= drift
+            self.matrices.append(m)
+
+    def test_orthonormalise(self):
+        for m in self.matrices:
+            x = Vector3(m.x_axis[:3]).normalise()
+            m.orthonormalise()
+            self.assertEqual(m.kind, matrix44._classify(m._m))
+            for a, b in zip(m.x_axis[:3], x):
+                self.assertAlmostEqual(a, b)
+            self.assertMatrixEqual(m * m.get_inverse_rot_trans(), Matrix44())
+
+    def test_array(self):
+        ma = Matrix44Array.from_matrices(self.matrices)
+        ma.orthonormalise()
+        for m1, m2 in zip(ma, self.matrices):
+            self.assertMatrixEqual(m1, m2.orthonormalise())
+
+
+class TestMatrix44Array(MatrixTestCase):
+
+    def setUp(self):
+        self.matrices = []
+        for i in xrange(4):
+            m = Matrix44.xyz_rotation(.1 * i, .2, .3 * i)
+            m.translate = (i, 2, -i)
+            self.matrices.append(m)
+        self.backends = [False]
+        if batch.numpy is not None:
+            self.backends.append(True)
+
+    def assertArrayEqual(self, ma, matrices):
+        self.assertEqual(len(ma), len(matrices))
+        for m1, m2 in zip(ma, matrices):
+            self.assertMatrixEqual(m1, m2)
+
+    def test_backend(self):
+        for use_numpy in self.backends:
+            ma = Matrix44Array(2, use_numpy)
+            self.assertTrue(ma._backend is batch.get_backend(use_numpy))
+            self.assertTrue(ma.copy()._backend is ma._backend)
+            self.assertArrayEqual(ma, [Matrix44(), Matrix44()])
+
+    def test_mul(self):
+        scale = Matrix44.scale(2., 3., 4.)
+        rhs = [ m.get_inverse() for m in self.matrices ]
+        for use_numpy in self.backends:
+            ma = Matrix44Array.from_matrices(self.matrices, use_numpy)
+            self.assertArrayEqual(ma * scale,
+                                  [ m * scale for m in self.matrices ])
+            rhs_array = Matrix44Array.from_matrices(rhs, use_numpy)
+            self.assertArrayEqual(ma.mul(rhs_array),
+                                  [Matrix44()] * len(self.matrices))
+            out = Matrix44Array(len(ma), use_numpy)
+            self.assertTrue(ma.mul(scale, out) is out)
+            self.assertArrayEqual(out, [ m * scale for m in self.matrices ])
+            ma *= scale
+            self.assertArrayEqual(ma, [ m * scale for m in self.matrices ])
+            self.assertRaises(ValueError, ma.mul, Matrix44Array(1, use_numpy))
+            for size in (2, 6):
+                out = Matrix44Array(size, use_numpy)
+                self.assertRaises(ValueError, ma.mul, scale, out)
+                self.assertRaises(ValueError, ma.rmul, scale, out)
+                self.assertEqual(len(out), size)
+
+    def test_rmul(self):
+        view = Matrix44.translation(1, 2, 3) * Matrix44.y_rotation(.4)
+        expected = [ view * m for m in self.matrices ]
+        for use_numpy in self.backends:
+            ma = Matrix44Array.from_matrices(self.matrices, use_numpy)
+            self.assertArrayEqual(ma.rmul(view), expected)
+            self.assertTrue(ma.rmul(view, ma) is ma)
+            self.assertArrayEqual(ma, expected)
+
+    def test_transpose(self):
+        expected = [ m.get_transpose() for m in self.matrices ]
+        for use_numpy in self.backends:
+            ma = Matrix44Array.from_matrices(self.matrices, use_numpy)
+            self.assertArrayEqual(ma.get_transpose(), expected)
+            self.assertArrayEqual(ma, self.matrices)
+            ma.transpose()
+            self.assertArrayEqual(ma, expected)
+
+    def test_inverse_rot_trans(self):
+        expected = [ m.get_inverse_rot_trans() for m in self.matrices ]
+        for use_numpy in self.backends:
+            ma = Matrix44Array.from_matrices(self.matrices, use_numpy)
+            inverse = ma.get_inverse_rot_trans()
+            self.assertArrayEqual(inverse, expected)
+            self.assertArrayEqual(ma.mul(inverse),
+                                  [Matrix44()] * len(self.matrices))
+
+    def test_to_float32(self):
+        expected = []
+        for m in self.matrices:
+            expected.extend(m.components())
+        for use_numpy in self.backends:
+            ma = Matrix44Array.from_matrices(self.matrices, use_numpy)
+            values = ma.to_float32()
+            self.assertEqual(values.itemsize, 4)
+            self.assertEqual(len(values), len(expected))
+            for a, b in zip(values, expected):
+                self.assertAlmostEqual(a, b, 6)
+
+
+class TestTransformSequence(unittest.TestCase):
+
+    def setUp(self):
+        self.m = Matrix44.xyz_rotation(.1, .2, .3)
+        self.m.translate = (1, 2, 3)
+        self.projection = Matrix44.perspective_projection_fov(1., 1.3, 1., 100.)
+        self.points = [ (1., 2., 3.), (-4., 5., -6.), (0., 0., -10.) ]
+
+    def packed(self, points):
+        values = []
+        for point in points:
+            values.extend(point)
+        return values
+
+    def assertValuesEqual(self, values, points):
+        expected = self.packed(points)
+        self.assertEqual(len(values), len(expected))
+        for a, b in zip(values, expected):
+            self.assertAlmostEqual(a, b)
+
+    def test_buffer(self):
+        expected = [ self.m.transform(p) for p in self.points ]
+        self.assertValuesEqual(
+            self.packed(self.m.transform_sequence(self.points)), expected)
+        for make in (list, lambda v: array('d', v)):
+            points = make(self.packed(self.points))
+            out = make([0.] * len(points))
+            self.assertTrue(self.m.transform_sequence(points, out) is out)
+            self.assertValuesEqual(out, expected)
+            self.assertValuesEqual(points, self.points)
+            self.assertTrue(self.m.transform_sequence(points, points) is points)
+            self.assertValuesEqual(points, expected)
+
+    def test_transform4(self):
+        x, y, z, w = self.projection.transform4((1., 2., -10., 1.))
+        columns = [ self.projection.get_column(i) for i in xrange(4) ]
+        expected = [ sum(a * b for a, b in zip(column, (1., 2., -10., 1.)))
+                     for column in columns ]
+        for a, b in zip((x, y, z, w), expected):
+            self.assertAlmostEqual(a, b)
+        # A perspective projection puts the distance in front of the eye in w
+        self.assertAlmostEqual(w, 10.)
+        point = self.m.transform4((1., 2., 3., 1.))
+        self.assertEqual(len(point), 4)
+        for a, b in zip(point, self.m.transform((1., 2., 3.)) + (1.,)):
+            self.assertAlmostEqual(a, b)
+
+    def test_buffer4(self):
+        points4 = [ p + (1.,) for p in self.points ]
+        expected = [ self.projection.transform4(p) for p in points4 ]
+        divided = [ (x / w, y / w, z / w, w) for x, y, z, w in expected ]
+        for make in (list, lambda v: array('d', v)):
+            points = make(self.packed(points4))
+            out = make([0.] * len(points))
+            self.assertTrue(self.projection.transform_sequence4(points, out)
+                            is out)
+            self.assertValuesEqual(out, expected)
+            self.projection.transform_sequence4(points, points, w_divide=True)
+            self.assertValuesEqual(points, divided)
+        self.assertValuesEqual(self.packed(
+            self.projection.transform_sequence4(points4, w_divide=True)),
+            divided)
+
+    def test_bad_buffer(self):
+        points = self.packed(self.points)
+        self.assertRaises(ValueError, self.m.transform_sequence,
+                          points[:-1], [0.] * 9)
+        self.assertRaises(ValueError, self.m.transform_sequence,
+                          points, [0.] * 8)
+        points4 = [0.] * 8
+        self.assertRaises(ValueError, self.m.transform_sequence4,
+                          points4[:-1], [0.] * 8)
+        self.assertRaises(ValueError, self.m.transform_sequence4,
+                          points4, [0.] * 7)
+
+    @unittest.skipIf(batch.numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        numpy = batch.numpy
+        points = numpy.array(self.packed(self.points))
+        out = numpy.zeros(9)
+        self.m.transform_sequence(points, out)
+        self.assertValuesEqual(out, self.m.transform_sequence(self.points))
+        points4 = [ p + (1.,) for p in self.points ]
+        expected = self.projection.transform_sequence4(points4, w_divide=True)
+        points4 = numpy.array(self.packed(points4))
+        self.projection.transform_sequence4(points4, points4, w_divide=True)
+        self.assertValuesEqual(points4, expected)
+
+
+class TestMatrixView(unittest.TestCase):
+
+    def test_views(self):
+        m = Matrix44.x_rotation(.5)
+        m.enable_inverse_cache()
+        m.get_inverse()
+        translate = m.row_view(3)
+        column = m.column_view(1)
+        self.assertEqual(list(column), list(m.get_column(1)))
+        self.assertEqual(translate, (0, 0, 0, 1))
+        translate.set((1, 2, 3))
+        self.assertEqual(m.kind, matrix44.KIND_RIGID)
+        self.assertTrue(m._inverse is None)
+        m.make_y_rotation(.5)
+        self.assertEqual(translate[:3], (0, 0, 0))
+        column[3] = 2.
+        self.assertEqual(m[3, 1], 2.)
+        self.assertEqual(m.kind, matrix44.KIND_RIGID)
+        m.column_view(3)[1] = 2.
+        self.assertEqual(m.kind, matrix44.KIND_PROJECTIVE)
+        self.assertRaises(IndexError, m.row_view, 4)
+
+    def test_move(self):
+        m = Matrix44.xyz_rotation(.1, .2, .3)
+        m.move(forward=2., right=-1., up=.5)
+        expected = Vector3(m.forward[:3]) * 2. - Vector3(m.right[:3]) + \
+                   Vector3(m.up[:3]) * .5
+        for a, b in zip(m.translate[:3], expected):
+            self.assertAlmostEqual(a, b)
+        self.assertEqual(m.kind, matrix44.KIND_RIGID)
+        self.assertEqual(m.kind, matrix44._classify(m._m))
+
+
+class TestMatrixChain(MatrixTestCase):
+
+    def test_evaluate(self):
+        projection = Matrix44.perspective_projection_fov(1., 1.5, 1., 100.)
+        view = Matrix44.xyz_rotation(.1, .2, .3)
+        view.translate = (1, 2, 3)
+        model = Matrix44.scale(2.)
+        chain = MatrixChain(projection).mul_inverse(view).mul(model)
+        chain.mul_transpose(Matrix44.y_rotation(.5)).invert().transpose()
+        expected = projection * view.get_inverse() * model * \
+                   Matrix44.y_rotation(.5).get_transpose()
+        expected = expected.get_inverse().get_transpose()
+        out = Matrix44()
+        self.assertTrue(chain.evaluate(out) is out)
+        self.assertMatrixEqual(out, expected)
+
+    def test_runs(self):
+        a = Matrix44.x_rotation(.1)
+        b = Matrix44.translation(1, 2, 3)
+        c = Matrix44.scale(2.)
+        d = Matrix44.y_rotation(.2)
+        chain = MatrixChain(a, b, c).mul_inverse(d).mul(a).mul(b).mul(c)
+        expected = a * b * c * d.get_inverse() * a * b * c
+        self.assertMatrixEqual(chain.evaluate(), expected)
+        self.assertMatrixEqual(MatrixChain().evaluate(), Matrix44())
+
+    def test_reuse(self):
+        view = Matrix44.translation(1, 2, 3)
+        model = Matrix44.x_rotation(.5)
+        chain = MatrixChain(view, model)
+        chain.evaluate()
+        matrix44.enable_kernel_counts()
+        matrix44.reset_kernel_counts()
+        chain.evaluate()
+        self.assertEqual(sum(matrix44.kernel_counts.values()), 0)
+        self.assertTrue(chain.is_current())
+        model.make_x_rotation(.6)
+        self.assertFalse(chain.is_current())
+        self.assertMatrixEqual(chain.evaluate(), view * model)
+
+class TestSinCosCache(unittest.TestCase):
+
+    def tearDown(self):
+        util.enable_sin_cos_cache(False)
+
+    def test_cache(self):
+        expected = Matrix44.xyz_rotation(.1, .2, .3)
+        util.enable_sin_cos_cache(size=3)
+        for _ in xrange(2):
+            m = Matrix44.xyz_rotation(.1, .2, .3)
+            self.assertEqual(list(m), list(expected))
+        self.assertEqual(util.sin_cos_counts, { "hits" : 3, "misses" : 3 })
+        util.enable_sin_cos_cache(False)
+        self.assertEqual(util.get_sin_cos_hit_rate(), 0.)
+
+    def test_table(self):
+        util.enable_sin_cos_cache(steps=360)
+        m = Matrix44.z_rotation(util.radians(90.2))
+        self.assertEqual(list(m), list(Matrix44.z_rotation(util.pi / 2.)))
+        self.assertEqual(util.get_sin_cos_hit_rate(), 1.)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+import pool
+from pool import ObjectPool, PoolScope
+from vector3 import Vector3
+from matrix44 import Matrix44
+
+class TestObjectPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ObjectPool(Vector3, capacity=2)
+
+    def test_acquire_release(self):
+        v = self.pool.acquire()
+        self.assertTrue(isinstance(v, Vector3))
+        self.pool.release(v)
+        self.assertTrue(self.pool.acquire() is v)
+        self.assertFalse(self.pool.acquire() is v)
+        self.assertEqual(self.pool.get_stats(), (1, 2, 1. / 3.))
+        self.pool.reset_stats()
+        self.assertEqual(self.pool.get_stats(), (0, 0, 0.))
+
+    def test_capacity(self):
+        vectors = [ self.pool.acquire() for _ in xrange(4) ]
+        for v in vectors:
+            self.pool.release(v)
+        # Only two are kept
+        self.assertTrue(self.pool.acquire() is vectors[1])
+        self.assertTrue(self.pool.acquire() is vectors[0])
+        v = self.pool.acquire()
+        self.assertFalse([ x for x in vectors if x is v ])
+        self.pool.release(vectors[0])
+        self.pool.clear()
+        self.assertFalse(self.pool.acquire() is vectors[0])
+
+    def test_scope(self):
+        with self.pool.scope():
+            v1 = self.pool.acquire()
+            with PoolScope(self.pool):
+                v2 = self.pool.acquire()
+            # Only the inner scope has released its objects
+            self.assertTrue(self.pool.acquire() is v2)
+        acquired = [ self.pool.acquire() for _ in xrange(2) ]
+        self.assertEqual(set(map(id, acquired)), set([id(v1), id(v2)]))
+        self.assertEqual(self.pool.get_stats()[0], 3)
+
+    def test_scope_capacity(self):
+        with self.pool.scope():
+            vectors = [ self.pool.acquire() for _ in xrange(4) ]
+        self.assertEqual(len(self.pool._state.free), 2)
+
+class TestDefaultPools(unittest.TestCase):
+
+    def setUp(self):
+        pool.vector3_pool.clear()
+        pool.matrix44_pool.clear()
+        pool.vector3_pool.reset_stats()
+        pool.matrix44_pool.reset_stats()
+
+    def assertMatrixEqual(self, m1, m2):
+        for a, b in zip(m1.components(), m2.components()):
+            self.assertAlmostEqual(a, b)
+
+    def test_helpers(self):
+        parent = Matrix44.translation(1, 2, 3)
+        local = Matrix44.z_rotation(1.)
+        with pool.scope():
+            self.assertEqual(pool.vector3(1, 2, 3), (1, 2, 3))
+            self.assertEqual(pool.vector3_copy((4, 5, 6)), (4, 5, 6))
+            self.assertMatrixEqual(pool.matrix44_identity(), Matrix44())
+            self.assertMatrixEqual(pool.matrix44_copy(parent), parent)
+            world = pool.matrix44_mul(parent, local)
+            self.assertMatrixEqual(world, parent * local)
+            self.assertMatrixEqual(pool.matrix44_inverse(world),
+                                   (parent * local).get_inverse())
+        stats = pool.get_stats()
+        self.assertEqual(stats['vector3'], (0, 2, 0.))
+        self.assertEqual(stats['matrix44'], (0, 4, 0.))
+
+    def test_reuse_storage(self):
+        # Pooled matrices are updated in place, without new storage
+        parent = Matrix44.translation(1, 2, 3)
+        local = Matrix44.scale(2.)
+        with pool.scope():
+            storage = dict( (id(m), m._m) for m in
+                            (pool.matrix44_identity(),
+                             pool.matrix44_identity()) )
+        for lhs, rhs in [ (parent, local), (local, local), (parent, parent),
+                          (Matrix44(), local),
+                          (Matrix44.perspective_projection(-1, 1, -1, 1,
+                                                           1, 10), local) ]:
+            with pool.scope():
+                world = pool.matrix44_mul(lhs, rhs)
+                self.assertTrue(world._m is storage[id(world)])
+                self.assertMatrixEqual(world, lhs * rhs)
+                inverse = pool.matrix44_inverse(world)
+                self.assertTrue(inverse._m is storage[id(inverse)])
+                self.assertMatrixEqual(inverse, (lhs * rhs).get_inverse())
+        self.assertEqual(pool.get_stats()['matrix44'], (10, 2, 10. / 12.))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import random
+from math import sqrt
+
+from quadtree import LooseQuadTree
+
+class TestLooseQuadTree(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(2)
+        self.shapes = {}
+        self.tree = LooseQuadTree((-100., -100.), (100., 100.), 6)
+        for i in xrange(300):
+            self.add(i)
+
+    def random_shape(self, i):
+        # Some shapes are larger than the smallest nodes, and some are
+        # outside the bounds
+        size = random.choice((.5, 3., 20., 80.))
+        x = random.uniform(-120., 120.)
+        y = random.uniform(-120., 120.)
+        if i % 2:
+            return ('circle', x, y, random.uniform(0., size))
+        return ('rect', x, y, x + random.uniform(0., size),
+                y + random.uniform(0., size))
+
+    def add(self, i):
+        shape = self.shapes[i] = self.random_shape(i)
+        if shape[0] == 'circle':
+            self.tree.insert_circle(i, shape[1:3], shape[3])
+        else:
+            self.tree.insert_rect(i, shape[1:3], shape[3:5])
+
+    def bounds(self, i):
+        shape = self.shapes[i]
+        if shape[0] == 'circle':
+            kind, x, y, r = shape
+            return x - r, y - r, x + r, y + r
+        return shape[1:]
+
+    def distance_to(self, i, x, y):
+        shape = self.shapes[i]
+        if shape[0] == 'circle':
+            kind, cx, cy, r = shape
+            return sqrt((cx - x) ** 2 + (cy - y) ** 2) - r
+        kind, x0, y0, x1, y1 = shape
+        dx = x - max(x0, min(x, x1))
+        dy = y - max(y0, min(y, y1))
+        return sqrt(dx * dx + dy * dy)
+
+    def test_point_circle(self):
+        for x, y, radius in [ (0., 0., 0.), (50., -20., 0.), (-90., 95., 10.),
+                              (10., 10., 30.), (0., 0., 500.) ]:
+            expected = [ i for i in xrange(300)
+                         if self.distance_to(i, x, y) <= radius ]
+            if radius:
+                found = self.tree.query_circle((x, y), radius)
+            else:
+                found = self.tree.query_point((x, y))
+            self.assertEqual(sorted(found), expected)
+
+    def test_rect(self):
+        for rect_min, rect_max in [ ((-30., 5.), (10., 60.)),
+                                    ((90., 90.), (130., 130.)),
+                                    ((-1000., -1000.), (1000., 1000.)) ]:
+            x0, y0 = rect_min
+            x1, y1 = rect_max
+            cx = (x0 + x1) / 2.
+            cy = (y0 + y1) / 2.
+            expected = []
+            for i in xrange(300):
+                bx0, by0, bx1, by1 = self.bounds(i)
+                if bx0 > x1 or bx1 < x0 or by0 > y1 or by1 < y0:
+                    continue
+                if self.shapes[i][0] == 'circle':
+                    kind, sx, sy, r = self.shapes[i]
+                    dx = sx - max(x0, min(sx, x1))
+                    dy = sy - max(y0, min(sy, y1))
+                    if dx * dx + dy * dy > r * r:
+                        continue
+                expected.append(i)
+            self.assertEqual(sorted(self.tree.query_rect(rect_min, rect_max)),
+                             expected)
+
+    def test_raycast(self):
+        hits = self.tree.raycast((-150., 3.), (2., .5))
+        self.assertEqual(hits, sorted(hits))
+        for distance, i in hits:
+            # The hit point is on (or inside) the shape
+            x = -150. + distance * 2. / sqrt(4.25)
+            y = 3. + distance * .5 / sqrt(4.25)
+            self.assertTrue(self.distance_to(i, x, y) < 1e-6)
+        # Sample along the ray, anything touched must have been hit
+        hit_items = set(i for distance, i in hits)
+        for step in xrange(0, 4000):
+            t = step * .1
+            x = -150. + t * 2. / sqrt(4.25)
+            y = 3. + t * .5 / sqrt(4.25)
+            for i in xrange(300):
+                if self.distance_to(i, x, y) <= 0.:
+                    self.assertTrue(i in hit_items)
+        short = self.tree.raycast((-150., 3.), (2., .5), 100.)
+        self.assertEqual(short, [ hit for hit in hits if hit[0] <= 100. ])
+
+    def test_raycast_outside(self):
+        # Items outside the bounds are in the root, and may be any distance
+        # away
+        tree = LooseQuadTree((0., 0.), (100., 100.))
+        tree.insert_circle("far", (1000., 50.), 5.)
+        tree.insert_rect("further", (5000., 40.), (5010., 60.))
+        tree.insert_circle("near", (50., 50.), 5.)
+        self.assertEqual(tree.query_point((1000., 50.)), ["far"])
+        self.assertEqual(tree.raycast((0., 50.), (1., 0.)),
+                         [(45., "near"), (995., "far"), (5000., "further")])
+        self.assertEqual(tree.raycast((0., 50.), (1., 0.), 1000.),
+                         [(45., "near"), (995., "far")])
+
+    def test_move_remove(self):
+        for i in xrange(0, 300, 3):
+            shape = self.shapes[i] = self.random_shape(i)
+            if shape[0] == 'circle':
+                self.tree.move_circle(i, shape[1:3], shape[3])
+            else:
+                self.tree.move_rect(i, shape[1:3], shape[3:5])
+        self.test_point_circle()
+        self.tree.remove(1)
+        del self.shapes[1]
+        self.assertEqual(len(self.tree), 299)
+        self.assertFalse(1 in self.tree)
+        self.assertRaises(ValueError, self.tree.insert_circle, 2, (0., 0.), 1.)
+
+    def test_pairs(self):
+        pairs = sorted( tuple(sorted(pair))
+                        for pair in self.tree.query_pairs() )
+        expected = []
+        for i in xrange(300):
+            ax0, ay0, ax1, ay1 = self.bounds(i)
+            for j in xrange(i + 1, 300):
+                bx0, by0, bx1, by1 = self.bounds(j)
+                if not (bx0 > ax1 or bx1 < ax0 or by0 > ay1 or by1 < ay0):
+                    expected.append((i, j))
+        self.assertEqual(pairs, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from math import pi
+
+import batch
+from matrix44 import Matrix44
+from quaternion import Quaternion, QuaternionArray
+
+class TestQuaternion(unittest.TestCase):
+
+    def assertSequenceAlmostEqual(self, s1, s2):
+        for a, b in zip(s1, s2):
+            self.assertAlmostEqual(a, b)
+
+    def test_matrix(self):
+        q = Quaternion.from_xyz_rotation(.1, .2, .3)
+        m = Matrix44.xyz_rotation(.1, .2, .3)
+        self.assertSequenceAlmostEqual(q.to_matrix44().components(),
+                                       m.components())
+        self.assertAlmostEqual(abs(Quaternion.from_matrix44(m).dot(q)), 1.)
+        axis = (0., .6, .8)
+        r = Quaternion.from_axis_angle(axis, 2.)
+        self.assertSequenceAlmostEqual((q * r).to_matrix44().components(),
+            (m * Matrix44.rotation_about_axis(axis, 2.)).components())
+        self.assertSequenceAlmostEqual(q.rotate((1, 2, 3)), m.rotate((1, 2, 3)))
+
+    def test_from_matrix(self):
+        # Rotations of about 180 degrees have a negative trace, so each of the
+        # other branches (largest diagonal value in x, y or z) is used
+        for axis in ((1, 0, 0), (0, 1, 0), (0, 0, 1), (.6, 0, .8), (0, .8, .6)):
+            for angle in (pi, pi - .01, -(pi - .2)):
+                m = Matrix44.rotation_about_axis(axis, angle)
+                q = Quaternion.from_matrix44(m)
+                self.assertAlmostEqual(q.get_length(), 1.)
+                self.assertAlmostEqual(
+                    abs(q.dot(Quaternion.from_axis_angle(axis, angle))), 1.)
+                self.assertSequenceAlmostEqual(q.to_matrix44().components(),
+                                               m.components())
+
+    def test_slerp(self):
+        q1 = Quaternion.from_axis_angle((0, 0, 1), 0.)
+        q2 = Quaternion.from_axis_angle((0, 0, 1), 1.)
+        self.assertSequenceAlmostEqual(q1.slerp(q2, .25),
+                                       Quaternion.from_axis_angle((0, 0, 1), .25))
+        self.assertSequenceAlmostEqual(q1.slerp(q2, 1.), q2)
+
+    def test_slerp_shortest(self):
+        q1 = Quaternion.from_axis_angle((0, 0, 1), .2)
+        q2 = Quaternion.from_axis_angle((0, 0, 1), .8)
+        q2_negated = Quaternion(*[-v for v in q2])
+        expected = Quaternion.from_axis_angle((0, 0, 1), .5)
+        self.assertSequenceAlmostEqual(q1.slerp(q2, .5), expected)
+        # -q2 is the same rotation, the path must not go the long way round
+        self.assertSequenceAlmostEqual(q1.slerp(q2_negated, .5), expected)
+        q1_negated = Quaternion(*[-v for v in q1])
+        for t in (0., .3, 1.):
+            self.assertSequenceAlmostEqual(q1.slerp(q1_negated, t), q1)
+
+    def test_slerp_parallel(self):
+        # Nearly parallel quaternions use a normalised linear interpolation
+        q1 = Quaternion.from_axis_angle((0, 1, 0), .5)
+        q2 = Quaternion.from_axis_angle((0, 1, 0), .5001)
+        for t in (0., .25, 1.):
+            q = q1.slerp(q2, t)
+            self.assertAlmostEqual(q.get_length(), 1.)
+            self.assertSequenceAlmostEqual(
+                q, Quaternion.from_axis_angle((0, 1, 0), .5 + .0001 * t))
+        self.assertSequenceAlmostEqual(q1.slerp(q1, .5), q1)
+
+    def test_nlerp(self):
+        q1 = Quaternion.from_axis_angle((1, 0, 0), .2)
+        q2 = Quaternion.from_axis_angle((1, 0, 0), 1.2)
+        self.assertSequenceAlmostEqual(q1.nlerp(q2, 0.), q1)
+        self.assertSequenceAlmostEqual(q1.nlerp(q2, 1.), q2)
+        # Half way, nlerp and slerp agree
+        self.assertSequenceAlmostEqual(q1.nlerp(q2, .5), q1.slerp(q2, .5))
+        q = q1.nlerp(q2, .25)
+        self.assertAlmostEqual(q.get_length(), 1.)
+        axis, angle = q.get_axis_angle()
+        self.assertTrue(.2 < angle < .7)
+        q2_negated = Quaternion(*[-v for v in q2])
+        self.assertSequenceAlmostEqual(q1.nlerp(q2_negated, .5),
+                                       q1.slerp(q2, .5))
+
+    def test_array(self):
+        qs = [ Quaternion.from_xyz_rotation(i, .5, -i) for i in xrange(4) ]
+        r = Quaternion.from_axis_angle((1, 0, 0), .5)
+        qa = QuaternionArray.from_quaternions(qs)
+        for q, p in zip(qs, qa * r):
+            self.assertSequenceAlmostEqual(q * r, p)
+        for q, v in zip(qs, qa.rotate((1, 2, 3))):
+            self.assertSequenceAlmostEqual(q.rotate((1, 2, 3)), v)
+        for q, m in zip(qs, qa.to_matrix44_array()):
+            self.assertSequenceAlmostEqual(q.to_matrix44().components(),
+                                           m.components())
+
+    def test_array_interpolation(self):
+        qs = [ Quaternion.from_xyz_rotation(i, .5, -i) for i in xrange(4) ]
+        # Every other quaternion is negated, so that some dot products are
+        # negative and the shortest path must be taken
+        others = [ Quaternion.from_xyz_rotation(.3, i, .2) for i in xrange(4) ]
+        others[1] = Quaternion(*[-v for v in others[1]])
+        others[3] = Quaternion(*[-v for v in others[3]])
+        single = Quaternion.from_axis_angle((0, .6, .8), 2.5)
+        backends = [False]
+        if batch.numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            qa = QuaternionArray.from_quaternions(qs, use_numpy)
+            oa = QuaternionArray.from_quaternions(others, use_numpy)
+            for t in (0., .3, 1.):
+                for q, o, p in zip(qs, others, qa.slerp(oa, t)):
+                    self.assertSequenceAlmostEqual(q.slerp(o, t), p)
+                for q, o, p in zip(qs, others, qa.nlerp(oa, t)):
+                    self.assertSequenceAlmostEqual(q.nlerp(o, t), p)
+                for q, p in zip(qs, qa.slerp(single, t)):
+                    self.assertSequenceAlmostEqual(q.slerp(single, t), p)
+                for q, p in zip(qs, qa.nlerp(single, t)):
+                    self.assertSequenceAlmostEqual(q.nlerp(single, t), p)
+            self.assertRaises(ValueError, qa.slerp,
+                              QuaternionArray(1, use_numpy), .5)
+
+    def test_array_normalise(self):
+        values = [ (1., 2., 3., 4.), (0., 0., 0., 2.), (0., 0., 0., 0.) ]
+        backends = [False]
+        if batch.numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            qa = QuaternionArray.from_quaternions(
+                [ Quaternion(*v) for v in values ], use_numpy)
+            normalised = qa.get_normalised()
+            self.assertSequenceAlmostEqual(qa[0], values[0])
+            self.assertSequenceAlmostEqual(
+                normalised[0], Quaternion(*values[0]).get_normalised())
+            self.assertSequenceAlmostEqual(normalised[1], (0, 0, 0, 1))
+            # A null quaternion is left as it is, rather than dividing by 0
+            self.assertSequenceAlmostEqual(normalised[2], (0, 0, 0, 0))
+            self.assertTrue(qa.normalise() is qa)
+            self.assertSequenceAlmostEqual(list(qa.dot(qa)), (1., 1., 0.))
+
+if __name__ == '__main__':
+    unittest.main()
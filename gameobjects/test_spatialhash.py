@@ -0,0 +1,58 @@
+import unittest
+import random
+
+from spatialhash import SpatialHash
+
+class TestSpatialHash(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1)
+        self.positions = [ (random.uniform(-100., 100.),
+                            random.uniform(-100., 100.)) for _ in xrange(300) ]
+        self.spatial_hash = SpatialHash(15.)
+        for i, position in enumerate(self.positions):
+            self.spatial_hash.insert(i, position)
+
+    def within(self, centre, radius):
+        x, y = centre
+        return [ i for i, (px, py) in enumerate(self.positions)
+                 if (px - x) ** 2 + (py - y) ** 2 <= radius * radius ]
+
+    def test_radius(self):
+        for centre, radius in [ ((0., 0.), 20.), ((-90., 50.), 40.),
+                                ((10., 10.), 1000.) ]:
+            self.assertEqual(sorted(self.spatial_hash.query_radius(centre,
+                                                                   radius)),
+                             self.within(centre, radius))
+
+    def test_rect(self):
+        expected = [ i for i, (x, y) in enumerate(self.positions)
+                     if -30. <= x <= 10. and 5. <= y <= 60. ]
+        self.assertEqual(sorted(self.spatial_hash.query_rect((-30., 5.),
+                                                             (10., 60.))),
+                         expected)
+
+    def test_move_remove(self):
+        for i in xrange(0, 300, 3):
+            self.positions[i] = (random.uniform(-100., 100.),
+                                 random.uniform(-100., 100.))
+            self.spatial_hash.move(i, self.positions[i])
+        self.assertEqual(sorted(self.spatial_hash.query_radius((0., 0.), 50.)),
+                         self.within((0., 0.), 50.))
+        self.spatial_hash.remove(1)
+        self.assertEqual(len(self.spatial_hash), 299)
+        self.assertFalse(1 in self.spatial_hash)
+        self.assertRaises(ValueError, self.spatial_hash.insert, 2, (0., 0.))
+
+    def test_pairs(self):
+        for distance in (10., 40.):
+            pairs = sorted( tuple(sorted(pair)) for pair in
+                            self.spatial_hash.query_pairs(distance) )
+            expected = [ (i, j) for i in xrange(300)
+                                for j in self.within(self.positions[i],
+                                                     distance)
+                                if i < j ]
+            self.assertEqual(pairs, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+from matrix44 import Matrix44
+from quaternion import Quaternion
+from transform import Transform
+
+class TestTransform(unittest.TestCase):
+
+    def setUp(self):
+        self.rotation = Quaternion.from_xyz_rotation(.1, .2, .3)
+        self.transform = Transform((1, 2, 3), self.rotation, 2.)
+
+    def assertSequenceAlmostEqual(self, s1, s2):
+        s1 = list(s1)
+        s2 = list(s2)
+        self.assertEqual(len(s1), len(s2))
+        for a, b in zip(s1, s2):
+            self.assertAlmostEqual(a, b)
+
+    def test_matrix(self):
+        m = Matrix44.translation(1, 2, 3) * self.rotation.to_matrix44() * \
+            Matrix44.scale(2.)
+        self.assertSequenceAlmostEqual(self.transform.get_matrix().components(),
+                                       m.components())
+        point = (4, -5, 6)
+        self.assertSequenceAlmostEqual(self.transform.transform(point),
+                                       m.transform(point))
+        self.transform.set_translation(0, 0, 0)
+        self.assertSequenceAlmostEqual(self.transform.get_matrix().transform(point),
+                                       self.transform.transform(point))
+
+    def test_inverse(self):
+        identity = tuple(Matrix44().components())
+        m = self.transform.get_matrix()
+        self.assertSequenceAlmostEqual((m * m.get_inverse()).components(),
+                                       identity)
+        self.assertSequenceAlmostEqual(
+            (self.transform * self.transform.get_inverse()).get_matrix()
+                                                           .components(),
+            identity)
+        point = (4, -5, 6)
+        self.assertSequenceAlmostEqual(
+            self.transform.inverse_transform(self.transform.transform(point)),
+            point)
+
+    def test_non_unit_rotation(self):
+        # A quaternion that is not unit length also scales, so the inverse
+        # is not the transpose
+        m = Matrix44().make_transform((1, 2, 3), (0., 0., .5, 1.))
+        self.assertSequenceAlmostEqual((m * m.get_inverse()).components(),
+                                       Matrix44().components())
+        m.make_transform((1, 2, 3), (0., 0., .5, 1.), 2.)
+        self.assertSequenceAlmostEqual((m * m.get_inverse()).components(),
+                                       Matrix44().components())
+
+    def test_non_unit_quaternion(self):
+        point = (1, 2, 3)
+        rotation = Quaternion(0., 0., .6, 1.6)
+        t = Transform()
+        t.rotation = rotation
+        for t in ( Transform((4, 5, 6), rotation, 2.),
+                   Transform().set_rotation(rotation),
+                   t ):
+            self.assertAlmostEqual(t.rotation.get_length(), 1.)
+            self.assertSequenceAlmostEqual(t.inverse_transform(t.transform(point)),
+                                           point)
+            self.assertSequenceAlmostEqual(
+                t.get_matrix().get_inverse().transform(t.transform(point)),
+                point)
+            self.assertSequenceAlmostEqual(
+                t.get_inverse().transform(t.transform(point)), point)
+
+    def test_rotate(self):
+        step = Quaternion.from_axis_angle((0., .6, .8), .001)
+        expected = self.rotation
+        for _ in xrange(1000):
+            self.transform.rotate(step)
+            expected = step * expected
+        self.assertAlmostEqual(self.transform.rotation.get_length(), 1., 12)
+        self.assertSequenceAlmostEqual(self.transform.rotation, expected)
+        m = self.transform.get_matrix()
+        self.assertSequenceAlmostEqual((m * m.get_inverse()).components(),
+                                       Matrix44().components())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+import batch
+from matrix44 import Matrix44
+from transformnode import TransformNode
+
+class TestTransformNode(unittest.TestCase):
+
+    def setUp(self):
+        self.root = TransformNode()
+        self.root.set_translation(10, 0, 0)
+        self.arm = TransformNode(self.root)
+        self.arm.set_rotation(.1, .2, .3)
+        self.arm.set_scale(2.)
+        self.hand = TransformNode(self.arm)
+        self.hand.set_translation(1, 0, 0)
+        self.other = TransformNode()
+        self.other.set_translation(0, 5, 0)
+        self.other.set_rotation(0, .5, 0)
+
+    def local(self, node):
+        return Matrix44.translation(*node.translation) * \
+               Matrix44.xyz_rotation(*node.rotation) * \
+               Matrix44.scale(*node.scale)
+
+    def world(self, node):
+        m = self.local(node)
+        while node.parent is not None:
+            node = node.parent
+            m = self.local(node) * m
+        return m
+
+    def assertMatrixEqual(self, m1, m2):
+        for a, b in zip(m1.components(), m2.components()):
+            self.assertAlmostEqual(a, b)
+
+    def test_world(self):
+        for node in (self.root, self.arm, self.hand):
+            self.assertMatrixEqual(node.get_local_matrix(), self.local(node))
+            self.assertMatrixEqual(node.get_world_matrix(), self.world(node))
+        point = (1, 2, 3)
+        for a, b in zip(self.hand.transform(point),
+                        self.world(self.hand).transform(point)):
+            self.assertAlmostEqual(a, b)
+        for a, b in zip(self.hand.inverse_transform(self.hand.transform(point)),
+                        point):
+            self.assertAlmostEqual(a, b)
+
+    def test_move(self):
+        buffer = self.root.get_world_buffer()
+        self.arm.set_rotation(0, 0, .5)
+        self.root.set_translation(0, 1, 0)
+        self.root.update()
+        nodes = list(self.root.iter_nodes())
+        self.assertEqual(nodes, [self.root, self.arm, self.hand])
+        for index, node in enumerate(nodes):
+            self.assertMatrixEqual(buffer[index], self.world(node))
+        self.hand.translation = (0, 0, 2)
+        self.hand.update()
+        self.assertMatrixEqual(buffer[2], self.world(self.hand))
+        self.assertTrue(self.root.get_world_buffer() is buffer)
+
+    def test_reparent(self):
+        buffer = self.root.get_world_buffer()
+        self.other.add_child(self.hand)
+        self.assertTrue(self.hand.parent is self.other)
+        self.assertEqual(self.arm.children, ())
+        self.assertEqual(self.other.children, (self.hand,))
+        self.assertMatrixEqual(self.hand.get_world_matrix(),
+                               self.world(self.hand))
+        self.assertFalse(self.root.get_world_buffer() is buffer)
+        self.assertEqual(len(self.root.get_world_buffer()), 2)
+        buffer = self.other.get_world_buffer()
+        self.assertMatrixEqual(buffer[1], self.world(self.hand))
+        self.hand.detach()
+        self.assertTrue(self.hand.get_root() is self.hand)
+        self.assertMatrixEqual(self.hand.get_world_matrix(),
+                               self.local(self.hand))
+        self.assertRaises(ValueError, self.hand.add_child, self.hand)
+        self.assertRaises(ValueError, self.arm.add_child, self.root)
+
+    def test_buffer(self):
+        backends = [False]
+        if batch.numpy is not None:
+            backends.append(True)
+        for use_numpy in backends:
+            buffer = self.root.get_world_buffer(use_numpy)
+            self.assertEqual(len(buffer), 3)
+            for m, node in zip(buffer, self.root.iter_nodes()):
+                self.assertMatrixEqual(m, self.world(node))
+            self.arm.set_scale(1., 2., 3.)
+            self.root.update()
+            for m, node in zip(buffer, self.root.iter_nodes()):
+                self.assertMatrixEqual(m, self.world(node))
+
+if __name__ == "__main__":
+    unittest.main()
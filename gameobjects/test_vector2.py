@@ -0,0 +1,128 @@
+import unittest
+from math import pi
+
+from vector2 import Vector2, FrozenVector2
+from vector2array import Vector2Array
+
+class TestVector2(unittest.TestCase):
+
+    def test_into(self):
+        v1 = Vector2(1, 2)
+        v2 = Vector2(4, 5)
+        out = Vector2()
+        self.assert_(Vector2.add_into(v1, v2, out) is out)
+        self.assertEqual(out, v1 + v2)
+        self.assertEqual(Vector2.sub_into(v1, (4, 5), out), v1 - v2)
+        self.assertEqual(Vector2.mul_into(v1, 2, out), v1 * 2)
+        self.assertEqual(Vector2.mul_into(v1, v2, out), v1 * v2)
+        self.assertEqual(Vector2.div_into(v1, v2, out), v1 / v2)
+        self.assertEqual(Vector2.div_into(v1, 2, out), (.5, 1))
+        Vector2.add_into(v1, v2, v1)
+        self.assertEqual(v1, (5, 7))
+        self.assertEqual(Vector2.normalise_into((0, 2), out), (0, 1))
+        self.assertEqual(Vector2.normalise_into((0, 0), out), (0, 0))
+        self.assertEqual(Vector2.neg_into(v1, out), (-5, -7))
+        self.assertEqual(v1, (5, 7))
+
+
+class TestFrozenVector2(unittest.TestCase):
+
+    def test_hash(self):
+        v1 = FrozenVector2(1, 2)
+        d = {v1: "a"}
+        self.assertEqual(d[FrozenVector2.from_floats(1., 2.)], "a")
+        self.assertEqual(hash(v1), hash((1., 2.)))
+
+    def test_immutable(self):
+        v1 = FrozenVector2(1, 2)
+        self.assertRaises(TypeError, setattr, v1, 'x', 2)
+        self.assertRaises(TypeError, v1.__setitem__, 0, 2)
+        self.assertRaises(TypeError, v1.normalise)
+        self.assertRaises(TypeError, v1.rotate, 1.)
+        v2 = v1
+        v2 += (1, 1)
+        self.assertEqual(v1, (1, 2))
+        self.assertEqual(v2, (2, 3))
+        self.assertTrue(isinstance(v2, FrozenVector2))
+        v2 *= 2
+        v2 /= 2
+        v2 -= (1, 1)
+        self.assertTrue(isinstance(v2, FrozenVector2))
+        self.assertEqual({v2: "a"}[v1], "a")
+        self.assert_(v1.copy() is v1)
+        v3 = v1.thaw()
+        v3.x = 5
+        self.assertEqual(v1, (1, 2))
+
+    def test_operators(self):
+        v1 = FrozenVector2(3, 4)
+        v2 = Vector2(1, 2)
+        self.assertEqual(v1 + v2, (4, 6))
+        self.assertEqual(v2 + v1, (4, 6))
+        self.assertEqual(v1 * 2, (6, 8))
+        self.assertEqual(v1 - v2, (2, 2))
+        self.assertEqual(-v1, (-3, -4))
+        self.assertEqual(v1 / 2, (1.5, 2))
+        for v in (v1 + v2, v1 - v2, v1 * 2, v1 * v2, v1 / 2, -v1, +v1):
+            self.assertTrue(isinstance(v, FrozenVector2))
+
+    def test_cached(self):
+        v1 = FrozenVector2(3, 4)
+        self.assertEqual(v1.length, 5.)
+        n = v1.get_normalised()
+        self.assertEqual(n, (.6, .8))
+        self.assert_(v1.get_normalised() is n)
+        self.assertEqual(n.get_length(), 1.)
+
+
+class TestVector2Array(unittest.TestCase):
+
+    def setUp(self):
+        self.vectors = [Vector2(1, 2), Vector2(3, 4), Vector2(-1, 0)]
+        self.va = Vector2Array.from_vectors(self.vectors)
+
+    def assertVectorsEqual(self, vectors1, vectors2):
+        for v1, v2 in zip(vectors1, vectors2):
+            for a, b in zip(v1, v2):
+                self.assertAlmostEqual(a, b)
+
+    def test_conversion(self):
+        self.assertEqual(len(self.va), 3)
+        self.assertEqual(self.va.to_vectors(), self.vectors)
+        self.assertEqual(self.va[1], (3, 4))
+        self.va[1] = (7, 8)
+        self.assertEqual(list(self.va)[1], (7, 8))
+
+    def test_arithmetic(self):
+        self.assertEqual((self.va + (1, 1)).to_vectors(),
+                         [v + (1, 1) for v in self.vectors])
+        self.assertEqual((self.va - self.va).as_tuples(), [(0, 0)] * 3)
+        self.assertEqual((2 * self.va).to_vectors(),
+                         [v * 2 for v in self.vectors])
+        self.va /= 2
+        self.assertEqual(self.va[1], (1.5, 2))
+
+    def test_length(self):
+        va = Vector2Array.from_vectors([(3, 4), (0, 0), (0, 2)])
+        self.assertEqual(list(va.get_lengths()), [5., 0., 2.])
+        va.normalise()
+        self.assertVectorsEqual(va, [(.6, .8), (0., 0.), (0., 1.)])
+        self.assertEqual(list(self.va.get_distance_to((1, 2))),
+                         [v.get_distance_to((1, 2)) for v in self.vectors])
+        self.assertEqual(self.va.get_centre(), (1, 2))
+        self.assertRaises(ValueError, Vector2Array().get_centre)
+
+    def test_rotate(self):
+        self.assertVectorsEqual(self.va.get_rotated(pi / 3.),
+                                [v.get_rotated(pi / 3.) for v in self.vectors])
+        angles = [0., pi / 2., pi]
+        self.assertVectorsEqual(self.va.rotate(angles),
+                                [v.get_rotated(a)
+                                 for v, a in zip(self.vectors, angles)])
+        self.assertEqual(self.va.get_perpendicular().as_tuples(),
+                         [(-y, x) for x, y in self.va.as_tuples()])
+        self.assertEqual(list(self.va.dot((2, 1))),
+                         [x * 2 + y for x, y in self.va.as_tuples()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from vector3 import Vector3
+from vector3 import Vector3, FrozenVector3
+from vector3array import Vector3Array
 
 class TestVector3(unittest.TestCase):
 
@@ -68,5 +69,101 @@ class TestVector3(unittest.TestCase):
         self.assertEqual(v1('yyy'), (2, 2, 2))
         self.assertEqual(v1('zyx'), (3, 2, 1))
 
+    def test_into(self):
+        v1 = Vector3(1, 2, 3)
+        v2 = Vector3(4, 5, 6)
+        out = Vector3()
+        self.assert_(Vector3.add_into(v1, v2, out) is out)
+        self.assertEqual(out, v1 + v2)
+        self.assertEqual(Vector3.sub_into(v1, (4, 5, 6), out), v1 - v2)
+        self.assertEqual(Vector3.mul_into(v1, 2, out), v1 * 2)
+        self.assertEqual(Vector3.div_into(v1, v2, out), v1 / v2)
+        self.assertEqual(Vector3.cross_into(v1, v2, out), v1.cross(v2))
+        Vector3.cross_into(v1, v2, v1)
+        self.assertEqual(v1, out)
+        self.assertEqual(Vector3.normalise_into((0, 0, 2), out), (0, 0, 1))
+        self.assertEqual(Vector3.neg_into(out, out), (0, 0, -1))
+
+
+class TestFrozenVector3(unittest.TestCase):
+
+    def test_hash(self):
+        v1 = FrozenVector3(1, 2, 3)
+        d = {v1: "a"}
+        self.assertEqual(d[FrozenVector3.from_floats(1., 2., 3.)], "a")
+        self.assertEqual(hash(v1), hash((1., 2., 3.)))
+
+    def test_immutable(self):
+        v1 = FrozenVector3(1, 2, 3)
+        self.assertRaises(TypeError, setattr, v1, 'x', 2)
+        self.assertRaises(TypeError, v1.__setitem__, 0, 2)
+        self.assertRaises(TypeError, v1.normalise)
+        v2 = v1
+        v2 += (1, 1, 1)
+        self.assertEqual(v1, (1, 2, 3))
+        self.assertEqual(v2, (2, 3, 4))
+
+    def test_operators(self):
+        v1 = FrozenVector3(3, 4, 0)
+        v2 = Vector3(1, 2, 3)
+        self.assertEqual(v1 + v2, (4, 6, 3))
+        self.assertEqual(v2 + v1, (4, 6, 3))
+        self.assertEqual(v1 * 2, (6, 8, 0))
+        self.assertEqual(v1.cross(v2), Vector3(3, 4, 0).cross(v2))
+        self.assert_(isinstance(v1 - v2, FrozenVector3))
+
+    def test_cached(self):
+        v1 = FrozenVector3(3, 4, 0)
+        self.assertEqual(v1.length, 5.)
+        n = v1.get_normalised()
+        self.assertEqual(n, (.6, .8, 0))
+        self.assert_(v1.get_normalised() is n)
+        self.assertEqual(n.get_length(), 1.)
+
+
+class TestVector3Array(unittest.TestCase):
+
+    def setUp(self):
+        self.vectors = [Vector3(1, 2, 3), Vector3(4, 5, 6), Vector3(-1, 0, 2)]
+        self.va = Vector3Array.from_vectors(self.vectors)
+
+    def test_conversion(self):
+        self.assertEqual(len(self.va), 3)
+        self.assertEqual(self.va.to_vectors(), self.vectors)
+        self.assertEqual(self.va[1], (4, 5, 6))
+        self.va[1] = (7, 8, 9)
+        self.assertEqual(list(self.va)[1], (7, 8, 9))
+
+    def test_arithmetic(self):
+        self.assertEqual((self.va + (1, 1, 1)).to_vectors(),
+                         [v + (1, 1, 1) for v in self.vectors])
+        self.assertEqual((self.va - self.va).as_tuples(), [(0, 0, 0)] * 3)
+        self.assertEqual((2 * self.va).to_vectors(),
+                         [v * 2 for v in self.vectors])
+        self.assertEqual((self.va / 2).to_vectors(),
+                         [v / 2 for v in self.vectors])
+        self.va += (1, 2, 3)
+        self.assertEqual(self.va[0], (2, 4, 6))
+
+    def test_dot_cross(self):
+        other = Vector3(3, -1, 2)
+        self.assertEqual(list(self.va.dot(other)),
+                         [v.dot(other) for v in self.vectors])
+        self.assertEqual(self.va.cross(other).to_vectors(),
+                         [v.cross(other) for v in self.vectors])
+
+    def test_length(self):
+        va = Vector3Array.from_vectors([(3, 4, 0), (0, 0, 0), (0, 0, 2)])
+        self.assertEqual(list(va.get_lengths()), [5., 0., 2.])
+        va.normalise()
+        self.assertEqual(va.as_tuples()[1:], [(0., 0., 0.), (0., 0., 1.)])
+
+    def test_distance_centre(self):
+        p = (1, 1, 1)
+        self.assertEqual(list(self.va.get_distance_to_squared(p)),
+                         [v.get_distance_to_squared(p) for v in self.vectors])
+        self.assertEqual(self.va.get_centre(), (4/3., 7/3., 11/3.))
+        self.assertRaises(ValueError, Vector3Array().get_centre)
+
 if __name__ == '__main__':
     unittest.main()
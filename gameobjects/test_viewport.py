@@ -0,0 +1,37 @@
+import unittest
+from array import array
+
+from matrix44 import Matrix44
+from viewport import Viewport
+
+class TestViewport(unittest.TestCase):
+
+    def setUp(self):
+        matrix = Matrix44.perspective_projection_fov(1., 1.5, 1., 100.) * \
+                 Matrix44.xyz_rotation(.1, .2, .3)
+        self.viewport = Viewport(10, 20, 640, 480, matrix)
+        self.points = [ (1., 2., -10.), (-3., 4., -50.), (0., 0., 50.) ]
+
+    def test_project(self):
+        count = len(self.points)
+        packed = array('d', [ v for point in self.points for v in point ])
+        screen = array('d', [0.]) * (count * 2)
+        clip = array('B', [0]) * count
+        depth = array('d', [0.]) * count
+        self.viewport.project(packed, screen, clip, depth)
+        for i, point in enumerate(self.points):
+            projected = self.viewport.project_point(point)
+            if projected is None:
+                self.assertEqual(clip[i], 1)
+                continue
+            self.assertEqual(clip[i], 0)
+            self.assertEqual( (screen[i*2], screen[i*2+1], depth[i]),
+                              projected )
+
+    def test_unproject(self):
+        x, y, depth = self.viewport.project_point(self.points[1])
+        for a, b in zip(self.viewport.unproject(x, y, depth), self.points[1]):
+            self.assertAlmostEqual(a, b)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,272 @@
+from vector3 import Vector3
+from matrix44 import Matrix44
+from quaternion import Quaternion
+
+
+class Transform(object):
+
+    """A translation, rotation and uniform scale, stored separately. Points
+    are scaled, then rotated, then translated. The equivalent Matrix44 is
+    only created when it is asked for, and is kept until one of the parts
+    changes (it is then updated in place).
+
+    The rotation is always stored as a unit quaternion (quaternions that are
+    given are normalised), so that the inverse is simply the conjugate.
+
+    """
+
+    __slots__ = ('_translation', '_rotation', '_scale', '_matrix', '_dirty')
+
+
+    def __init__(self, translation=(0., 0., 0.), rotation=None, scale=1.):
+        """Creates a Transform.
+
+        translation -- A vector (or sequence of 3 values)
+        rotation -- A Quaternion (normalised), or None for no rotation
+        scale -- Scale to apply to all three axis
+
+        """
+
+        self._translation = Vector3(translation)
+        if rotation is None:
+            self._rotation = Quaternion.identity()
+        else:
+            self._rotation = Quaternion.from_iter(rotation).normalise()
+        self._scale = float(scale)
+        self._matrix = None
+        self._dirty = True
+
+
+    @classmethod
+    def _from_parts(cls, translation, rotation, scale):
+        """Creates a Transform that takes ownership of a Vector3 and a
+        Quaternion (no copies are made)."""
+
+        t = cls.__new__(cls, object)
+        t._translation = translation
+        t._rotation = rotation
+        t._scale = scale
+        t._matrix = None
+        t._dirty = True
+        return t
+
+
+    def copy(self):
+        """Returns a copy of this transform."""
+
+        return self._from_parts( self._translation.copy(),
+                                 self._rotation.copy(),
+                                 self._scale )
+
+    __copy__ = copy
+
+
+    def __str__(self):
+
+        return "Transform(translation=%s, rotation=%s, scale=%s)" % \
+            (self._translation, self._rotation, self._scale)
+
+    def __repr__(self):
+
+        return "Transform(%r, %r, %r)" % ( tuple(self._translation),
+                                           tuple(self._rotation),
+                                           self._scale )
+
+
+    def _get_translation(self):
+        return self._translation.copy()
+    def _set_translation(self, translation):
+        x, y, z = translation
+        self.set_translation(x, y, z)
+    translation = property(_get_translation, _set_translation, None,
+                           "Translation, as a Vector3 (a copy).")
+
+    def _get_rotation(self):
+        return self._rotation.copy()
+    def _set_rotation(self, rotation):
+        self.set_rotation(rotation)
+    rotation = property(_get_rotation, _set_rotation, None,
+                        "Rotation, as a Quaternion (a copy).")
+
+    def _get_scale(self):
+        return self._scale
+    def _set_scale(self, scale):
+        self.set_scale(scale)
+    scale = property(_get_scale, _set_scale, None, "Uniform scale.")
+
+
+    def set_translation(self, x, y, z):
+        """Sets the translation."""
+
+        self._translation.set(x, y, z)
+        self._dirty = True
+        return self
+
+
+    def move(self, offset):
+        """Adds an offset to the translation.
+
+        offset -- A vector (or sequence of 3 values)
+
+        """
+
+        self._translation += offset
+        self._dirty = True
+        return self
+
+
+    def set_rotation(self, rotation):
+        """Sets the rotation. The quaternion is normalised.
+
+        rotation -- A Quaternion (or sequence of 4 values)
+
+        """
+
+        x, y, z, w = rotation
+        self._rotation.set(x, y, z, w)
+        self._rotation.normalise()
+        self._dirty = True
+        return self
+
+
+    def rotate(self, rotation):
+        """Adds a rotation, after the current rotation. The result is
+        normalised, so that errors don't build up over many calls.
+
+        rotation -- A Quaternion
+
+        """
+
+        self._rotation = rotation * self._rotation
+        self._rotation.normalise()
+        self._dirty = True
+        return self
+
+
+    def set_scale(self, scale):
+        """Sets the (uniform) scale."""
+
+        self._scale = float(scale)
+        self._dirty = True
+        return self
+
+
+    def get_matrix(self):
+        """Returns the Matrix44 for this transform. The same matrix is
+        returned each time, and it is updated in place when the transform
+        changes. It must not be modified (use get_matrix().copy() for a
+        matrix that may be changed)."""
+
+        m = self._matrix
+        if m is None:
+            m = self._matrix = Matrix44()
+        if self._dirty:
+            m.make_transform(self._translation, self._rotation, self._scale)
+            self._dirty = False
+        return m
+
+
+    def transform(self, v):
+        """Transforms a point and returns the result as a tuple. The matrix
+        is not needed.
+
+        v -- A point (any sequence of 3 values)
+
+        """
+
+        s = self._scale
+        x, y, z = self._rotation.rotate(v)
+        tx, ty, tz = self._translation
+        return ( x * s + tx,
+                 y * s + ty,
+                 z * s + tz )
+
+
+    def transform_vec3(self, v):
+        """Transforms a point and returns the result as a Vector3.
+
+        v -- A point (any sequence of 3 values)
+
+        """
+
+        return Vector3.from_floats(*self.transform(v))
+
+
+    def transform_sequence(self, points):
+        """Transforms a sequence of points, and returns the result as a list
+        of tuples.
+
+        points -- A sequence of points
+
+        """
+
+        s = self._scale
+        rotate = self._rotation.rotate
+        tx, ty, tz = self._translation
+        ret = []
+        append = ret.append
+        for point in points:
+            x, y, z = rotate(point)
+            append( (x * s + tx, y * s + ty, z * s + tz) )
+        return ret
+
+
+    def inverse_transform(self, v):
+        """Transforms a point by the inverse of this transform, and returns
+        the result as a tuple. Much cheaper than inverting a matrix.
+
+        v -- A point (any sequence of 3 values)
+
+        """
+
+        x, y, z = v
+        tx, ty, tz = self._translation
+        s = 1. / self._scale
+        x, y, z = self._rotation.get_conjugate().rotate( (x - tx,
+                                                          y - ty,
+                                                          z - tz) )
+        return x * s, y * s, z * s
+
+
+    def __mul__(self, rhs):
+        """Returns the Transform that does rhs, followed by this transform
+        (the same order as Matrix44 multiplication).
+
+        rhs -- A Transform
+
+        """
+
+        s = self._scale
+        x, y, z = self._rotation.rotate(rhs._translation)
+        tx, ty, tz = self._translation
+        return self._from_parts( Vector3.from_floats( x * s + tx,
+                                                      y * s + ty,
+                                                      z * s + tz ),
+                                 self._rotation * rhs._rotation,
+                                 s * rhs._scale )
+
+
+    def get_inverse(self):
+        """Returns the Transform with the opposite effect."""
+
+        s = 1. / self._scale
+        rotation = self._rotation.get_conjugate()
+        x, y, z = rotation.rotate(self._translation)
+        return self._from_parts( Vector3.from_floats(-x * s, -y * s, -z * s),
+                                 rotation,
+                                 s )
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    t = Transform( (1, 2, 3),
+                   Quaternion.from_axis_angle((0, 0, 1), radians(90)),
+                   2. )
+    print t
+    print t.get_matrix()
+    print t.transform((1, 0, 0))
+    print t.get_matrix().transform((1, 0, 0))
+    print t.inverse_transform(t.transform((1, 0, 0)))
+    print (t * t.get_inverse()).get_matrix()
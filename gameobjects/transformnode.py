@@ -0,0 +1,384 @@
+"""A hierarchy of transforms (a scene graph).
+
+Each TransformNode has a local translation, rotation (x, y and z angles in
+radians) and scale. World matrices are calculated only when they are needed,
+and only for the nodes that have moved (or that have a parent that moved).
+
+The world matrices of a whole tree may be kept in a single Matrix44Array,
+which is updated in place, so that they can be uploaded in one go. e.g.
+
+    root = TransformNode()
+    arm = TransformNode(root)
+    buffer = root.get_world_buffer()
+    ...
+    arm.set_rotation(0., angle, 0.)
+    root.update()   # writes the world matrix of arm (only) into buffer
+
+"""
+
+from matrix44 import Matrix44
+from matrix44array import Matrix44Array
+import batch
+
+
+class TransformNode(object):
+
+    __slots__ = ( '_parent',
+                  '_children',
+                  '_translation',
+                  '_rotation',
+                  '_scale',
+                  '_local',
+                  '_world',
+                  '_local_dirty',
+                  '_world_dirty',
+                  '_index',
+                  '_dirty_nodes',
+                  '_buffer' )
+
+    def __init__(self, parent=None):
+        """Creates a node with an identity transform.
+
+        parent -- Parent node, or None for a root node
+
+        """
+
+        self._parent = None
+        self._children = []
+        self._translation = (0., 0., 0.)
+        self._rotation = (0., 0., 0.)
+        self._scale = (1., 1., 1.)
+        self._local = Matrix44()
+        self._world = Matrix44()
+        self._local_dirty = False
+        self._world_dirty = True
+        self._index = None
+        self._dirty_nodes = [self]
+        self._buffer = None
+
+        if parent is not None:
+            parent.add_child(self)
+
+
+    def _get_parent(self):
+        return self._parent
+    parent = property(_get_parent, None, None, "Parent node (or None).")
+
+    def _get_children(self):
+        return tuple(self._children)
+    children = property(_get_children, None, None, "Tuple of child nodes.")
+
+
+    def get_root(self):
+        """Returns the root node of the tree that this node is in."""
+
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+
+    def iter_nodes(self):
+        """Iterates over this node and all its descendants, depth first."""
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node._children))
+
+
+    def add_child(self, child):
+        """Adds a node as a child of this node. The child is removed from its
+        previous parent, if it has one.
+
+        child -- A TransformNode
+
+        """
+
+        node = self
+        while node is not None:
+            if node is child:
+                raise ValueError("A node can not be a child of itself")
+            node = node._parent
+
+        if child._parent is not None:
+            child._parent.remove_child(child)
+
+        child._parent = self
+        child._dirty_nodes = []
+        self._children.append(child)
+
+        root = self.get_root()
+        root._buffer = None
+        child._set_subtree_dirty()
+        root._dirty_nodes.append(child)
+
+
+    def remove_child(self, child):
+        """Removes a child node, which becomes the root of its own tree.
+
+        child -- A child of this node
+
+        """
+
+        self._children.remove(child)
+        self.get_root()._buffer = None
+
+        child._parent = None
+        child._set_subtree_dirty()
+        child._dirty_nodes = [child]
+
+
+    def detach(self):
+        """Removes this node from its parent (if it has one)."""
+
+        if self._parent is not None:
+            self._parent.remove_child(self)
+
+
+    def _set_subtree_dirty(self):
+        for node in self.iter_nodes():
+            node._world_dirty = True
+            node._index = None
+
+
+    def _invalidate(self):
+        """Marks the world matrix of this node, and all its descendants, as
+        needing to be recalculated."""
+
+        if self._world_dirty:
+            # Descendants of a dirty node are always dirty
+            return
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node._world_dirty = True
+            stack.extend( child for child in node._children
+                          if not child._world_dirty )
+
+        self.get_root()._dirty_nodes.append(self)
+
+
+    def _get_translation(self):
+        return self._translation
+    def _set_translation(self, translation):
+        x, y, z = translation
+        self.set_translation(x, y, z)
+    translation = property(_get_translation, _set_translation, None,
+                           "Local translation, as a tuple of 3 values.")
+
+    def _get_rotation(self):
+        return self._rotation
+    def _set_rotation(self, angles):
+        angle_x, angle_y, angle_z = angles
+        self.set_rotation(angle_x, angle_y, angle_z)
+    rotation = property(_get_rotation, _set_rotation, None,
+                        "Local rotation, as a tuple of the x, y and z angles.")
+
+    def _get_scale(self):
+        return self._scale
+    def _set_scale(self, scale):
+        scale_x, scale_y, scale_z = scale
+        self.set_scale(scale_x, scale_y, scale_z)
+    scale = property(_get_scale, _set_scale, None,
+                     "Local scale, as a tuple of 3 values.")
+
+
+    def set_translation(self, x, y, z):
+        """Sets the local translation.
+
+        x -- Translation along the x axis
+        y -- Translation along the y axis
+        z -- Translation along the z axis
+
+        """
+
+        self._translation = (float(x), float(y), float(z))
+        self._local_dirty = True
+        self._invalidate()
+
+
+    def set_rotation(self, angle_x, angle_y, angle_z):
+        """Sets the local rotation.
+
+        angle_x -- Angle of rotation about the x axis, in radians
+        angle_y -- Angle of rotation about the y axis, in radians
+        angle_z -- Angle of rotation about the z axis, in radians
+
+        """
+
+        self._rotation = (float(angle_x), float(angle_y), float(angle_z))
+        self._local_dirty = True
+        self._invalidate()
+
+
+    def set_scale(self, scale_x, scale_y=None, scale_z=None):
+        """Sets the local scale. If only one scale is given it is used for all
+        three axis.
+
+        scale_x -- Scale along the x axis
+        scale_y -- Scale along the y axis
+        scale_z -- Scale along the z axis
+
+        """
+
+        if scale_y is None:
+            scale_y = scale_x
+        if scale_z is None:
+            scale_z = scale_x
+        self._scale = (float(scale_x), float(scale_y), float(scale_z))
+        self._local_dirty = True
+        self._invalidate()
+
+
+    def _get_local(self):
+
+        m = self._local
+        if self._local_dirty:
+            m.make_xyz_rotation(*self._rotation)
+            scale_x, scale_y, scale_z = self._scale
+            if scale_x != 1. or scale_y != 1. or scale_z != 1.:
+                x0, x1, x2, _ = m.get_row(0)
+                y0, y1, y2, _ = m.get_row(1)
+                z0, z1, z2, _ = m.get_row(2)
+                m.set( (x0 * scale_x, x1 * scale_x, x2 * scale_x),
+                       (y0 * scale_y, y1 * scale_y, y2 * scale_y),
+                       (z0 * scale_z, z1 * scale_z, z2 * scale_z),
+                       self._translation )
+            else:
+                m.translate = self._translation
+            self._local_dirty = False
+        return m
+
+
+    def _update_world(self, buffer):
+        """Recalculates the world matrix, the parent must be up to date."""
+
+        parent = self._parent
+        if parent is None:
+            self._world.make_copy(self._get_local())
+        else:
+            self._world.make_product(parent._world, self._get_local())
+        self._world_dirty = False
+        if buffer is not None and self._index is not None:
+            buffer[self._index] = self._world
+
+
+    def _get_world(self):
+
+        if self._world_dirty:
+            dirty = []
+            node = self
+            while node is not None and node._world_dirty:
+                dirty.append(node)
+                node = node._parent
+            buffer = self.get_root()._buffer
+            for node in reversed(dirty):
+                node._update_world(buffer)
+        return self._world
+
+
+    def get_local_matrix(self):
+        """Returns a copy of the local matrix (relative to the parent)."""
+
+        return self._get_local().copy()
+
+
+    def get_world_matrix(self):
+        """Returns a copy of the world matrix."""
+
+        return self._get_world().copy()
+
+
+    def transform(self, v):
+        """Transforms a point from the space of this node to world space.
+
+        v -- A point (any sequence of 3 values)
+
+        """
+
+        return self._get_world().transform(v)
+
+
+    def inverse_transform(self, v):
+        """Transforms a point from world space to the space of this node.
+
+        v -- A point (any sequence of 3 values)
+
+        """
+
+        return self._get_world().inverse_transform(v)
+
+
+    def update(self):
+        """Recalculates the world matrices of all the nodes in the tree that
+        have moved (or have a parent that moved), and writes them to the
+        buffer returned by get_world_buffer."""
+
+        root = self.get_root()
+        dirty = root._dirty_nodes
+        if not dirty:
+            return
+        root._dirty_nodes = []
+        buffer = root._buffer
+
+        for top in dirty:
+            if top.get_root() is not root:
+                continue
+            # The parent of top may have moved after top was marked
+            top._get_world()
+            stack = list(top._children)
+            while stack:
+                node = stack.pop()
+                if node._world_dirty:
+                    node._update_world(buffer)
+                stack.extend(node._children)
+
+
+    def get_world_buffer(self, use_numpy=False):
+        """Returns a Matrix44Array containing the world matrices of every node
+        in the tree, in the order of iter_nodes on the root. The array is
+        updated in place by the update method, until nodes are added or
+        removed from the tree (after which this method must be called again).
+
+        use_numpy -- If True, the matrices are stored in a NumPy array
+
+        """
+
+        root = self.get_root()
+        buffer = root._buffer
+        if buffer is not None and buffer._backend is batch.get_backend(use_numpy):
+            root.update()
+            return buffer
+
+        root._buffer = None
+        root.update()
+
+        nodes = list(root.iter_nodes())
+        buffer = Matrix44Array(len(nodes), use_numpy)
+        for index, node in enumerate(nodes):
+            node._index = index
+            buffer[index] = node._world
+        root._buffer = buffer
+        return buffer
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    root = TransformNode()
+    root.set_translation(10, 0, 0)
+    arm = TransformNode(root)
+    arm.set_rotation(0, 0, radians(90))
+    hand = TransformNode(arm)
+    hand.set_translation(1, 0, 0)
+
+    buffer = root.get_world_buffer()
+    print hand.transform((0, 0, 0))
+    arm.set_rotation(0, 0, radians(180))
+    root.update()
+    print hand.transform((0, 0, 0))
+    print buffer[2]
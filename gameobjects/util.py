@@ -50,6 +50,95 @@ def next_power_of_2(n):
     """Returns the next power of 2 that is >= n"""
     return int(2 ** ceil(log(n, 2)))
 
+
+# Optional cache of sines and cosines used by sin_cos
+_sin_cos_cache = None
+_sin_cos_size = 0
+_sin_cos_table = None
+_sin_cos_scale = 0.
+
+# True if sin_cos is using a cache (check this before calling sin_cos in
+# code that would otherwise call sin and cos, which is quicker without one)
+sin_cos_cached = False
+
+# Number of sin_cos calls that were (and were not) answered by the cache
+sin_cos_counts = { "hits" : 0, "misses" : 0 }
+
+
+def enable_sin_cos_cache(enable=True, size=4096, steps=None):
+    """Enables (or disables) a cache of sines and cosines, which is used by
+    sin_cos (and so by the Matrix44 rotation methods and Vector2.rotate).
+    This helps when the same angles are used many times, e.g. for sprites
+    that rotate in fixed steps.
+
+    enable -- True to enable the cache, False to disable it
+    size -- Maximum number of angles to remember (the cache is emptied when
+    it is full)
+    steps -- If given, angles are rounded to the nearest of this many steps
+    in a full circle, and looked up in a precomputed table. This is quicker,
+    but only exact for angles that are a multiple of a step
+
+    """
+
+    global _sin_cos_cache, _sin_cos_size, _sin_cos_table, _sin_cos_scale
+    global sin_cos_cached
+    _sin_cos_cache = None
+    _sin_cos_table = None
+    sin_cos_cached = enable
+    reset_sin_cos_counts()
+    if not enable:
+        return
+    if steps is None:
+        _sin_cos_cache = {}
+        _sin_cos_size = size
+    else:
+        step = 2. * pi / steps
+        _sin_cos_table = [ (sin(i * step), cos(i * step))
+                           for i in xrange(steps) ]
+        _sin_cos_scale = 1. / step
+
+
+def reset_sin_cos_counts():
+    """Sets the sin_cos_counts to zero."""
+    for key in sin_cos_counts:
+        sin_cos_counts[key] = 0
+
+
+def get_sin_cos_hit_rate():
+    """Returns the fraction (0 to 1) of sin_cos calls that were answered by
+    the cache, since it was enabled or the counts were reset. Lookups in a
+    precomputed table always count as hits."""
+    hits = sin_cos_counts["hits"]
+    total = hits + sin_cos_counts["misses"]
+    if not total:
+        return 0.
+    return float(hits) / total
+
+
+def sin_cos(angle):
+    """Returns the sine and cosine of an angle (in radians), as a tuple."""
+
+    cache = _sin_cos_cache
+    if cache is not None:
+        try:
+            ret = cache[angle]
+        except KeyError:
+            sin_cos_counts["misses"] += 1
+            if len(cache) >= _sin_cos_size:
+                cache.clear()
+            ret = cache[angle] = (sin(angle), cos(angle))
+        else:
+            sin_cos_counts["hits"] += 1
+        return ret
+
+    table = _sin_cos_table
+    if table is not None:
+        sin_cos_counts["hits"] += 1
+        return table[int(round(angle * _sin_cos_scale)) % len(table)]
+
+    return sin(angle), cos(angle)
+
+
 if __name__ == "__main__":
 
     print list( xrange2d(xrange(3), xrange(3)) )
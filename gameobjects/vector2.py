@@ -1,5 +1,5 @@
 from math import sqrt
-from util import format_number
+from util import format_number, sin_cos
 
 class Vector2(object):
 
@@ -329,6 +329,30 @@ class Vector2(object):
         return Vector2.from_floats(x/l, y/l)
     get_normalized = get_normalised
 
+
+    def rotate(self, angle):
+        """Rotates this vector anti-clockwise (if y is up).
+
+        angle -- Angle of rotation, in radians
+
+        """
+        v = self._v
+        x, y = v
+        s, c = sin_cos(angle)
+        v[0] = x*c - y*s
+        v[1] = x*s + y*c
+        return self
+
+    def get_rotated(self, angle):
+        """Returns a copy of this vector rotated anti-clockwise (if y is up).
+
+        angle -- Angle of rotation, in radians
+
+        """
+        x, y = self._v
+        s, c = sin_cos(angle)
+        return Vector2.from_floats(x*c - y*s, x*s + y*c)
+
     def get_distance_to(self, p):
         """Returns the distance to a point.
 
@@ -341,6 +365,292 @@ class Vector2(object):
         dy = yy-y
         return sqrt( dx*dx + dy*dy )
 
+
+    # The *_into methods store their result in an existing Vector2 rather
+    # than creating a new one, so that hot loops can re-use vectors.
+    # The out vector may also be one of the inputs.
+
+    @staticmethod
+    def add_into(a, b, out):
+        """Adds two vectors, stores the result in out and returns out.
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param b: A Vector2 or list-like object with 2 values
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        xx, yy = getattr(b, '_v', b)
+        v = out._v
+        v[0] = x + xx
+        v[1] = y + yy
+        return out
+
+    @staticmethod
+    def sub_into(a, b, out):
+        """Subtracts b from a, stores the result in out and returns out.
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param b: A Vector2 or list-like object with 2 values
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        xx, yy = getattr(b, '_v', b)
+        v = out._v
+        v[0] = x - xx
+        v[1] = y - yy
+        return out
+
+    @staticmethod
+    def mul_into(a, b, out):
+        """Multiplies a by a vector or a scalar, stores the result in out and
+        returns out.
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param b: A Vector2, list-like object with 2 values or a scalar
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        v = out._v
+        if hasattr(b, "__getitem__"):
+            xx, yy = getattr(b, '_v', b)
+            v[0] = x * xx
+            v[1] = y * yy
+        else:
+            v[0] = x * b
+            v[1] = y * b
+        return out
+
+    @staticmethod
+    def div_into(a, b, out):
+        """Divides a by a vector or a scalar, stores the result in out and
+        returns out.
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param b: A Vector2, list-like object with 2 values or a scalar
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        v = out._v
+        if hasattr(b, "__getitem__"):
+            xx, yy = getattr(b, '_v', b)
+            v[0] = x / xx
+            v[1] = y / yy
+        else:
+            v[0] = x / b
+            v[1] = y / b
+        return out
+
+    @staticmethod
+    def neg_into(a, out):
+        """Negates a vector, stores the result in out and returns out.
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        v = out._v
+        v[0] = -x
+        v[1] = -y
+        return out
+
+    @staticmethod
+    def normalise_into(a, out):
+        """Normalises a vector, stores the result in out and returns out.
+        A null vector results in (0, 0).
+
+        @param a: A Vector2 or list-like object with 2 values
+        @param out: Vector2 to receive the result
+
+        """
+        x, y = getattr(a, '_v', a)
+        v = out._v
+        l = sqrt(x*x + y*y)
+        try:
+            v[0] = x / l
+            v[1] = y / l
+        except ZeroDivisionError:
+            v[0] = 0.
+            v[1] = 0.
+        return out
+    normalize_into = normalise_into
+
+
+class FrozenVector2(Vector2):
+
+    """An immutable Vector2, which may be used as a dictionary key.
+    The hash, length and normalised vector are calculated the first time they
+    are needed and then stored.
+
+    """
+
+    __slots__ = ('_hash', '_length', '_normalised')
+
+
+    def __init__(self, x=0., y=0.):
+
+        Vector2.__init__(self, x, y)
+        self._v = tuple(self._v)
+        self._hash = None
+        self._length = None
+        self._normalised = None
+
+    @classmethod
+    def from_floats(cls, x, y):
+        vec = cls.__new__(cls, object)
+        vec._v = (x, y)
+        vec._hash = None
+        vec._length = None
+        vec._normalised = None
+        return vec
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a FrozenVector2 object from an iterable.
+
+        @param iterable: An iterable of at least 2 numeric values
+
+        """
+        next = iter(iterable).next
+        return cls.from_floats(float(next()), float(next()))
+
+    @classmethod
+    def from_points(cls, p1, p2):
+        """Creates a FrozenVector2 object between two points.
+        @param p1: First point
+        @param p2: Second point
+
+        """
+        x, y = p1
+        xx, yy = p2
+        return cls.from_floats(float(xx-x), float(yy-y))
+
+    @classmethod
+    def _from_float_sequence(cls, sequence):
+        x, y = sequence[:2]
+        return cls.from_floats(x, y)
+
+    @classmethod
+    def from_vector(cls, vector):
+        """Creates a FrozenVector2 from a Vector2 (or any sequence of 2
+        floats)."""
+        x, y = vector
+        return cls.from_floats(x, y)
+
+    def copy(self):
+        """Returns this object. There is no need to copy an immutable
+        object."""
+        return self
+
+    def thaw(self):
+        """Returns a (mutable) Vector2 with the same components."""
+        x, y = self._v
+        return Vector2.from_floats(x, y)
+
+
+    def _immutable(self, *args):
+        raise TypeError("FrozenVector2 objects are immutable")
+
+    set_x = set_y = _immutable
+    __setitem__ = _immutable
+    normalise = normalize = _immutable
+    rotate = _immutable
+
+    # The Vector2 operators create a Vector2, these create a FrozenVector2.
+    # The in-place operators re-bind to a new vector rather than modify.
+
+    def __add__(self, rhs):
+        x, y = self._v
+        xx, yy = rhs
+        return self.from_floats(x+xx, y+yy)
+
+    def __sub__(self, rhs):
+        x, y = self._v
+        xx, yy = rhs
+        return self.from_floats(x-xx, y-yy)
+
+    def __mul__(self, rhs):
+        x, y = self._v
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            return self.from_floats(x*xx, y*yy)
+        else:
+            return self.from_floats(x*rhs, y*rhs)
+
+    def __div__(self, rhs):
+        x, y = self._v
+        if hasattr(rhs, "__getitem__"):
+            xx, yy = rhs
+            return self.from_floats(x/xx, y/yy)
+        else:
+            return self.from_floats(x/rhs, y/rhs)
+
+    def __neg__(self):
+        x, y = self._v
+        return self.from_floats(-x, -y)
+
+    __iadd__ = __add__
+    __isub__ = __sub__
+    __imul__ = __mul__
+    __idiv__ = __div__
+
+    x = property(Vector2.get_x, _immutable, None, "x component.")
+    y = property(Vector2.get_y, _immutable, None, "y component.")
+
+
+    def __repr__(self):
+
+        x, y = self._v
+        return "FrozenVector2(%s, %s)" % (x, y)
+
+    def __iter__(self):
+
+        return iter(self._v)
+
+    def __hash__(self):
+
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(self._v)
+        return h
+
+    def as_tuple(self):
+        """Converts this vector to a tuple.
+
+        @rtype: Tuple
+        @return: Tuple containing the vector components
+        """
+        return self._v
+
+
+    def get_length(self):
+        """Returns the length of this vector (calculated only once)."""
+        l = self._length
+        if l is None:
+            x, y = self._v
+            l = self._length = sqrt(x*x + y*y)
+        return l
+    get_magnitude = get_length
+    length = property(get_length, _immutable, None, "Length of the vector")
+
+
+    def get_normalised(self):
+        """Returns the normalised vector (calculated only once)."""
+        n = self._normalised
+        if n is None:
+            x, y = self._v
+            l = self.get_length()
+            n = self._normalised = self.from_floats(x/l, y/l)
+            n._length = 1.0
+            n._normalised = n
+        return n
+    get_normalized = get_normalised
+
+
 if __name__ == "__main__":
 
     v1 = Vector2(1, 2)
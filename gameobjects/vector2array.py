@@ -0,0 +1,421 @@
+from itertools import izip
+
+from vector2 import Vector2
+from util import format_number, sin_cos
+import batch
+
+
+class Vector2Array(object):
+
+    """A sequence of 2D vectors, stored as two contiguous arrays of floats
+    (one for each of the x and y components). Math operations apply to
+    every vector in one call, which is much quicker than doing the same thing
+    with a list of Vector2 objects.
+
+    """
+
+    __slots__ = ('_x', '_y', '_backend')
+
+    _gameobjects_vector = 2
+
+
+    def __init__(self, size=0, use_numpy=False):
+        """Creates an array of null vectors.
+
+        size -- Number of vectors in the array
+        use_numpy -- If True, components are stored in NumPy arrays
+
+        """
+
+        backend = batch.get_backend(use_numpy)
+        self._backend = backend
+        self._x = backend.zeros(size)
+        self._y = backend.zeros(size)
+
+
+    @classmethod
+    def _from_components(cls, backend, x, y):
+        """Creates a Vector2Array that takes ownership of two component
+        arrays (no copy is made)."""
+
+        va = cls.__new__(cls, object)
+        va._backend = backend
+        va._x = x
+        va._y = y
+        return va
+
+
+    @classmethod
+    def from_components(cls, xs, ys, use_numpy=False):
+        """Creates a Vector2Array from two sequences of the same length.
+
+        xs -- Sequence of x components
+        ys -- Sequence of y components
+
+        """
+
+        if len(xs) != len(ys):
+            raise ValueError("Component sequences must be the same length")
+        backend = batch.get_backend(use_numpy)
+        return cls._from_components( backend,
+                                     backend.from_iter(xs),
+                                     backend.from_iter(ys) )
+
+
+    @classmethod
+    def from_vectors(cls, vectors, use_numpy=False):
+        """Creates a Vector2Array from a sequence of Vector2s (or any other
+        objects that contain 2 values).
+
+        vectors -- A sequence of vectors
+
+        """
+
+        backend = batch.get_backend(use_numpy)
+        vectors = list(vectors)
+        if not vectors:
+            return cls(0, use_numpy)
+        xs, ys = zip(*vectors)
+        return cls._from_components( backend,
+                                     backend.from_iter(xs),
+                                     backend.from_iter(ys) )
+
+
+    def to_vectors(self):
+        """Returns a list of Vector2 objects."""
+
+        from_floats = Vector2.from_floats
+        return [ from_floats(float(x), float(y))
+                 for x, y in izip(self._x, self._y) ]
+
+
+    def as_tuples(self):
+        """Returns a list of (x, y) tuples."""
+
+        return zip(self._x, self._y)
+
+
+    def get_components(self):
+        """Returns the x and y component arrays. These are the storage used
+        by this object, so changes will be reflected in the vectors."""
+
+        return self._x, self._y
+
+
+    def copy(self):
+        """Returns a copy of this array."""
+
+        copy = self._backend.copy
+        return self._from_components( self._backend,
+                                      copy(self._x),
+                                      copy(self._y) )
+
+    __copy__ = copy
+
+
+    def __len__(self):
+
+        return len(self._x)
+
+
+    def __iter__(self):
+        """Iterates over the vectors, yielding Vector2s."""
+
+        from_floats = Vector2.from_floats
+        for x, y in izip(self._x, self._y):
+            yield from_floats(float(x), float(y))
+
+
+    def __getitem__(self, index):
+        """Retrieves a Vector2 (a copy) given its index, or a new
+        Vector2Array if index is a slice.
+
+        """
+
+        if isinstance(index, slice):
+            copy = self._backend.copy
+            return self._from_components( self._backend,
+                                          copy(self._x[index]),
+                                          copy(self._y[index]) )
+        try:
+            return Vector2.from_floats( float(self._x[index]),
+                                        float(self._y[index]) )
+        except IndexError:
+            raise IndexError("Vector2Array index out of range")
+
+
+    def __setitem__(self, index, value):
+        """Sets a vector, given its index.
+
+        index -- Index of the vector
+        value -- A Vector2, or sequence of 2 values
+
+        """
+
+        x, y = value
+        try:
+            self._x[index] = x
+            self._y[index] = y
+        except IndexError:
+            raise IndexError("Vector2Array index out of range")
+
+
+    def __str__(self):
+
+        return "[%s]" % ", ".join( "(%s, %s)" % ( format_number(x),
+                                                   format_number(y) )
+                                   for x, y in self.as_tuples() )
+
+
+    def __repr__(self):
+
+        return "Vector2Array.from_vectors(%r)" % self.as_tuples()
+
+
+    def _split(self, other):
+        """Returns the x and y parts of other, which may be a Vector2Array, a
+        single vector or a scalar."""
+
+        if isinstance(other, Vector2Array):
+            if len(other._x) != len(self._x):
+                raise ValueError("Vector2Arrays must be the same length")
+            return other._x, other._y
+        if hasattr(other, "__getitem__"):
+            x, y = other
+            return float(x), float(y)
+        other = float(other)
+        return other, other
+
+
+    def _binary(self, op, rhs):
+        ox, oy = self._split(rhs)
+        return self._from_components( self._backend,
+                                      op(self._x, ox),
+                                      op(self._y, oy) )
+
+
+    def _rbinary(self, op, lhs):
+        ox, oy = self._split(lhs)
+        return self._from_components( self._backend,
+                                      op(ox, self._x),
+                                      op(oy, self._y) )
+
+
+    def _inplace(self, op, rhs):
+        ox, oy = self._split(rhs)
+        self._x = op(self._x, ox)
+        self._y = op(self._y, oy)
+        return self
+
+
+    def __add__(self, rhs):
+        """Adds a Vector2Array, a vector or a scalar to every vector."""
+        return self._binary(self._backend.add, rhs)
+
+    def __radd__(self, lhs):
+        return self._rbinary(self._backend.add, lhs)
+
+    def __iadd__(self, rhs):
+        return self._inplace(self._backend.iadd, rhs)
+
+
+    def __sub__(self, rhs):
+        """Subtracts a Vector2Array, a vector or a scalar from every vector."""
+        return self._binary(self._backend.sub, rhs)
+
+    def __rsub__(self, lhs):
+        return self._rbinary(self._backend.sub, lhs)
+
+    def __isub__(self, rhs):
+        return self._inplace(self._backend.isub, rhs)
+
+
+    def __mul__(self, rhs):
+        """Multiplies every vector by a Vector2Array, a vector or a scalar."""
+        return self._binary(self._backend.mul, rhs)
+
+    def __rmul__(self, lhs):
+        return self._rbinary(self._backend.mul, lhs)
+
+    def __imul__(self, rhs):
+        return self._inplace(self._backend.imul, rhs)
+
+
+    def __div__(self, rhs):
+        """Divides every vector by a Vector2Array, a vector or a scalar."""
+        return self._binary(self._backend.div, rhs)
+    __truediv__ = __div__
+
+    def __rdiv__(self, lhs):
+        return self._rbinary(self._backend.div, lhs)
+    __rtruediv__ = __rdiv__
+
+    def __idiv__(self, rhs):
+        return self._inplace(self._backend.idiv, rhs)
+    __itruediv__ = __idiv__
+
+
+    def __neg__(self):
+        """Returns a Vector2Array with every vector negated."""
+
+        neg = self._backend.neg
+        return self._from_components( self._backend,
+                                      neg(self._x),
+                                      neg(self._y) )
+
+
+    def scalar_mul(self, scalar):
+        """Multiplies every vector by a scalar, in place."""
+
+        self._inplace(self._backend.imul, scalar)
+
+
+    def dot(self, other):
+        """Returns an array of the dot products of each vector with another
+        (or with the corresponding vector in a Vector2Array).
+
+        other -- A Vector2Array or a single vector
+
+        """
+
+        b = self._backend
+        ox, oy = self._split(other)
+        return b.add( b.mul(self._x, ox),
+                      b.mul(self._y, oy) )
+
+
+    def get_perpendicular(self):
+        """Returns a Vector2Array with every vector rotated a quarter turn
+        anti-clockwise (if y is up), i.e. (-y, x)."""
+
+        b = self._backend
+        return self._from_components( b,
+                                      b.neg(self._y),
+                                      b.copy(self._x) )
+
+
+    def _rotated(self, angle):
+        """Returns the rotated x and y components."""
+
+        b = self._backend
+        mul = b.mul
+        if hasattr(angle, "__getitem__"):
+            if len(angle) != len(self._x):
+                raise ValueError("There must be one angle for each vector")
+            s = b.sin(angle)
+            c = b.cos(angle)
+        else:
+            s, c = sin_cos(angle)
+        x = self._x
+        y = self._y
+        return ( b.sub(mul(x, c), mul(y, s)),
+                 b.add(mul(x, s), mul(y, c)) )
+
+
+    def rotate(self, angle):
+        """Rotates every vector anti-clockwise (if y is up), in place.
+
+        angle -- Angle of rotation in radians, or a sequence of angles (one
+        for each vector)
+
+        """
+
+        self._x, self._y = self._rotated(angle)
+        return self
+
+
+    def get_rotated(self, angle):
+        """Returns a copy of this array with every vector rotated. See
+        rotate."""
+
+        x, y = self._rotated(angle)
+        return self._from_components(self._backend, x, y)
+
+
+    def get_lengths_squared(self):
+        """Returns an array of the squared length of each vector."""
+
+        return self.dot(self)
+
+
+    def get_lengths(self):
+        """Returns an array of the length of each vector."""
+
+        return self._backend.sqrt(self.dot(self))
+    get_magnitudes = get_lengths
+
+
+    def normalise(self):
+        """Scales every vector to be length 1. Null vectors are left as
+        (0, 0)."""
+
+        b = self._backend
+        scale = b.safe_reciprocal(self.get_lengths())
+        self._x = b.imul(self._x, scale)
+        self._y = b.imul(self._y, scale)
+        return self
+    normalize = normalise
+
+
+    def get_normalised(self):
+        """Returns a copy of this array, with every vector normalised."""
+
+        return self.copy().normalise()
+    get_normalized = get_normalised
+
+
+    def get_distance_to_squared(self, p):
+        """Returns an array of the squared distance from each vector to a
+        point (or to the corresponding point in a Vector2Array).
+
+        p -- A position, or a Vector2Array of positions
+
+        """
+
+        b = self._backend
+        sub = b.sub
+        mul = b.mul
+        px, py = self._split(p)
+        dx = sub(self._x, px)
+        dy = sub(self._y, py)
+        return b.add(mul(dx, dx), mul(dy, dy))
+
+
+    def get_distance_to(self, p):
+        """Returns an array of the distance from each vector to a point (or to
+        the corresponding point in a Vector2Array).
+
+        p -- A position, or a Vector2Array of positions
+
+        """
+
+        return self._backend.sqrt(self.get_distance_to_squared(p))
+
+
+    def get_centre(self):
+        """Returns the average of all the vectors, as a Vector2. A ValueError is
+        raised if the array is empty, as there is no average."""
+
+        count = len(self._x)
+        if not count:
+            raise ValueError("An empty Vector2Array has no centre")
+        b = self._backend
+        return Vector2.from_floats( b.sum(self._x) / count,
+                                    b.sum(self._y) / count )
+
+
+if __name__ == "__main__":
+
+    from math import radians
+
+    va = Vector2Array.from_vectors([(1, 2), (3, 4), (0, 0)])
+    print va
+    print va + (1, 1)
+    print va * 2
+    print va.get_perpendicular()
+    print va.get_rotated(radians(90))
+    print va.get_rotated([0., radians(90), radians(180)])
+    print list(va.get_lengths())
+    print va.get_normalised()
+    print va.get_centre()
+    print va.to_vectors()
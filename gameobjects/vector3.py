@@ -632,6 +632,291 @@ class Vector3(object):
                  x*by - bx*y )
 
 
+    # The *_into methods store their result in an existing Vector3 rather
+    # than creating a new one, so that hot loops can re-use vectors.
+    # The out vector may also be one of the inputs.
+
+    @staticmethod
+    def add_into(a, b, out):
+        """Adds two vectors, stores the result in out and returns out.
+
+        a -- A vector or sequence of 3 values
+        b -- A vector or sequence of 3 values
+        out -- Vector3 to receive the result
+
+        """
+        ax, ay, az = getattr(a, '_v', a)
+        bx, by, bz = getattr(b, '_v', b)
+        v = out._v
+        v[0] = ax + bx
+        v[1] = ay + by
+        v[2] = az + bz
+        return out
+
+    @staticmethod
+    def sub_into(a, b, out):
+        """Subtracts b from a, stores the result in out and returns out.
+
+        a -- A vector or sequence of 3 values
+        b -- A vector or sequence of 3 values
+        out -- Vector3 to receive the result
+
+        """
+        ax, ay, az = getattr(a, '_v', a)
+        bx, by, bz = getattr(b, '_v', b)
+        v = out._v
+        v[0] = ax - bx
+        v[1] = ay - by
+        v[2] = az - bz
+        return out
+
+    @staticmethod
+    def mul_into(a, b, out):
+        """Multiplies a by a vector or a scalar, stores the result in out and
+        returns out.
+
+        a -- A vector or sequence of 3 values
+        b -- A vector, sequence of 3 values or a single value
+        out -- Vector3 to receive the result
+
+        """
+        ax, ay, az = getattr(a, '_v', a)
+        v = out._v
+        if hasattr(b, "__getitem__"):
+            bx, by, bz = getattr(b, '_v', b)
+            v[0] = ax * bx
+            v[1] = ay * by
+            v[2] = az * bz
+        else:
+            v[0] = ax * b
+            v[1] = ay * b
+            v[2] = az * b
+        return out
+
+    @staticmethod
+    def div_into(a, b, out):
+        """Divides a by a vector or a scalar, stores the result in out and
+        returns out.
+
+        a -- A vector or sequence of 3 values
+        b -- A vector, sequence of 3 values or a single value
+        out -- Vector3 to receive the result
+
+        """
+        ax, ay, az = getattr(a, '_v', a)
+        v = out._v
+        if hasattr(b, "__getitem__"):
+            bx, by, bz = getattr(b, '_v', b)
+            v[0] = ax / bx
+            v[1] = ay / by
+            v[2] = az / bz
+        else:
+            v[0] = ax / b
+            v[1] = ay / b
+            v[2] = az / b
+        return out
+
+    @staticmethod
+    def neg_into(a, out):
+        """Negates a vector, stores the result in out and returns out.
+
+        a -- A vector or sequence of 3 values
+        out -- Vector3 to receive the result
+
+        """
+        ax, ay, az = getattr(a, '_v', a)
+        v = out._v
+        v[0] = -ax
+        v[1] = -ay
+        v[2] = -az
+        return out
+
+    @staticmethod
+    def normalise_into(a, out):
+        """Normalises a vector, stores the result in out and returns out.
+        A null vector results in (0, 0, 0).
+
+        a -- A vector or sequence of 3 values
+        out -- Vector3 to receive the result
+
+        """
+        x, y, z = getattr(a, '_v', a)
+        v = out._v
+        l = sqrt(x*x + y*y + z*z)
+        try:
+            v[0] = x / l
+            v[1] = y / l
+            v[2] = z / l
+        except ZeroDivisionError:
+            v[0] = 0.0
+            v[1] = 0.0
+            v[2] = 0.0
+        return out
+    normalize_into = normalise_into
+
+    @staticmethod
+    def cross_into(a, b, out):
+        """Calculates the cross product of two vectors, stores the result in
+        out and returns out.
+
+        a -- A vector or sequence of 3 values
+        b -- A vector or sequence of 3 values
+        out -- Vector3 to receive the result
+
+        """
+        x, y, z = getattr(a, '_v', a)
+        bx, by, bz = getattr(b, '_v', b)
+        v = out._v
+        v[0] = y*bz - by*z
+        v[1] = z*bx - bz*x
+        v[2] = x*by - bx*y
+        return out
+
+
+class FrozenVector3(Vector3):
+
+    """An immutable Vector3, which may be used as a dictionary key.
+    The hash, length and normalised vector are calculated the first time they
+    are needed and then stored. Operators return new FrozenVector3s, and the
+    in-place operators (+= etc) re-bind rather than modify.
+
+    """
+
+    __slots__ = ('_hash', '_length', '_normalised')
+
+
+    def __init__(self, *args):
+
+        Vector3.__init__(self, *args)
+        self._v = tuple(self._v)
+        self._hash = None
+        self._length = None
+        self._normalised = None
+
+
+    @classmethod
+    def from_points(cls, p1, p2):
+
+        ax, ay, az = p1
+        bx, by, bz = p2
+        return cls.from_floats(bx-ax, by-ay, bz-az)
+
+    @classmethod
+    def from_floats(cls, x, y, z):
+        """Creates a FrozenVector3 from individual float values.
+        Warning: There is no checking (for efficiency) here: x, y, z _must_ be
+        floats.
+
+        """
+        v = cls.__new__(cls, object)
+        v._v = (x, y, z)
+        v._hash = None
+        v._length = None
+        v._normalised = None
+        return v
+
+    @classmethod
+    def from_iter(cls, iterable):
+        """Creates a FrozenVector3 from an iterable containing at least 3
+        values."""
+        next = iter(iterable).next
+        return cls.from_floats(float(next()), float(next()), float(next()))
+
+    @classmethod
+    def _from_float_sequence(cls, sequence):
+        x, y, z = sequence[:3]
+        return cls.from_floats(x, y, z)
+
+    @classmethod
+    def from_vector(cls, vector):
+        """Creates a FrozenVector3 from a Vector3 (or any sequence of 3
+        floats)."""
+        x, y, z = vector
+        return cls.from_floats(x, y, z)
+
+    def copy(self):
+        """Returns this vector. There is no need to copy an immutable
+        object."""
+        return self
+
+    __copy__ = copy
+
+    def thaw(self):
+        """Returns a (mutable) Vector3 with the same components."""
+        x, y, z = self._v
+        return Vector3.from_floats(x, y, z)
+
+
+    def _immutable(self, *args):
+        raise TypeError("FrozenVector3 objects are immutable")
+
+    set = _immutable
+    __setitem__ = _immutable
+    scalar_mul = vector_mul = _immutable
+    scalar_div = vector_div = _immutable
+    scale = _immutable
+    set_length = _immutable
+    normalise = normalize = _immutable
+
+    __iadd__ = Vector3.__add__
+    __isub__ = Vector3.__sub__
+    __imul__ = Vector3.__mul__
+    __idiv__ = Vector3.__div__
+
+    x = property(Vector3._get_x, _immutable, None, "x component.")
+    y = property(Vector3._get_y, _immutable, None, "y component.")
+    z = property(Vector3._get_z, _immutable, None, "z component.")
+
+
+    def __repr__(self):
+
+        x, y, z = self._v
+        return "FrozenVector3(%s, %s, %s)" % (x, y, z)
+
+    def __iter__(self):
+        """Iterates the components in x, y, z order."""
+        return iter(self._v)
+
+    def __hash__(self):
+
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(self._v)
+        return h
+
+    def as_tuple(self):
+        """Returns a tuple of the x, y, z components."""
+
+        return self._v
+
+
+    def get_length(self):
+        """Returns the length of the vector (calculated only once)."""
+
+        l = self._length
+        if l is None:
+            x, y, z = self._v
+            l = self._length = sqrt(x*x + y*y + z*z)
+        return l
+    get_magnitude = get_length
+    length = property(get_length, _immutable, None, "Length of the vector")
+
+
+    def get_normalised(self):
+        """Returns the normalised vector (calculated only once)."""
+
+        n = self._normalised
+        if n is None:
+            x, y, z = self._v
+            l = self.get_length()
+            n = self._normalised = self.from_floats(x/l, y/l, z/l)
+            n._length = 1.0
+            n._normalised = n
+        return n
+    get_normalized = get_normalised
+    unit = get_normalised
+
+
 def distance3d_squared(p1, p2):
 
     x, y, z = p1
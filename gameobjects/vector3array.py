@@ -0,0 +1,415 @@
+from itertools import izip
+
+from vector3 import Vector3, centre_point3d as _centre_point3d
+from util import format_number
+import batch
+
+
+class Vector3Array(object):
+
+    """A sequence of 3D vectors, stored as three contiguous arrays of floats
+    (one for each of the x, y and z components). Math operations apply to
+    every vector in one call, which is much quicker than doing the same thing
+    with a list of Vector3 objects.
+
+    """
+
+    __slots__ = ('_x', '_y', '_z', '_backend')
+
+    _gameobjects_vector = 3
+
+
+    def __init__(self, size=0, use_numpy=False):
+        """Creates an array of null vectors.
+
+        size -- Number of vectors in the array
+        use_numpy -- If True, components are stored in NumPy arrays
+
+        """
+
+        backend = batch.get_backend(use_numpy)
+        self._backend = backend
+        self._x = backend.zeros(size)
+        self._y = backend.zeros(size)
+        self._z = backend.zeros(size)
+
+
+    @classmethod
+    def _from_components(cls, backend, x, y, z):
+        """Creates a Vector3Array that takes ownership of three component
+        arrays (no copy is made)."""
+
+        va = cls.__new__(cls, object)
+        va._backend = backend
+        va._x = x
+        va._y = y
+        va._z = z
+        return va
+
+
+    @classmethod
+    def from_components(cls, xs, ys, zs, use_numpy=False):
+        """Creates a Vector3Array from three sequences of the same length.
+
+        xs -- Sequence of x components
+        ys -- Sequence of y components
+        zs -- Sequence of z components
+
+        """
+
+        if not len(xs) == len(ys) == len(zs):
+            raise ValueError("Component sequences must be the same length")
+        backend = batch.get_backend(use_numpy)
+        return cls._from_components( backend,
+                                     backend.from_iter(xs),
+                                     backend.from_iter(ys),
+                                     backend.from_iter(zs) )
+
+
+    @classmethod
+    def from_vectors(cls, vectors, use_numpy=False):
+        """Creates a Vector3Array from a sequence of Vector3s (or any other
+        objects that contain 3 values).
+
+        vectors -- A sequence of vectors
+
+        """
+
+        backend = batch.get_backend(use_numpy)
+        vectors = list(vectors)
+        if not vectors:
+            return cls(0, use_numpy)
+        xs, ys, zs = zip(*vectors)
+        return cls._from_components( backend,
+                                     backend.from_iter(xs),
+                                     backend.from_iter(ys),
+                                     backend.from_iter(zs) )
+
+
+    def to_vectors(self):
+        """Returns a list of Vector3 objects."""
+
+        from_floats = Vector3.from_floats
+        return [ from_floats(float(x), float(y), float(z))
+                 for x, y, z in izip(self._x, self._y, self._z) ]
+
+
+    def as_tuples(self):
+        """Returns a list of (x, y, z) tuples."""
+
+        return zip(self._x, self._y, self._z)
+
+
+    def get_components(self):
+        """Returns the x, y and z component arrays. These are the storage
+        used by this object, so changes will be reflected in the vectors."""
+
+        return self._x, self._y, self._z
+
+
+    def copy(self):
+        """Returns a copy of this array."""
+
+        copy = self._backend.copy
+        return self._from_components( self._backend,
+                                      copy(self._x),
+                                      copy(self._y),
+                                      copy(self._z) )
+
+    __copy__ = copy
+
+
+    def __len__(self):
+
+        return len(self._x)
+
+
+    def __iter__(self):
+        """Iterates over the vectors, yielding Vector3s."""
+
+        from_floats = Vector3.from_floats
+        for x, y, z in izip(self._x, self._y, self._z):
+            yield from_floats(float(x), float(y), float(z))
+
+
+    def __getitem__(self, index):
+        """Retrieves a Vector3 (a copy) given its index, or a new
+        Vector3Array if index is a slice.
+
+        """
+
+        if isinstance(index, slice):
+            copy = self._backend.copy
+            return self._from_components( self._backend,
+                                          copy(self._x[index]),
+                                          copy(self._y[index]),
+                                          copy(self._z[index]) )
+        try:
+            return Vector3.from_floats( float(self._x[index]),
+                                        float(self._y[index]),
+                                        float(self._z[index]) )
+        except IndexError:
+            raise IndexError("Vector3Array index out of range")
+
+
+    def __setitem__(self, index, value):
+        """Sets a vector, given its index.
+
+        index -- Index of the vector
+        value -- A Vector3, or sequence of 3 values
+
+        """
+
+        x, y, z = value
+        try:
+            self._x[index] = x
+            self._y[index] = y
+            self._z[index] = z
+        except IndexError:
+            raise IndexError("Vector3Array index out of range")
+
+
+    def __str__(self):
+
+        return "[%s]" % ", ".join( "(%s, %s, %s)" % ( format_number(x),
+                                                       format_number(y),
+                                                       format_number(z) )
+                                   for x, y, z in self.as_tuples() )
+
+
+    def __repr__(self):
+
+        return "Vector3Array.from_vectors(%r)" % self.as_tuples()
+
+
+    def _split(self, other):
+        """Returns the x, y and z parts of other, which may be a
+        Vector3Array, a single vector or a scalar."""
+
+        if isinstance(other, Vector3Array):
+            if len(other._x) != len(self._x):
+                raise ValueError("Vector3Arrays must be the same length")
+            return other._x, other._y, other._z
+        if hasattr(other, "__getitem__"):
+            x, y, z = other
+            return float(x), float(y), float(z)
+        other = float(other)
+        return other, other, other
+
+
+    def _binary(self, op, rhs):
+        ox, oy, oz = self._split(rhs)
+        return self._from_components( self._backend,
+                                      op(self._x, ox),
+                                      op(self._y, oy),
+                                      op(self._z, oz) )
+
+
+    def _rbinary(self, op, lhs):
+        ox, oy, oz = self._split(lhs)
+        return self._from_components( self._backend,
+                                      op(ox, self._x),
+                                      op(oy, self._y),
+                                      op(oz, self._z) )
+
+
+    def _inplace(self, op, rhs):
+        ox, oy, oz = self._split(rhs)
+        self._x = op(self._x, ox)
+        self._y = op(self._y, oy)
+        self._z = op(self._z, oz)
+        return self
+
+
+    def __add__(self, rhs):
+        """Adds a Vector3Array, a vector or a scalar to every vector."""
+        return self._binary(self._backend.add, rhs)
+
+    def __radd__(self, lhs):
+        return self._rbinary(self._backend.add, lhs)
+
+    def __iadd__(self, rhs):
+        return self._inplace(self._backend.iadd, rhs)
+
+
+    def __sub__(self, rhs):
+        """Subtracts a Vector3Array, a vector or a scalar from every vector."""
+        return self._binary(self._backend.sub, rhs)
+
+    def __rsub__(self, lhs):
+        return self._rbinary(self._backend.sub, lhs)
+
+    def __isub__(self, rhs):
+        return self._inplace(self._backend.isub, rhs)
+
+
+    def __mul__(self, rhs):
+        """Multiplies every vector by a Vector3Array, a vector or a scalar."""
+        return self._binary(self._backend.mul, rhs)
+
+    def __rmul__(self, lhs):
+        return self._rbinary(self._backend.mul, lhs)
+
+    def __imul__(self, rhs):
+        return self._inplace(self._backend.imul, rhs)
+
+
+    def __div__(self, rhs):
+        """Divides every vector by a Vector3Array, a vector or a scalar."""
+        return self._binary(self._backend.div, rhs)
+    __truediv__ = __div__
+
+    def __rdiv__(self, lhs):
+        return self._rbinary(self._backend.div, lhs)
+    __rtruediv__ = __rdiv__
+
+    def __idiv__(self, rhs):
+        return self._inplace(self._backend.idiv, rhs)
+    __itruediv__ = __idiv__
+
+
+    def __neg__(self):
+        """Returns a Vector3Array with every vector negated."""
+
+        neg = self._backend.neg
+        return self._from_components( self._backend,
+                                      neg(self._x),
+                                      neg(self._y),
+                                      neg(self._z) )
+
+
+    def scalar_mul(self, scalar):
+        """Multiplies every vector by a scalar, in place."""
+
+        self._inplace(self._backend.imul, scalar)
+
+
+    def dot(self, other):
+        """Returns an array of the dot products of each vector with another
+        (or with the corresponding vector in a Vector3Array).
+
+        other -- A Vector3Array or a single vector
+
+        """
+
+        b = self._backend
+        ox, oy, oz = self._split(other)
+        return b.add( b.add( b.mul(self._x, ox),
+                             b.mul(self._y, oy) ),
+                      b.mul(self._z, oz) )
+
+
+    def cross(self, other):
+        """Returns a Vector3Array containing the cross product of each vector
+        with another (or with the corresponding vector in a Vector3Array).
+
+        other -- A Vector3Array or a single vector
+
+        """
+
+        b = self._backend
+        mul = b.mul
+        sub = b.sub
+        x, y, z = self._x, self._y, self._z
+        bx, by, bz = self._split(other)
+        return self._from_components( b,
+                                      sub(mul(y, bz), mul(by, z)),
+                                      sub(mul(z, bx), mul(bz, x)),
+                                      sub(mul(x, by), mul(bx, y)) )
+
+
+    def get_lengths_squared(self):
+        """Returns an array of the squared length of each vector."""
+
+        return self.dot(self)
+
+
+    def get_lengths(self):
+        """Returns an array of the length of each vector."""
+
+        return self._backend.sqrt(self.dot(self))
+    get_magnitudes = get_lengths
+
+
+    def normalise(self):
+        """Scales every vector to be length 1. Null vectors are left as
+        (0, 0, 0)."""
+
+        b = self._backend
+        scale = b.safe_reciprocal(self.get_lengths())
+        self._x = b.imul(self._x, scale)
+        self._y = b.imul(self._y, scale)
+        self._z = b.imul(self._z, scale)
+        return self
+    normalize = normalise
+
+
+    def get_normalised(self):
+        """Returns a copy of this array, with every vector normalised."""
+
+        return self.copy().normalise()
+    get_normalized = get_normalised
+
+
+    def get_distance_to_squared(self, p):
+        """Returns an array of the squared distance from each vector to a
+        point (or to the corresponding point in a Vector3Array).
+
+        p -- A position, or a Vector3Array of positions
+
+        """
+
+        b = self._backend
+        sub = b.sub
+        mul = b.mul
+        px, py, pz = self._split(p)
+        dx = sub(self._x, px)
+        dy = sub(self._y, py)
+        dz = sub(self._z, pz)
+        return b.add( b.add(mul(dx, dx), mul(dy, dy)), mul(dz, dz) )
+
+
+    def get_distance_to(self, p):
+        """Returns an array of the distance from each vector to a point (or to
+        the corresponding point in a Vector3Array).
+
+        p -- A position, or a Vector3Array of positions
+
+        """
+
+        return self._backend.sqrt(self.get_distance_to_squared(p))
+
+
+    def get_centre(self):
+        """Returns the average of all the vectors, as a Vector3. A ValueError is
+        raised if the array is empty, as there is no average."""
+
+        count = len(self._x)
+        if not count:
+            raise ValueError("An empty Vector3Array has no centre")
+        b = self._backend
+        return Vector3.from_floats( b.sum(self._x) / count,
+                                    b.sum(self._y) / count,
+                                    b.sum(self._z) / count )
+
+
+def centre_point3d(points):
+    """Returns the centre of a collection of points, which may be a
+    Vector3Array or a sequence of vectors."""
+
+    if isinstance(points, Vector3Array):
+        return points.get_centre()
+    return _centre_point3d(points)
+
+
+if __name__ == "__main__":
+
+    va = Vector3Array.from_vectors([(1, 2, 3), (4, 5, 6), (0, 0, 0)])
+    print va
+    print va + (1, 1, 1)
+    print va * 2
+    print va.cross((0, 0, 1))
+    print list(va.get_lengths())
+    print va.get_normalised()
+    print va.get_centre()
+    print va.to_vectors()
@@ -0,0 +1,260 @@
+"""Projection of points to the screen.
+
+A Viewport combines a view-projection Matrix44 with a rectangle on the
+screen (like glViewport), and maps world space points to screen
+coordinates. Many points may be projected in one call, from a flat buffer
+of packed x, y, z values, without creating any objects per point. e.g.
+
+    viewport = Viewport(0, 0, 640, 480, projection * view)
+    clip = array('B', [0]) * count
+    viewport.project(points, screen, clip)
+    for i in xrange(count):
+        if not clip[i]:
+            draw_label(screen[i*2], screen[i*2+1])
+
+"""
+
+from array import array
+from itertools import izip
+
+from batch import numpy
+
+
+def _write(buffer, values, start, stop, step=1):
+    """Writes a list of values to a slice of a list or array."""
+
+    if isinstance(buffer, array):
+        values = array(buffer.typecode, values)
+    buffer[start:stop:step] = values
+
+
+class Viewport(object):
+
+    __slots__ = ('_rect', '_matrix', '_m', '_y_down')
+
+    def __init__(self, x, y, width, height, matrix=None, y_down=False):
+        """Creates a Viewport.
+
+        x -- Left edge of the viewport
+        y -- Bottom edge of the viewport (top edge if y_down is True)
+        width -- Width of the viewport
+        height -- Height of the viewport
+        matrix -- A view-projection Matrix44 (projection * view), or None to
+        set it later with set_matrix
+        y_down -- If True, screen y coordinates increase down the screen
+
+        """
+
+        self._y_down = y_down
+        self._matrix = None
+        self._m = None
+        self.set_rect(x, y, width, height)
+        if matrix is not None:
+            self.set_matrix(matrix)
+
+
+    def set_rect(self, x, y, width, height):
+        """Sets the rectangle of the viewport on the screen."""
+
+        self._rect = (float(x), float(y), float(width), float(height))
+        return self
+
+
+    def get_rect(self):
+        """Returns the rectangle as a tuple of (x, y, width, height)."""
+
+        return self._rect
+
+
+    def set_matrix(self, matrix):
+        """Sets the view-projection matrix. Call once a frame to re-use the
+        same Viewport as the camera moves.
+
+        matrix -- A view-projection Matrix44
+
+        """
+
+        self._matrix = matrix.copy()
+        self._matrix.enable_inverse_cache()
+        self._m = tuple(matrix.components())
+        return self
+
+
+    def get_matrix(self):
+        """Returns a copy of the view-projection matrix."""
+
+        return self._matrix.copy()
+
+
+    def _screen_transform(self):
+        """Returns the scale and offset that map normalised device
+        coordinates to the screen, as (sx, ox, sy, oy)."""
+
+        x, y, width, height = self._rect
+        sx = width * .5
+        sy = height * .5
+        if self._y_down:
+            return sx, x + sx, -sy, y + sy
+        return sx, x + sx, sy, y + sy
+
+
+    def project_point(self, point):
+        """Projects a single point, and returns a tuple of the screen x, y
+        and depth (0 at the near plane, 1 at the far plane), or None if the
+        point is in front of the near plane.
+
+        point -- A point (any sequence of 3 values)
+
+        """
+
+        m_0,  m_1,  m_2,  m_3, \
+        m_4,  m_5,  m_6,  m_7, \
+        m_8,  m_9,  m_10, m_11, \
+        m_12, m_13, m_14, m_15 = self._m
+        sx, ox, sy, oy = self._screen_transform()
+
+        x, y, z = point
+        tw = x * m_3 + y * m_7 + z * m_11 + m_15
+        tz = x * m_2 + y * m_6 + z * m_10 + m_14
+        if tw <= 0. or tz < -tw:
+            return None
+        tx = x * m_0 + y * m_4 + z * m_8  + m_12
+        ty = x * m_1 + y * m_5 + z * m_9  + m_13
+        r = 1. / tw
+        return ( tx * r * sx + ox,
+                 ty * r * sy + oy,
+                 tz * r * .5 + .5 )
+
+
+    def project(self, points, out, clip=None, depth=None):
+        """Projects a buffer of points to the screen, in one pass.
+
+        points -- A flat buffer of packed x, y, z values (a list, array or
+        NumPy array)
+        out -- A buffer to receive the packed screen x, y values (two per
+        point)
+        clip -- Optional buffer to receive a flag for each point, 1 if the
+        point is in front of the near plane (and so can not be projected)
+        or 0 if it was projected. Screen coordinates of clipped points are
+        set to 0
+        depth -- Optional buffer to receive the depth of each point (0 at
+        the near plane, 1 at the far plane)
+
+        With NumPy arrays, the points are projected with NumPy, and clip and
+        depth (if given) should also be NumPy arrays.
+
+        """
+
+        count = len(points)
+        if count % 3:
+            raise ValueError("Buffer should contain packed x, y, z values")
+        count //= 3
+        if len(out) < count * 2:
+            raise ValueError("Output buffer is too small")
+        if clip is not None and len(clip) < count:
+            raise ValueError("Clip buffer is too small")
+        if depth is not None and len(depth) < count:
+            raise ValueError("Depth buffer is too small")
+
+        if numpy is not None and isinstance(points, numpy.ndarray) \
+                             and isinstance(out, numpy.ndarray):
+            return self._project_numpy(points, out, clip, depth, count)
+
+        m_0,  m_1,  m_2,  m_3, \
+        m_4,  m_5,  m_6,  m_7, \
+        m_8,  m_9,  m_10, m_11, \
+        m_12, m_13, m_14, m_15 = self._m
+        sx, ox, sy, oy = self._screen_transform()
+
+        # Results are collected in lists and written with one slice
+        # assignment per buffer, which is quicker than indexing each value
+        screen_xs = []
+        screen_ys = []
+        flags = []
+        depths = []
+        append_x = screen_xs.append
+        append_y = screen_ys.append
+        append_flag = flags.append
+        append_depth = depths.append
+
+        for x, y, z in izip(points[0::3], points[1::3], points[2::3]):
+            tw = x * m_3 + y * m_7 + z * m_11 + m_15
+            tz = x * m_2 + y * m_6 + z * m_10 + m_14
+            if tw <= 0. or tz < -tw:
+                append_x(0.)
+                append_y(0.)
+                append_flag(1)
+                append_depth(0.)
+                continue
+            r = 1. / tw
+            append_x((x * m_0 + y * m_4 + z * m_8  + m_12) * r * sx + ox)
+            append_y((x * m_1 + y * m_5 + z * m_9  + m_13) * r * sy + oy)
+            append_flag(0)
+            append_depth(tz * r * .5 + .5)
+
+        _write(out, screen_xs, 0, count * 2, 2)
+        _write(out, screen_ys, 1, count * 2, 2)
+        if clip is not None:
+            _write(clip, flags, 0, count)
+        if depth is not None:
+            _write(depth, depths, 0, count)
+        return out
+
+
+    def _project_numpy(self, points, out, clip, depth, count):
+
+        m = numpy.array(self._m).reshape(4, 4)
+        sx, ox, sy, oy = self._screen_transform()
+        clipped = numpy.dot(points[:count*3].reshape(-1, 3), m[:3]) + m[3]
+        w = clipped[:, 3]
+        behind = (w <= 0.) | (clipped[:, 2] < -w)
+        r = numpy.where(behind, 0., 1. / numpy.where(behind, 1., w))
+
+        screen = out[:count*2].reshape(-1, 2)
+        screen[:, 0] = numpy.where(behind, 0., clipped[:, 0] * r * sx + ox)
+        screen[:, 1] = numpy.where(behind, 0., clipped[:, 1] * r * sy + oy)
+        if clip is not None:
+            clip[:count] = behind
+        if depth is not None:
+            depth[:count] = numpy.where(behind, 0., clipped[:, 2] * r * .5 + .5)
+        return out
+
+
+    def unproject(self, x, y, depth=0.):
+        """Returns the world space point (as a tuple) under a screen
+        position, for picking. Unproject at depth 0 and 1 to get a ray from
+        the near plane to the far plane.
+
+        x -- Screen x coordinate
+        y -- Screen y coordinate
+        depth -- Depth (0 at the near plane, 1 at the far plane)
+
+        """
+
+        sx, ox, sy, oy = self._screen_transform()
+        inverse = self._matrix.get_inverse()
+        tx, ty, tz, tw = inverse.transform4( ( (x - ox) / sx,
+                                               (y - oy) / sy,
+                                               depth * 2. - 1.,
+                                               1. ) )
+        return tx / tw, ty / tw, tz / tw
+
+
+if __name__ == "__main__":
+
+    from math import radians
+    from matrix44 import Matrix44
+
+    projection = Matrix44.perspective_projection_fov(radians(60), 1.5, 1., 100.)
+    viewport = Viewport(0, 0, 640, 480, projection)
+
+    points = array('d', [ 0., 0., -10.,
+                          1., 1., -10.,
+                          0., 0., 10. ])
+    screen = array('d', [0.]) * 6
+    clip = array('B', [0]) * 3
+    depth = array('d', [0.]) * 3
+    viewport.project(points, screen, clip, depth)
+    print list(screen), list(clip), list(depth)
+    print viewport.project_point((1., 1., -10.))
+    print viewport.unproject(screen[2], screen[3], depth[1])